@@ -174,6 +174,11 @@ def temp_file():
     yield temp_file
     os.unlink(temp_file)
 
+    # Written when the file is read as a scheduler fields file
+    cache_file = '.{}.cache'.format(temp_file)
+    if os.path.exists(cache_file):
+        os.unlink(cache_file)
+
 
 class FakeLogger:
     def __init__(self):
@@ -174,7 +174,8 @@ class AbstractCamera(PanBase):
 # Methods
 ##################################################################################################
 
-    def take_observation(self, observation, headers=None, filename=None, *args, **kwargs):
+    def take_observation(self, observation, headers=None, filename=None, pipeline=None,
+                         sync_start=None, *args, **kwargs):
         """Take an observation
 
         Gathers various header information, sets the file path, and calls
@@ -183,16 +184,26 @@ class AbstractCamera(PanBase):
             after the exposure had completed and the Event is set once
             `process_exposure` finishes.
 
+        With a `pipeline`, `process_exposure` is a job of the pipeline instead
+            of a new Thread, so that the next exposure can start as soon as this
+            one is read out. This waits while the pipeline is full.
+
         Args:
             observation (~pocs.scheduler.observation.Observation): Object
                 describing the observation
             headers (dict, optional): Header data to be saved along with the file.
             filename (str, optional): pass a filename for the output FITS file to
                 overrride the default file naming system
+            pipeline (`~pocs.utils.pipeline.Pipeline`, optional): Pipeline to
+                process the exposure in.
+            sync_start (`~pocs.utils.sync.SynchronizedStart`, optional): Wait
+                for the other cameras before starting the exposure, and keep
+                the skew in the `start_skew` of the metadata.
             **kwargs (dict): Optional keyword arguments (`exp_time`, dark)
 
         Returns:
-            threading.Event: An event to be set when the image is done processing
+            threading.Event: An event to be set when the image is done processing,
+                or with a `pipeline` when the exposure has been read out.
         """
         # To be used for marking when exposure is complete (see `process_exposure`)
         observation_event = threading.Event()
@@ -203,8 +214,14 @@ class AbstractCamera(PanBase):
                                                                           *args,
                                                                           **kwargs)
 
+        if sync_start is not None:
+            sync_start.wait(self.name)
+
         exposure_event = self.take_exposure(seconds=exp_time, filename=file_path, *args, **kwargs)
 
+        if sync_start is not None:
+            metadata['start_skew'] = sync_start.started(self.name)
+
         # Add most recent exposure to list
         if self.is_primary:
             if 'POINTING' in headers:
@@ -212,6 +229,11 @@ class AbstractCamera(PanBase):
             else:
                 observation.exposure_list[image_id] = file_path
 
+        if pipeline is not None:
+            pipeline.submit(image_id, self.process_exposure,
+                            metadata, observation_event, exposure_event)
+            return exposure_event
+
         # Process the exposure once readout is complete
         t = threading.Thread(
             target=self.process_exposure,
@@ -67,7 +67,8 @@ class Camera(AbstractGPhotoCamera):
         self.set_properties(prop2index, prop2value)
         self._connected = True
 
-    def take_observation(self, observation, headers=None, filename=None, *args, **kwargs):
+    def take_observation(self, observation, headers=None, filename=None, pipeline=None,
+                         sync_start=None, *args, **kwargs):
         """Take an observation
 
         Gathers various header information, sets the file path, and calls
@@ -85,10 +86,15 @@ class Camera(AbstractGPhotoCamera):
                 describing the observation
             headers (dict): Header data to be saved along with the file
             filename (str, optional): Filename for saving, defaults to ISOT time stamp
+            pipeline (`~pocs.utils.pipeline.Pipeline`, optional): Pipeline to
+                process the exposure in, see `AbstractCamera.take_observation`.
+            sync_start (`~pocs.utils.sync.SynchronizedStart`, optional): Wait
+                for the other cameras before starting the exposure.
             **kwargs (dict): Optional keyword arguments (`exp_time`)
 
         Returns:
-            threading.Event: An event to be set when the image is done processing
+            threading.Event: An event to be set when the image is done processing,
+                or with a `pipeline` when the image has been downloaded.
         """
         # To be used for marking when exposure is complete (see `process_exposure`)
         camera_event = Event()
@@ -99,8 +105,14 @@ class Camera(AbstractGPhotoCamera):
                                                                           *args,
                                                                           **kwargs)
 
+        if sync_start is not None:
+            sync_start.wait(self.name)
+
         proc = self.take_exposure(seconds=exp_time, filename=file_path)
 
+        if sync_start is not None:
+            metadata['start_skew'] = sync_start.started(self.name)
+
         # Add most recent exposure to list
         if self.is_primary:
             if 'POINTING' in headers:
@@ -110,6 +122,16 @@ class Camera(AbstractGPhotoCamera):
 
         # Process the image after a set amount of time
         wait_time = exp_time + self.readout_time
+
+        if pipeline is not None:
+            readout_event = Event()
+            t = Timer(wait_time, self._readout, (proc, readout_event))
+            t.name = '{}Readout'.format(self.name)
+            t.start()
+
+            pipeline.submit(image_id, self.process_exposure, metadata, camera_event, readout_event)
+            return readout_event
+
         t = Timer(wait_time, self.process_exposure, (metadata, camera_event, proc))
         t.name = '{}Thread'.format(self.name)
         t.start()
@@ -168,3 +190,7 @@ class Camera(AbstractGPhotoCamera):
         # Replace the path name with the FITS file
         info['file_path'] = fits_path
         return fits_path
+
+    def _readout(self, proc, readout_event):
+        proc.wait()
+        readout_event.set()
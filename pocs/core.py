@@ -1,10 +1,11 @@
 import os
 import sys
 import queue
+import threading
 import time
 import warnings
 import multiprocessing
-import zmq
+from collections import deque
 from contextlib import suppress
 
 from astropy import units as u
@@ -13,11 +14,13 @@ from pocs.base import PanBase
 from pocs.observatory import Observatory
 from pocs.state.machine import PanStateMachine
 from pocs.utils import current_time
-from pocs.utils import get_free_space
 from pocs.utils import CountdownTimer
 from pocs.utils import listify
 from pocs.utils import error
+from pocs.utils.commands import CommandQueue
+from pocs.utils.commands import CommandReceiver
 from pocs.utils.messaging import PanMessaging
+from pocs.utils.safety import SafetyMonitor
 
 
 class POCS(PanStateMachine, PanBase):
@@ -68,6 +71,16 @@ class POCS(PanStateMachine, PanBase):
 
         self._processes = {}
 
+        # Set to wake up `sleep` and `wait_for_events`, e.g. when a command arrives
+        self._wakeup = threading.Event()
+
+        #: CommandQueue: Commands received, with the latency of each in `latencies`.
+        self.commands = CommandQueue(wakeup=self._wakeup)
+        self._cmd_receiver = None
+
+        #: deque: Seconds between the events being set and `wait_for_events` returning.
+        self.wakeup_latency = deque(maxlen=100)
+
         self._has_messaging = None
         self.has_messaging = messaging
 
@@ -82,6 +95,15 @@ class POCS(PanStateMachine, PanBase):
         # Add observatory object, which does the bulk of the work
         self.observatory = observatory
 
+        # Keeps the readings `is_safe` needs, from messages when there are any
+        self.safety = SafetyMonitor(ephemeris=observatory.site_ephemeris,
+                                    horizon=observatory.location.get('twilight_horizon',
+                                                                     -18 * u.degree),
+                                    db=self.db,
+                                    logger=self.logger)
+        if self.has_messaging and self.config.get('safety', {}).get('monitor', True):
+            self.safety.start()
+
         self._connected = True
         self._initialized = False
         self._interrupted = False
@@ -164,7 +186,7 @@ class POCS(PanStateMachine, PanBase):
         try:
             status['state'] = self.state
             status['system'] = {
-                'free_space': get_free_space().value,
+                'free_space': self.safety.free_space().value,
             }
             status['observatory'] = self.observatory.status()
         except Exception as e:  # pragma: no cover
@@ -213,7 +235,7 @@ class POCS(PanStateMachine, PanBase):
         dispatching based on which queue received a message.
         """
         if self.has_messaging:
-            self._check_messages('command', self._cmd_queue)
+            self._check_messages('command', self.commands)
             self._check_messages('schedule', self._sched_queue)
 
     def power_down(self):
@@ -253,10 +275,14 @@ class POCS(PanStateMachine, PanBase):
 
             # Observatory shut down
             self.observatory.power_down()
+            self.safety.stop()
 
             # Shut down messaging
             self.logger.debug('Shutting down messaging system')
 
+            if self._cmd_receiver is not None:
+                self._cmd_receiver.stop()
+
             for name, proc in self._processes.items():
                 if proc.is_alive():
                     self.logger.debug('Terminating {} - PID {}'.format(name, proc.pid))
@@ -338,7 +364,7 @@ class POCS(PanStateMachine, PanBase):
         """
         # See if dark - we check this first because we want to know
         # the sun position even if using a simulator.
-        is_dark = self.observatory.is_dark
+        is_dark = self.safety.is_dark()
 
         # Check simulator
         with suppress(KeyError):
@@ -371,7 +397,7 @@ class POCS(PanStateMachine, PanBase):
 
         # Get current weather readings from database
         try:
-            record = self.db.get_current('weather')
+            record = self.safety.get_current('weather', stale=stale)
             is_safe = record['data'].get('safe', False)
 
             timestamp = record['date'].replace(tzinfo=None)  # current_time is timezone naive
@@ -403,7 +429,7 @@ class POCS(PanStateMachine, PanBase):
         Returns:
             bool: True if enough space
         """
-        free_space = get_free_space()
+        free_space = self.safety.free_space()
         return free_space.value >= required_space.to(u.gigabyte).value
 
     def has_ac_power(self, stale=90):
@@ -434,7 +460,7 @@ class POCS(PanStateMachine, PanBase):
 
         # Get current power readings from database
         try:
-            record = self.db.get_current('power')
+            record = self.safety.get_current('power', stale=stale)
             has_power = bool(record['data'].get('main', False))
 
             timestamp = record['date'].replace(tzinfo=None)  # current_time is timezone naive
@@ -467,9 +493,8 @@ class POCS(PanStateMachine, PanBase):
     def sleep(self, delay=2.5, with_status=True):
         """ Send POCS to sleep
 
-        Loops for `delay` number of seconds. If `delay` is more than 10.0 seconds,
-        `check_messages` will be called every 10.0 seconds in order to allow for
-        interrupt.
+        Waits for `delay` number of seconds. Commands are handled as soon as
+        they arrive, and a park or shutdown command ends the sleep.
 
         Keyword Arguments:
             delay {float} -- Number of seconds to sleep (default: 2.5)
@@ -482,19 +507,23 @@ class POCS(PanStateMachine, PanBase):
         if with_status and delay > 2.0:
             self.status()
 
-        # If delay is greater than 10 seconds check for messages during wait
-        if delay >= 10.0:
-            while delay >= 10.0:
-                self.check_messages()
-                # If we shutdown leave loop
-                if self.connected is False:
-                    return
+        end_time = time.monotonic() + delay
+        was_interrupted = self.interrupted
 
-                time.sleep(10.0)
-                delay -= 10.0
+        while True:
+            self._wakeup.clear()
 
-        if delay > 0.0:
-            time.sleep(delay)
+            self.check_messages()
+            # If we shutdown or were told to park leave loop
+            if self.connected is False or (self.interrupted and not was_interrupted):
+                return
+
+            time_left = end_time - time.monotonic()
+            if time_left <= 0:
+                return
+
+            # Wait for a command
+            self._wakeup.wait(time_left)
 
     def wait_for_events(self,
                         events,
@@ -508,15 +537,19 @@ class POCS(PanStateMachine, PanBase):
         This method will wait for a maximum of `timeout` seconds for all of the
         `events` to complete.
 
-        Will check at least every `sleep_delay` seconds for the events to be done,
-        and also for interrupts and bad weather. Will log debug messages approximately
-        every `status_interval` seconds, and will output status messages approximately
-        every `msg_interval` seconds.
+        Returns as soon as the last of the `events` is set, and wakes up as
+        soon as a command arrives to check for interrupts. Will also check at
+        least every `sleep_delay` seconds for interrupts. Will log debug
+        messages approximately every `msg_interval` seconds, and will output
+        status messages approximately every `status_interval` seconds.
+
+        The time between the last event being set and this returning is kept in
+        `wakeup_latency`.
 
         Args:
             events (list(`threading.Event`)): An Event or list of Events to wait on.
             timeout (float|`astropy.units.Quantity`): Timeout in seconds to wait for events.
-            sleep_delay (float, optional): Time in seconds between event checks.
+            sleep_delay (float, optional): Longest time in seconds between checks for interrupts.
             status_interval (float, optional): Time in seconds between status checks of the system.
             msg_interval (float, optional): Time in seconds between sending of status messages.
             event_type (str, optional): The type of event, used for outputting in log messages,
@@ -528,50 +561,79 @@ class POCS(PanStateMachine, PanBase):
         events = listify(events)
 
         # Remove units from these values.
-        if isinstance(timeout, u.Quantity):
-            timeout = timeout.to(u.second).value
+        def _seconds(value):
+            if isinstance(value, u.Quantity):
+                value = value.to(u.second).value
+            return value
 
-        if isinstance(sleep_delay, u.Quantity):
-            sleep_delay = sleep_delay.to(u.second).value
+        timeout = _seconds(timeout)
+        sleep_delay = _seconds(sleep_delay)
 
-        # ADD units to these values. Ugly.
-        if not isinstance(status_interval, u.Quantity):
-            status_interval = status_interval * u.second
+        timer = CountdownTimer(timeout)
+        start_time = time.monotonic()
 
-        if not isinstance(msg_interval, u.Quantity):
-            msg_interval = msg_interval * u.second
+        # One waiter wakes us up when every event is set, and stops when we return
+        returned = threading.Event()
+        all_set_times = list()
 
-        timer = CountdownTimer(timeout)
+        def wait_for_all():
+            for event in events:
+                while not event.wait(0.1):
+                    if returned.is_set():
+                        return
 
-        start_time = current_time()
-        next_status_time = start_time + status_interval
-        next_msg_time = start_time + msg_interval
+            if not returned.is_set():
+                all_set_times.append(time.monotonic())
+                self._wakeup.set()
 
-        while not all([event.is_set() for event in events]):
-            self.check_messages()
-            if self.interrupted:
-                self.logger.info("Waiting for events has been interrupted")
-                break
+        if not all(event.is_set() for event in events):
+            threading.Thread(target=wait_for_all, name='EventWaiter', daemon=True).start()
 
-            now = current_time()
-            if now >= next_msg_time:
-                elapsed_secs = (now - start_time).to(u.second).value
-                self.logger.debug('Waiting for {} events: {} seconds elapsed',
-                                  event_type,
-                                  round(elapsed_secs))
-                next_msg_time += msg_interval
-                now = current_time()
+        def log_progress():
+            self.logger.debug('Waiting for {} events: {} seconds elapsed',
+                              event_type,
+                              round(time.monotonic() - start_time))
 
-            if now >= next_status_time:
-                self.status()
-                next_status_time += status_interval
-                now = current_time()
+        # Next time, interval and action of each periodic task
+        timers = [
+            [start_time + _seconds(msg_interval), _seconds(msg_interval), log_progress],
+            [start_time + _seconds(status_interval), _seconds(status_interval), self.status],
+        ]
 
-            if timer.expired():
-                raise error.Timeout("Timedout waiting for {} event".format(event_type))
+        try:
+            while True:
+                self._wakeup.clear()
 
-            # Sleep for a little bit.
-            time.sleep(sleep_delay)
+                if all([event.is_set() for event in events]):
+                    if all_set_times:
+                        latency = time.monotonic() - all_set_times[0]
+                        self.wakeup_latency.append(latency)
+                        self.logger.debug('{} events done, noticed after {:.1f} ms',
+                                          event_type, latency * 1000)
+                    break
+
+                self.check_messages()
+                if self.interrupted:
+                    self.logger.info("Waiting for events has been interrupted")
+                    break
+
+                now = time.monotonic()
+                for periodic in timers:
+                    next_time, interval, action = periodic
+                    if now >= next_time:
+                        action()
+                        # Skip any that were missed while busy
+                        periodic[0] += interval * ((now - next_time) // interval + 1)
+
+                if timer.expired():
+                    raise error.Timeout("Timedout waiting for {} event".format(event_type))
+
+                # Wait for an event, a command or the next timer
+                next_time = min(periodic[0] for periodic in timers)
+                wait = min(next_time - time.monotonic(), timer.time_left(), sleep_delay)
+                self._wakeup.wait(max(0, wait))
+        finally:
+            returned.set()
 
     def wait_until_safe(self):
         """ Waits until weather is safe.
@@ -675,45 +737,18 @@ class POCS(PanStateMachine, PanBase):
                 msg_port,), name='MsgForwarder')
         msg_forwarder_process.start()
 
-        self._do_cmd_check = True
-        self._cmd_queue = multiprocessing.Queue()
         self._sched_queue = multiprocessing.Queue()
 
         self._msg_publisher = PanMessaging.create_publisher(msg_port)
 
-        def check_message_loop(cmd_queue):
-            cmd_subscriber = PanMessaging.create_subscriber(cmd_port + 1)
-
-            poller = zmq.Poller()
-            poller.register(cmd_subscriber.socket, zmq.POLLIN)
-
-            try:
-                while self._do_cmd_check:
-                    # Poll for messages
-                    sockets = dict(poller.poll(500))  # 500 ms timeout
-
-                    if cmd_subscriber.socket in sockets and \
-                            sockets[cmd_subscriber.socket] == zmq.POLLIN:
-
-                        topic, msg_obj = cmd_subscriber.receive_message(flags=zmq.NOBLOCK)
-
-                        # Put the message in a queue to be processed
-                        if topic == 'POCS-CMD':
-                            cmd_queue.put(msg_obj)
-
-                    time.sleep(1)
-            except KeyboardInterrupt:
-                pass
+        # Queues the commands and wakes us up as soon as they arrive
+        self.logger.debug('Starting command receiver')
+        self._cmd_receiver = CommandReceiver(cmd_port + 1, self.commands, logger=self.logger)
+        self._cmd_receiver.start()
 
-        self.logger.debug('Starting command message loop')
-        check_messages_process = multiprocessing.Process(
-            target=check_message_loop, args=(self._cmd_queue,))
-        check_messages_process.name = 'MessageCheckLoop'
-        check_messages_process.start()
         self.logger.debug('Command message subscriber set up on port {}'.format(cmd_port))
 
         self._processes = {
-            'check_messages': check_messages_process,
             'cmd_forwarder': cmd_forwarder_process,
             'msg_forwarder': msg_forwarder_process,
         }
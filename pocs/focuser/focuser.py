@@ -1,28 +1,25 @@
 import os
-import matplotlib.colors as colours
-import matplotlib.pyplot as plt
-
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-from matplotlib.figure import Figure
-
-from astropy.modeling import models, fitting
-from scipy.ndimage import binary_dilation
 
 import numpy as np
 
-from copy import copy
 from threading import Event
 from threading import Thread
 
 
 from pocs.base import PanBase
 from pocs.utils import current_time
+from pocs.utils import lazy_import
 from pocs.utils.images import focus as focus_utils
+from pocs.utils.images import get_palette
 
-palette = copy(plt.cm.inferno)
-palette.set_over('w', 1.0)
-palette.set_under('k', 1.0)
-palette.set_bad('g', 1.0)
+# Only needed to focus, so imported on first use
+colours = lazy_import('matplotlib.colors')
+plt = lazy_import('matplotlib.pyplot')
+backend_agg = lazy_import('matplotlib.backends.backend_agg')
+figure = lazy_import('matplotlib.figure')
+models = lazy_import('astropy.modeling.models')
+fitting = lazy_import('astropy.modeling.fitting')
+ndimage = lazy_import('scipy.ndimage')
 
 
 class AbstractFocuser(PanBase):
@@ -402,7 +399,7 @@ class AbstractFocuser(PanBase):
             thumbnails[i] = thumbnail
 
         master_mask = masks.any(axis=0)
-        master_mask = binary_dilation(master_mask, iterations=mask_dilations)
+        master_mask = ndimage.binary_dilation(master_mask, iterations=mask_dilations)
 
         # Apply the master mask and then get metrics for each frame.
         for i, thumbnail in enumerate(thumbnails):
@@ -482,13 +479,13 @@ class AbstractFocuser(PanBase):
                 initial_thumbnail = initial_thumbnail - dark_thumb
                 final_thumbnail = final_thumbnail - dark_thumb
 
-            fig = Figure()
-            FigureCanvas(fig)
+            fig = figure.Figure()
+            backend_agg.FigureCanvasAgg(fig)
             fig.set_size_inches(9, 18)
 
             ax1 = fig.add_subplot(3, 1, 1)
             im1 = ax1.imshow(initial_thumbnail, interpolation='none',
-                             cmap=palette, norm=colours.LogNorm())
+                             cmap=get_palette(), norm=colours.LogNorm())
             fig.colorbar(im1)
             ax1.set_title('Initial focus position: {}'.format(initial_focus))
 
@@ -516,7 +513,7 @@ class AbstractFocuser(PanBase):
 
             ax3 = fig.add_subplot(3, 1, 3)
             im3 = ax3.imshow(final_thumbnail, interpolation='none',
-                             cmap=palette, norm=colours.LogNorm())
+                             cmap=get_palette(), norm=colours.LogNorm())
             fig.colorbar(im3)
             ax3.set_title('Final focus position: {}'.format(final_focus))
             plot_path = os.path.join(file_path_root, '{}_focus.png'.format(focus_type))
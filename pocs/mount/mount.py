@@ -1,3 +1,4 @@
+import threading
 import time
 
 from astropy import units as u
@@ -60,6 +61,10 @@ class AbstractMount(PanBase):
         self.non_sidereal_available = self.mount_config.setdefault('non_sidereal_available', False)
         self.PEC_available = self.mount_config.setdefault('PEC_available', False)
 
+        # A query is a write and a read that mustn't be split up, e.g. by a
+        # status refresh in another thread
+        self._query_lock = threading.RLock()
+
         # Initial states
         self._is_connected = False
         self._is_initialized = False
@@ -662,9 +667,10 @@ class AbstractMount(PanBase):
         assert self.is_initialized, self.logger.warning('Mount has not been initialized')
 
         full_command = self._get_command(cmd, params=params)
-        self.write(full_command)
+        with self._query_lock:
+            self.write(full_command)
 
-        response = self.read()
+            response = self.read()
 
         # expected_response = self._get_expected_response(cmd)
         # if str(response) != str(expected_response):
@@ -1,26 +1,30 @@
 import os
+import threading
 
 from collections import OrderedDict
 from datetime import datetime
-import subprocess
 from glob import glob
 
 from astroplan import Observer
 from astropy import units as u
 from astropy.coordinates import EarthLocation
-from astropy.coordinates import get_moon
-from astropy.coordinates import get_sun
 
 from pocs.base import PanBase
 import pocs.dome
-from pocs.images import Image
 from pocs.scheduler.constraint import Duration
 from pocs.scheduler.constraint import MoonAvoidance
 from pocs.scheduler.constraint import Altitude
 from pocs.utils import current_time
 from pocs.utils import error
 from pocs.utils import horizon as horizon_utils
+from pocs.utils.ephemeris import SiteEphemeris
 from pocs.utils import load_module
+from pocs.utils.analysis import AnalysisExecutor
+from pocs.utils.analysis import image_offset
+from pocs.utils.housekeeping import HousekeepingQueue
+from pocs.utils.pipeline import Pipeline
+from pocs.utils.status import StatusCache
+from pocs.utils.sync import SynchronizedStart
 from pocs.camera import AbstractCamera
 
 
@@ -40,6 +44,7 @@ class Observatory(PanBase):
         self.location = None
         self.earth_location = None
         self.observer = None
+        self.site_ephemeris = None
         self._setup_location()
 
         self.logger.info('\tSetting up mount')
@@ -62,7 +67,36 @@ class Observatory(PanBase):
         self.scheduler = None
         self._create_scheduler()
 
-        self.current_offset_info = None
+        # `seq_time` of the observation and the offset found for it
+        self._current_offset = None
+
+        # Process exposures in the background while the next ones are taken
+        observations_config = self.config.get('observations', {})
+        self._pipelined = observations_config.get('pipeline', False)
+        self._pipeline_size = observations_config.get('pipeline_size', 2)
+        self._pipelines = dict()
+
+        # Longest a camera waits for the others to start its exposure
+        self._sync_timeout = observations_config.get('sync_timeout', 10)
+        #: dict: Seconds after the release each camera started its last exposure.
+        self.last_start_skews = dict()
+
+        # Runs the cleanup of the image directories
+        housekeeping_config = self.config.get('housekeeping', {})
+        self.housekeeping = HousekeepingQueue(
+            os.path.join(self.config['directories']['images'], 'housekeeping.json'),
+            workers=housekeeping_config.get('workers', 2),
+            timeout=housekeeping_config.get('timeout', 60) * 60,
+            logger=self.logger)
+
+        # Solves images in worker processes
+        analysis_config = self.config.get('analysis', {})
+        self.analysis = AnalysisExecutor(workers=analysis_config.get('workers', 1),
+                                         depth=analysis_config.get('depth', 2),
+                                         logger=self.logger)
+
+        self._status = StatusCache(logger=self.logger)
+        self._setup_status()
 
         self._image_dir = self.config['directories']['images']
         self.logger.info('\t Observatory initialized')
@@ -76,10 +110,10 @@ class Observatory(PanBase):
         horizon = self.location.get('twilight_horizon', -18 * u.degree)
 
         t0 = current_time()
-        is_dark = self.observer.is_night(t0, horizon=horizon)
+        is_dark = self.site_ephemeris.is_night(t0, horizon=horizon)
 
         if not is_dark:
-            sun_pos = self.observer.altaz(t0, target=get_sun(t0)).alt
+            sun_pos = self.site_ephemeris.sun_altaz(t0)[0]
             self.logger.debug("Sun {:.02f} > {}".format(sun_pos, horizon))
 
         return is_dark
@@ -121,6 +155,22 @@ class Observatory(PanBase):
     def current_observation(self, new_observation):
         self.scheduler.current_observation = new_observation
 
+    @property
+    def current_offset_info(self):
+        """Offset of the latest image analyzed for the current observation
+
+        Offsets of images of an earlier observation, which can still be
+        arriving from the analysis workers, are ignored.
+        """
+        return self._offset_for(self._current_offset, self.current_observation)
+
+    @current_offset_info.setter
+    def current_offset_info(self, offset_info):
+        if offset_info is None:
+            self._current_offset = None
+        else:
+            self._current_offset = (self.current_observation.seq_time, offset_info)
+
     @property
     def has_dome(self):
         return self.dome is not None
@@ -178,49 +228,30 @@ class Observatory(PanBase):
         """Power down the observatory. Currently does nothing
         """
         self.logger.debug("Shutting down observatory")
+        self.wait_for_processing()
+        self.analysis.shutdown()
+        self._status.stop()
         self.mount.disconnect()
         if self.dome:
             self.dome.disconnect()
 
     def status(self):
         """Get status information for various parts of the observatory
+
+        Each part is refreshed once its `status.ttl` has passed, so this is
+        cheap to call often. With `status.background` they are refreshed by a
+        thread and the latest status is returned at once.
         """
-        status = {}
+        status = OrderedDict()
         try:
-            t = current_time()
-            local_time = str(datetime.now()).split('.')[0]
-
-            if self.mount.is_initialized:
-                status['mount'] = self.mount.status()
-                status['mount']['current_ha'] = self.observer.target_hour_angle(
-                    t, self.mount.get_current_coordinates())
-                if self.mount.has_target:
-                    status['mount']['mount_target_ha'] = self.observer.target_hour_angle(
-                        t, self.mount.get_target_coordinates())
-
-            if self.dome:
-                status['dome'] = self.dome.status
-
-            if self.current_observation:
-                status['observation'] = self.current_observation.status()
-                status['observation']['field_ha'] = self.observer.target_hour_angle(
-                    t, self.current_observation.field)
-
-            evening_astro_time = self.observer.twilight_evening_astronomical(t, which='next')
-            morning_astro_time = self.observer.twilight_morning_astronomical(t, which='next')
-
-            status['observer'] = {
-                'siderealtime': str(self.sidereal_time),
-                'utctime': t,
-                'localtime': local_time,
-                'local_evening_astro_time': evening_astro_time,
-                'local_morning_astro_time': morning_astro_time,
-                'local_sun_set_time': self.observer.sun_set_time(t),
-                'local_sun_rise_time': self.observer.sun_rise_time(t),
-                'local_moon_alt': self.observer.moon_altaz(t).alt,
-                'local_moon_illumination': self.observer.moon_illumination(t),
-                'local_moon_phase': self.observer.moon_phase(t),
-            }
+            for name, component_status in self._status.get().items():
+                if isinstance(component_status, dict):
+                    component_status = dict(component_status)
+                status[name] = component_status
+
+            if 'observer' in status:
+                status['observer']['utctime'] = current_time()
+                status['observer']['localtime'] = str(datetime.now()).split('.')[0]
 
         except Exception as e:  # pragma: no cover
             self.logger.warning("Can't get observatory status: {}".format(e))
@@ -247,9 +278,17 @@ class Observatory(PanBase):
             self.config['scheduler'].get('check_file', False)
         )
 
+        previous_observation = self.current_observation
+        previous_seq_time = getattr(previous_observation, 'seq_time', None)
+
         # This will set the `current_observation`
         self.scheduler.get_observation(reread_fields_file=reread_fields_file, *args, **kwargs)
 
+        # Offsets found for the last observation don't apply to a new one
+        if self.current_observation is not previous_observation or \
+                getattr(self.current_observation, 'seq_time', None) != previous_seq_time:
+            self._current_offset = None
+
         if self.current_observation is None:
             self.scheduler.clear_available_observations()
             raise error.NoObservation("No valid observations found")
@@ -270,6 +309,9 @@ class Observatory(PanBase):
             keep_jpgs (None or bool, optional): If JPG copies of observation images should be kept
                 on local hard drive, default to config item `observations.keep_jpgs` then True.
         """
+        # Every image must be written before the directories are processed
+        self.wait_for_processing()
+
         if upload_images is None:
             try:
                 upload_images = self.config.get('panoptes_network', {})['image_storage']
@@ -310,7 +352,6 @@ class Observatory(PanBase):
                     camera.uid,
                     seq_time
                 )
-                self.logger.info('Cleaning directory {}'.format(seq_dir))
 
                 process_cmd = [
                     process_script_path,
@@ -326,24 +367,11 @@ class Observatory(PanBase):
                 if keep_jpgs is False:
                     process_cmd.append('--remove_jpgs')
 
-                # Start the subprocess in background and collect proc object.
-                clean_proc = subprocess.Popen(process_cmd,
-                                              universal_newlines=True,
-                                              stdout=subprocess.PIPE,
-                                              stderr=subprocess.PIPE
-                                              )
-                self.logger.info('Cleaning directory pid={}'.format(clean_proc.pid))
-
-                # Block and wait for directory to finish
-                try:
-                    outs, errs = clean_proc.communicate(timeout=3600)  # one hour
-                except subprocess.TimeoutExpired:  # pragma: no cover
-                    clean_proc.kill()
-                    outs, errs = clean_proc.communicate(timeout=10)
-                    if errs is not None:
-                        self.logger.warning("Problem cleaning: {}".format(errs))
+                self.housekeeping.add(seq_dir, process_cmd)
 
-            self.logger.debug('Cleanup finished')
+        # Also runs any left from an interrupted cleanup
+        self.housekeeping.run()
+        self.logger.debug('Cleanup finished')
 
         self.scheduler.reset_observed_list()
 
@@ -353,6 +381,10 @@ class Observatory(PanBase):
         This method gets the current observation and takes the next
         corresponding exposure.
 
+        The cameras are set up in parallel and then start their exposures
+        together, see `~pocs.utils.sync.SynchronizedStart`. The skew of each
+        camera is kept in `last_start_skews`.
+
         """
         # Get observatory metadata
         headers = self.get_standard_headers()
@@ -364,19 +396,35 @@ class Observatory(PanBase):
         # processing
         camera_events = dict()
 
-        # Take exposure with each camera
-        for cam_name, camera in self.cameras.items():
+        sync_start = SynchronizedStart(list(self.cameras), timeout=self._sync_timeout)
+
+        def take_observation(cam_name, camera):
             self.logger.debug("Exposing for camera: {}".format(cam_name))
 
             try:
                 # Start the exposures
-                cam_event = camera.take_observation(self.current_observation, headers)
+                cam_event = camera.take_observation(self.current_observation, headers,
+                                                    pipeline=self._get_pipeline(camera),
+                                                    sync_start=sync_start)
 
                 camera_events[cam_name] = cam_event
 
             except Exception as e:
+                sync_start.withdraw(cam_name)
                 self.logger.error("Problem waiting for images: {}".format(e))
 
+        # Take exposure with each camera
+        threads = [threading.Thread(target=take_observation, args=(cam_name, camera))
+                   for cam_name, camera in self.cameras.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.last_start_skews = dict(sync_start.skews)
+        if len(self.last_start_skews) > 1:
+            self.logger.debug("Exposures started within {:.3f} s".format(sync_start.max_skew))
+
         return camera_events
 
     def analyze_recent(self):
@@ -385,43 +433,33 @@ class Observatory(PanBase):
         Compares the most recent exposure to the reference exposure and determines
         the offset between the two.
 
+        The image is solved by an analysis worker (see `analysis`), so this
+        doesn't wait for the offset: `current_offset_info` is set when it is
+        found and used by the next `update_tracking`. With `observations.pipeline`
+        the job is only submitted once the primary camera has processed the image.
+
         Returns:
-            dict: Offset information
+            dict: Offset information found so far, which may be for an earlier
+                exposure.
         """
-        # Clear the offset info
-        self.current_offset_info = None
+        pipeline = self._get_pipeline(self.primary_camera)
 
         pointing_image_id, pointing_image = self.current_observation.pointing_image
         self.logger.debug(
             "Analyzing recent image using pointing image: '{}'".format(pointing_image))
 
-        try:
-            # Get the image to compare
-            image_id, image_path = self.current_observation.last_exposure
-
-            current_image = Image(image_path, location=self.earth_location)
-
-            solve_info = current_image.solve_field(skip_solved=False)
-
-            self.logger.debug("Solve Info: {}".format(solve_info))
+        # Get the image to compare
+        last_exposure = self.current_observation.last_exposure
+        if last_exposure is None:
+            return self.current_offset_info
 
-            # Get the offset between the two
-            self.current_offset_info = current_image.compute_offset(pointing_image)
-            self.logger.debug('Offset Info: {}'.format(self.current_offset_info))
+        image_id, image_path = last_exposure
 
-            # Store the offset information
-            self.db.insert('offset_info', {
-                'image_id': image_id,
-                'd_ra': self.current_offset_info.delta_ra.value,
-                'd_dec': self.current_offset_info.delta_dec.value,
-                'magnitude': self.current_offset_info.magnitude.value,
-                'unit': 'arcsec',
-            })
-
-        except error.SolveError:
-            self.logger.warning("Can't solve field, skipping")
-        except Exception as e:
-            self.logger.warning("Problem in analyzing: {}".format(e))
+        if pipeline is not None:
+            pipeline.submit('Analyze {}'.format(image_id), self._analyze_exposure,
+                            image_id, image_path, pointing_image)
+        else:
+            self._analyze_exposure(image_id, image_path, pointing_image)
 
         return self.current_offset_info
 
@@ -441,7 +479,15 @@ class Observatory(PanBase):
         via the `mount.get_ms_offset`, find the number of milliseconds we
         should adjust in a given direction, one for each axis.
         """
-        if self.current_offset_info is not None:
+        # Each offset is only corrected once
+        current_offset, self._current_offset = self._current_offset, None
+        offset_info = self._offset_for(current_offset, self.current_observation)
+
+        if current_offset is not None and offset_info is None:
+            self.logger.debug("Dropping offset of earlier observation {}".format(
+                current_offset[0]))
+
+        if offset_info is not None:
             self.logger.debug("Updating the tracking")
 
             # Get the pier side of pointing image
@@ -455,7 +501,7 @@ class Observatory(PanBase):
 
             self.logger.debug("Pointing HA: {:.02f}".format(pointing_ha))
             correction_info = self.mount.get_tracking_correction(
-                self.current_offset_info,
+                offset_info,
                 pointing_ha
             )
 
@@ -464,6 +510,28 @@ class Observatory(PanBase):
             except error.Timeout:
                 self.logger.warning("Timeout while correcting tracking")
 
+    def processed_exposures(self):
+        """The exposures processed in the background since last asked
+
+        Only used with `observations.pipeline`.
+
+        Returns:
+            list(`~pocs.utils.pipeline.PipelineJob`): The processing and
+                analysis of each exposure, with the `error` if it failed.
+        """
+        jobs = list()
+        for pipeline in self._pipelines.values():
+            jobs.extend(pipeline.finished())
+
+        return jobs
+
+    def wait_for_processing(self):
+        """ Wait until the exposures processing and analyzing in the background are done """
+        for pipeline in self._pipelines.values():
+            pipeline.wait()
+
+        self.analysis.wait()
+
     def get_standard_headers(self, observation=None):
         """Get a set of standard headers
 
@@ -486,7 +554,7 @@ class Observatory(PanBase):
         self.logger.debug("Getting headers for : {}".format(observation))
 
         t0 = current_time()
-        moon = get_moon(t0, self.observer.location)
+        moon = self.site_ephemeris.moon(t0)
 
         headers = {
             'airmass': self.observer.altaz(t0, field).secz.value,
@@ -495,7 +563,7 @@ class Observatory(PanBase):
             'ha_mnt': self.observer.target_hour_angle(t0, field).value,
             'latitude': self.location.get('latitude').value,
             'longitude': self.location.get('longitude').value,
-            'moon_fraction': self.observer.moon_illumination(t0),
+            'moon_fraction': self.site_ephemeris.moon_illumination(t0),
             'moon_separation': field.coord.separation(moon).value,
             'observer': self.config.get('name', ''),
             'origin': 'Project PANOPTES',
@@ -600,6 +668,126 @@ class Observatory(PanBase):
 # Private Methods
 ##########################################################################
 
+    def _setup_status(self):
+        """ Add the parts of the observatory to the status, each with its `status.ttl` """
+        status_config = self.config.get('status', {})
+        ttl = status_config.get('ttl', {})
+
+        self._status.add('mount', self._mount_status, ttl=ttl.get('mount', 0))
+        self._status.add('dome', self._dome_status, ttl=ttl.get('dome', 0))
+        self._status.add('observation', self._observation_status,
+                         ttl=ttl.get('observation', 0),
+                         key=lambda: self.current_observation)
+        self._status.add('observer', self._observer_status, ttl=ttl.get('observer', 0))
+        self._status.add('analysis', self.analysis.status, ttl=ttl.get('analysis', 0))
+
+        if status_config.get('background', False):
+            self._status.start(interval=status_config.get('interval', 1) * u.second)
+
+    def _get_pipeline(self, camera):
+        """ The pipeline processing the exposures of `camera`, None if not pipelined """
+        if not self._pipelined or camera is None:
+            return None
+
+        try:
+            return self._pipelines[camera]
+        except KeyError:
+            pipeline = self._pipelines[camera] = Pipeline(name='{}Pipeline'.format(camera.name),
+                                                          size=self._pipeline_size,
+                                                          logger=self.logger)
+            return pipeline
+
+    def _analyze_exposure(self, image_id, image_path, pointing_image):
+        """ Find the offset of the image in an analysis worker """
+        pointing_file = getattr(pointing_image, 'wcs_file', None) or \
+            getattr(pointing_image, 'fits_file', pointing_image)
+
+        seq_time = self.current_observation.seq_time
+
+        future = self.analysis.submit('Offset {}'.format(image_id), image_offset,
+                                      image_path, pointing_file)
+        future.add_done_callback(lambda f: self._store_offset(image_id, seq_time, f))
+
+        return future
+
+    def _offset_for(self, current_offset, observation):
+        if current_offset is None or observation is None:
+            return None
+
+        seq_time, offset_info = current_offset
+        if seq_time != observation.seq_time:
+            return None
+
+        return offset_info
+
+    def _store_offset(self, image_id, seq_time, future):
+        try:
+            offset_info = future.result()
+            self.logger.debug('Offset Info: {}'.format(offset_info))
+
+            # Store the offset information
+            self.db.insert('offset_info', {
+                'image_id': image_id,
+                'd_ra': offset_info.delta_ra.value,
+                'd_dec': offset_info.delta_dec.value,
+                'magnitude': offset_info.magnitude.value,
+                'unit': 'arcsec',
+            })
+
+            self._current_offset = (seq_time, offset_info)
+
+        except error.SolveError:
+            self.logger.warning("Can't solve field, skipping")
+        except Exception as e:
+            self.logger.warning("Problem in analyzing: {}".format(e))
+
+    def _mount_status(self):
+        if not self.mount.is_initialized:
+            return None
+
+        t = current_time()
+        status = self.mount.status()
+        status['current_ha'] = self.observer.target_hour_angle(
+            t, self.mount.get_current_coordinates())
+        if self.mount.has_target:
+            status['mount_target_ha'] = self.observer.target_hour_angle(
+                t, self.mount.get_target_coordinates())
+
+        return status
+
+    def _dome_status(self):
+        if not self.dome:
+            return None
+
+        return self.dome.status
+
+    def _observation_status(self):
+        observation = self.current_observation
+        if not observation:
+            return None
+
+        status = observation.status()
+        status['field_ha'] = self.observer.target_hour_angle(current_time(), observation.field)
+
+        return status
+
+    def _observer_status(self):
+        t = current_time()
+        ephemeris = self.site_ephemeris
+
+        return {
+            'siderealtime': str(self.sidereal_time),
+            'utctime': t,
+            'localtime': str(datetime.now()).split('.')[0],
+            'local_evening_astro_time': ephemeris.twilight_evening_astronomical(t),
+            'local_morning_astro_time': ephemeris.twilight_morning_astronomical(t),
+            'local_sun_set_time': ephemeris.sun_set_time(t),
+            'local_sun_rise_time': ephemeris.sun_rise_time(t),
+            'local_moon_alt': ephemeris.moon_altaz(t)[0],
+            'local_moon_illumination': ephemeris.moon_illumination(t),
+            'local_moon_phase': ephemeris.moon_phase(t),
+        }
+
     def _setup_location(self):
         """
         Sets up the site and location details for the observatory
@@ -652,6 +840,9 @@ class Observatory(PanBase):
                 lat=latitude, lon=longitude, height=elevation)
             self.observer = Observer(
                 location=self.earth_location, name=name, timezone=timezone)
+
+            # Sun and Moon shared by everything that needs them
+            self.site_ephemeris = SiteEphemeris(self.observer)
         except Exception:
             raise error.PanError(msg='Bad site information')
 
@@ -744,8 +935,12 @@ class Observatory(PanBase):
 
                 # Create the Scheduler instance
                 self.scheduler = module.Scheduler(
-                    self.observer, fields_file=fields_path, constraints=constraints)
+                    self.observer, fields_file=fields_path, constraints=constraints,
+                    site_ephemeris=self.site_ephemeris, db=self.db)
                 self.logger.debug("Scheduler created")
+
+                if scheduler_config.get('load_history', True):
+                    self.scheduler.load_history()
             except ImportError as e:
                 raise error.NotFound(msg=e)
         else:
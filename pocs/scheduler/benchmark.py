@@ -0,0 +1,347 @@
+"""Whole-night scheduler simulation for measuring throughput and decisions.
+
+Drives `get_observation` of a scheduler over a simulated night and records
+the latency of every scheduling pass, the time spent in each constraint, the
+memory used and the resulting observing sequence. Everything runs offline
+from the `resources/targets` files and the site in the config, e.g.:
+
+    >>> from pocs.scheduler.benchmark import run_benchmark
+    >>> for result in run_benchmark(sizes=[100, 1000]):     # doctest: +SKIP
+    ...     print(result.summary())
+
+See also `scripts/benchmark_scheduler.py`.
+"""
+import glob
+import os
+import resource
+import sys
+import time as timer
+import tracemalloc
+import yaml
+
+import numpy as np
+
+from astroplan import Observer
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from pocs.scheduler.constraint import Altitude
+from pocs.scheduler.constraint import Duration
+from pocs.scheduler.constraint import MoonAvoidance
+from pocs.utils import horizon as horizon_utils
+from pocs.utils import load_module
+
+# A fixed night keeps the results comparable between runs and inside the
+# range of the bundled IERS tables, so nothing needs to be downloaded.
+DEFAULT_DATE = '2016-09-01'
+
+
+class BenchmarkResult(object):
+
+    """ The measurements of one simulated night """
+
+    def __init__(self, num_fields, load_time, latencies, constraint_costs, sequence,
+                 peak_rss, peak_traced=None):
+        self.num_fields = num_fields
+        self.load_time = load_time
+        self.latencies = np.asarray(latencies)
+        self.constraint_costs = constraint_costs
+        self.sequence = sequence
+        self.peak_rss = peak_rss
+        self.peak_traced = peak_traced
+
+    @property
+    def passes(self):
+        return len(self.latencies)
+
+    def percentiles(self, q=(50, 90, 99)):
+        """ Scheduling pass latency percentiles in seconds """
+        if self.passes == 0:
+            return {p: np.nan for p in q}
+
+        return dict(zip(q, np.percentile(self.latencies, q)))
+
+    def to_dict(self):
+        """ The result as plain types, e.g. for saving as JSON """
+        return {
+            'num_fields': self.num_fields,
+            'load_time': self.load_time,
+            'passes': self.passes,
+            'latency': {
+                'total': float(self.latencies.sum()),
+                'max': float(self.latencies.max()) if self.passes else None,
+                'percentiles': {str(p): float(v) for p, v in self.percentiles().items()},
+            },
+            'constraints': self.constraint_costs,
+            'peak_rss': self.peak_rss,
+            'peak_traced': self.peak_traced,
+            'sequence': self.sequence,
+        }
+
+    def summary(self):
+        """ A human readable report """
+        percentiles = self.percentiles()
+        lines = [
+            "{} fields: loaded in {:.3f} s, {} passes".format(
+                self.num_fields, self.load_time, self.passes),
+            "  latency p50 {:.4f} s  p90 {:.4f} s  p99 {:.4f} s  max {:.4f} s".format(
+                percentiles[50], percentiles[90], percentiles[99],
+                self.latencies.max() if self.passes else np.nan),
+        ]
+
+        for name, cost in self.constraint_costs.items():
+            lines.append("  {:<30} {:>8.4f} s total  {:>8.5f} s/call  {:>6.1f}% vetoed".format(
+                name, cost['time'], cost['time'] / max(cost['calls'], 1),
+                100. * cost['vetoed'] / max(cost['scored'], 1)))
+
+        memory = "  peak RSS {:.1f} MB".format(self.peak_rss / 2**20)
+        if self.peak_traced is not None:
+            memory += ", peak traced {:.1f} MB".format(self.peak_traced / 2**20)
+        lines.append(memory)
+
+        observed = [entry['field'] for entry in self.sequence if entry['field'] is not None]
+        lines.append("  {} of {} passes selected a field, {} distinct fields".format(
+            len(observed), self.passes, len(set(observed))))
+
+        return "\n".join(lines)
+
+
+class _TimedConstraint(object):
+
+    """ Wraps a constraint to record the time spent in and vetoes from `get_scores` """
+
+    def __init__(self, constraint, costs):
+        self.constraint = constraint
+        self.costs = costs.setdefault(str(constraint),
+                                      {'calls': 0, 'time': 0., 'scored': 0, 'vetoed': 0})
+
+    def get_scores(self, *args, **kwargs):
+        start = timer.perf_counter()
+        vetoes, scores = self.constraint.get_scores(*args, **kwargs)
+        self.costs['time'] += timer.perf_counter() - start
+        self.costs['calls'] += 1
+        self.costs['scored'] += len(vetoes)
+        self.costs['vetoed'] += int(np.count_nonzero(vetoes))
+
+        return vetoes, scores
+
+    def __getattr__(self, name):
+        return getattr(self.constraint, name)
+
+    def __str__(self):
+        return str(self.constraint)
+
+
+def get_observer(config):
+    """ An `astroplan.Observer` for the site in `config` """
+    site = config['location']
+    location = EarthLocation(lat=site['latitude'],
+                             lon=site['longitude'],
+                             height=site.get('elevation', 0 * u.meter))
+
+    return Observer(location=location, name=site.get('name', ''),
+                    timezone=site.get('timezone', 'UTC'))
+
+
+def get_constraints(config):
+    """ The constraints the `Observatory` creates for the site in `config` """
+    default_horizon = config['location'].get('horizon', 30 * u.degree)
+    horizon_line = horizon_utils.Horizon(
+        obstructions=config['location'].get('obstructions', list()),
+        default_horizon=default_horizon.value
+    )
+
+    return [
+        Altitude(horizon=horizon_line),
+        MoonAvoidance(),
+        Duration(default_horizon),
+    ]
+
+
+def get_night(observer, date=DEFAULT_DATE, horizon=-18 * u.degree):
+    """ Start and end of the night that begins on the (local) `date` """
+    # Roughly local noon, so that `tonight` gives the coming night
+    noon = Time(date) + (12 - observer.location.lon.degree / 15.) * u.hour
+
+    return observer.tonight(time=noon, horizon=horizon)
+
+
+def load_target_fields(targets_dir):
+    """ All the fields in the YAML files of `targets_dir`, without duplicate names """
+    fields = dict()
+    for fields_file in sorted(glob.glob(os.path.join(targets_dir, '*.yaml'))):
+        with open(fields_file, 'r') as f:
+            for field_config in yaml.safe_load(f) or list():
+                fields.setdefault(field_config['name'], field_config)
+
+    return list(fields.values())
+
+
+def synthetic_fields(num_fields, template_fields, latitude=0 * u.degree, seed=0):
+    """Make a catalog of `num_fields` fields.
+
+    The catalog starts with the `template_fields` and is filled out with
+    fields spread uniformly over the part of the sky that rises at `latitude`.
+    Exposure settings and priorities are copied from the templates in turn.
+
+    Args:
+        num_fields (int): Number of fields in the catalog.
+        template_fields (list): Field configs, e.g. from `load_target_fields`.
+        latitude (astropy.units.Quantity, optional): Latitude of the site.
+        seed (int, optional): Random seed, so catalogs are reproducible.
+
+    Returns:
+        list: Field configs.
+    """
+    fields = [dict(field) for field in template_fields[:num_fields]]
+
+    num_synthetic = num_fields - len(fields)
+    if num_synthetic <= 0:
+        return fields
+
+    lat = u.Quantity(latitude, u.degree).value
+    min_dec = max(-90., lat - 90.)
+    max_dec = min(90., lat + 90.)
+
+    random = np.random.RandomState(seed)
+    ra = random.uniform(0, 360, num_synthetic)
+    # Uniform on the sphere between the dec limits
+    dec = np.degrees(np.arcsin(random.uniform(np.sin(np.radians(min_dec)),
+                                              np.sin(np.radians(max_dec)),
+                                              num_synthetic)))
+
+    settings = ['exp_time', 'min_nexp', 'exp_set_size', 'priority']
+    for i in range(num_synthetic):
+        field = {'name': 'Synthetic {:06d}'.format(i),
+                 'position': '{:.5f}d {:+.5f}d'.format(ra[i], dec[i])}
+
+        if template_fields:
+            template = template_fields[i % len(template_fields)]
+            field.update({key: template[key] for key in settings if key in template})
+
+        fields.append(field)
+
+    return fields
+
+
+def simulate_night(scheduler, start_time, end_time, step=5 * u.minute, advance_by_set=True,
+                   trace_memory=False):
+    """Run `scheduler` over a night.
+
+    Args:
+        scheduler (`~pocs.scheduler.scheduler.BaseScheduler`): The scheduler,
+            with its fields already loaded.
+        start_time (astropy.time.Time): Start of the night.
+        end_time (astropy.time.Time): End of the night.
+        step (astropy.units.Quantity, optional): Time between passes when
+            nothing is observed, or always if `advance_by_set` is False.
+        advance_by_set (bool, optional): After selecting a field advance the
+            clock by its `set_duration`, as if it had been observed.
+        trace_memory (bool, optional): Track the peak Python memory use with
+            `tracemalloc`, which slows everything down. Default False.
+
+    Returns:
+        tuple: (latencies, constraint_costs, sequence, peak_traced)
+    """
+    costs = dict()
+    constraints = scheduler.constraints
+    scheduler.constraints = [_TimedConstraint(constraint, costs) for constraint in constraints]
+
+    latencies = list()
+    sequence = list()
+
+    if trace_memory:
+        tracemalloc.start()
+
+    try:
+        time = start_time
+        while time < end_time:
+            start = timer.perf_counter()
+            scheduler.get_observation(time=time)
+            latencies.append(timer.perf_counter() - start)
+
+            observation = scheduler.current_observation
+            sequence.append({
+                'time': time.isot,
+                'field': observation.name if observation is not None else None,
+                'merit': float(observation.merit) if observation is not None else None,
+            })
+
+            if observation is not None and advance_by_set:
+                time = time + observation.set_duration
+            else:
+                time = time + step
+    finally:
+        scheduler.constraints = constraints
+
+        peak_traced = None
+        if trace_memory:
+            peak_traced = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return latencies, costs, sequence, peak_traced
+
+
+def run_benchmark(sizes=(100, 1000, 10000), date=DEFAULT_DATE, step=5 * u.minute,
+                  advance_by_set=True, trace_memory=False, seed=0, config=None, log=None):
+    """Simulate a night for catalogs of each of `sizes`.
+
+    Args:
+        sizes (list, optional): Number of fields in each catalog.
+        date (str, optional): Local date the night starts on.
+        step (astropy.units.Quantity, optional): See `simulate_night`.
+        advance_by_set (bool, optional): See `simulate_night`.
+        trace_memory (bool, optional): See `simulate_night`.
+        seed (int, optional): Random seed for the synthetic catalogs.
+        config (dict, optional): Config to use, defaults to the loaded config.
+        log (callable, optional): Called with progress messages.
+
+    Returns:
+        list: A `BenchmarkResult` per catalog size.
+    """
+    if config is None:
+        from pocs.utils.config import load_config
+        config = load_config()
+
+    if log is None:
+        def log(msg):
+            pass
+
+    observer = get_observer(config)
+    start_time, end_time = get_night(
+        observer, date=date,
+        horizon=config['location'].get('twilight_horizon', -18 * u.degree))
+    log("Night of {}: {} to {}".format(date, start_time.isot, end_time.isot))
+
+    template_fields = load_target_fields(config['directories']['targets'])
+    module = load_module('pocs.scheduler.{}'.format(config['scheduler'].get('type', 'dispatch')))
+
+    results = list()
+    for num_fields in sizes:
+        fields = synthetic_fields(num_fields, template_fields,
+                                  latitude=observer.location.lat, seed=seed)
+
+        start = timer.perf_counter()
+        scheduler = module.Scheduler(observer, fields_list=fields,
+                                     constraints=get_constraints(config))
+        load_time = timer.perf_counter() - start
+        log("Loaded {} fields in {:.3f} s".format(num_fields, load_time))
+
+        latencies, costs, sequence, peak_traced = simulate_night(
+            scheduler, start_time, end_time, step=step, advance_by_set=advance_by_set,
+            trace_memory=trace_memory)
+
+        results.append(BenchmarkResult(num_fields, load_time, latencies, costs, sequence,
+                                       _peak_rss(), peak_traced=peak_traced))
+        log(results[-1].summary())
+
+    return results
+
+
+def _peak_rss():
+    """ Peak resident memory of this process in bytes """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Reported in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
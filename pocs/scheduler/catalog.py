@@ -0,0 +1,582 @@
+import hashlib
+import os
+import pickle
+import yaml
+
+from collections import namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+
+from pocs.scheduler.field import Field
+from pocs.scheduler.observation import Observation
+from pocs.utils import error
+
+# Use the much faster C YAML parser when PyYAML was built with libyaml
+try:
+    _YAMLLoader = yaml.CSafeLoader
+except AttributeError:  # pragma: no cover
+    _YAMLLoader = yaml.SafeLoader
+
+# Bump when the pickled `FieldCatalog` layout changes to invalidate old caches
+_CACHE_VERSION = 1
+
+# Columns and defaults, which match the `Observation` keyword defaults
+_DEFAULTS = {
+    'priority': 100.,
+    'exp_time': 120.,
+    'min_nexp': 60,
+    'exp_set_size': 10,
+}
+
+
+class FieldListDiff(namedtuple('FieldListDiff', ['added', 'removed', 'modified'])):
+
+    """ Names of the fields added, removed and modified between two field lists """
+
+    __slots__ = ()
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.modified)
+
+    def __str__(self):
+        return "{} added, {} removed, {} modified".format(
+            len(self.added), len(self.removed), len(self.modified))
+
+
+class FieldView(object):
+
+    """ A lightweight, read-only view of one row of a `FieldCatalog`
+
+    Has the attributes of an `~pocs.scheduler.observation.Observation` that
+    the constraints need, without the cost of creating a `Field` and an
+    `Observation`. Use `to_observation` to get the full object.
+    """
+
+    __slots__ = ('catalog', 'index')
+
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index = index
+
+    @property
+    def name(self):
+        return self.catalog.names[self.index]
+
+    @property
+    def coord(self):
+        return self.catalog.get_coord(self.index)
+
+    @property
+    def priority(self):
+        return float(self.catalog.priority[self.index])
+
+    @property
+    def exp_time(self):
+        return self.catalog.exp_time[self.index] * u.second
+
+    @property
+    def min_nexp(self):
+        return int(self.catalog.min_nexp[self.index])
+
+    @property
+    def exp_set_size(self):
+        return int(self.catalog.exp_set_size[self.index])
+
+    @property
+    def minimum_duration(self):
+        return self.catalog.minimum_duration[self.index] * u.second
+
+    @property
+    def set_duration(self):
+        return self.catalog.set_duration[self.index] * u.second
+
+    def to_observation(self):
+        """ Create the `Observation` for this row """
+        return self.catalog.make_observation(self.index)
+
+    def __str__(self):
+        return self.name
+
+
+class FieldCatalog(object):
+
+    """ Columnar store of field configurations
+
+    Creating a `~pocs.scheduler.field.Field` and an
+    `~pocs.scheduler.observation.Observation` for every entry in a fields file
+    is expensive, as each of them is a `PanBase`. The catalog instead keeps the
+    values the scheduler needs in numpy arrays (one row per field) and only
+    creates the full objects on request, e.g. for the selected observation.
+
+    The arrays are rebuilt lazily after the catalog is modified.
+    """
+
+    def __init__(self, field_configs=None):
+        # Tuples of (config, error message) for entries that couldn't be added
+        self.invalid = list()
+
+        self._configs = list()
+        self._names = list()
+        self._index = dict()
+        self._ra = list()
+        self._dec = list()
+        self._columns = {name: list() for name in _DEFAULTS}
+
+        self._arrays = None
+        self._coords = None
+
+        if field_configs:
+            self.invalid = [(config, str(e)) for config, e in self.extend(field_configs)]
+
+    @classmethod
+    def from_file(cls, path, use_cache=True):
+        """Load a YAML fields file, with a compiled cache next to it.
+
+        The parsed and validated catalog is pickled to a hidden `.cache` file
+        in the same folder, keyed on the size, modification time and content
+        hash of the YAML file. When only the modification time has changed the
+        hash is checked before the YAML is parsed again.
+
+        Args:
+            path (str): The YAML fields file.
+            use_cache (bool, optional): Read and write the cache, default True.
+
+        Returns:
+            FieldCatalog: The catalog; invalid entries are listed in `invalid`.
+        """
+        stat = os.stat(path)
+        cache_path = cls.cache_path(path)
+
+        cached = None
+        if use_cache:
+            try:
+                with open(cache_path, 'rb') as f:
+                    cached = pickle.load(f)
+
+                if cached['version'] != _CACHE_VERSION:
+                    cached = None
+            except Exception:
+                cached = None
+
+            if cached is not None and \
+                    (cached['size'], cached['mtime']) == (stat.st_size, stat.st_mtime_ns):
+                return cached['catalog']
+
+        with open(path, 'rb') as f:
+            contents = f.read()
+        digest = hashlib.sha1(contents).hexdigest()
+
+        if cached is not None and cached['sha1'] == digest:
+            # Touched but not changed
+            catalog = cached['catalog']
+        else:
+            catalog = cls(yaml.load(contents, Loader=_YAMLLoader) or list())
+
+        if use_cache:
+            try:
+                tmp_path = cache_path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump({
+                        'version': _CACHE_VERSION,
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime_ns,
+                        'sha1': digest,
+                        'catalog': catalog,
+                    }, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                # e.g. a read-only folder, just don't cache
+                pass
+
+        return catalog
+
+    @staticmethod
+    def cache_path(path):
+        """ The compiled cache file for the fields file at `path` """
+        directory, filename = os.path.split(os.path.abspath(path))
+        return os.path.join(directory, '.{}.cache'.format(filename))
+
+##################################################################################################
+# Properties
+##################################################################################################
+
+    @property
+    def names(self):
+        """ Field names in row order """
+        return self._names
+
+    @property
+    def configs(self):
+        """ The field configuration dicts in row order """
+        return self._configs
+
+    @property
+    def ra(self):
+        return self._get_array('ra')
+
+    @property
+    def dec(self):
+        return self._get_array('dec')
+
+    @property
+    def priority(self):
+        return self._get_array('priority')
+
+    @property
+    def exp_time(self):
+        """ Exposure times in seconds """
+        return self._get_array('exp_time')
+
+    @property
+    def min_nexp(self):
+        return self._get_array('min_nexp')
+
+    @property
+    def exp_set_size(self):
+        return self._get_array('exp_set_size')
+
+    @property
+    def minimum_duration(self):
+        """ Minimum duration of each observation in seconds """
+        return self._get_array('minimum_duration')
+
+    @property
+    def set_duration(self):
+        """ Duration of a set of exposures in seconds """
+        return self._get_array('set_duration')
+
+    @property
+    def coords(self):
+        """ `SkyCoord` array of all fields in row order """
+        if self._coords is None:
+            self._coords = SkyCoord(ra=self.ra * u.degree, dec=self.dec * u.degree, frame='icrs')
+
+        return self._coords
+
+##################################################################################################
+# Methods
+##################################################################################################
+
+    def append(self, field_config):
+        """Add or replace a field.
+
+        A field with the same name as an existing one replaces that row.
+
+        Args:
+            field_config (dict): Configuration items for the `Observation`.
+
+        Returns:
+            int: The row of the field.
+
+        Raises:
+            error.InvalidObservation: If the config isn't a valid observation.
+        """
+        values = self._validate(field_config)
+        coord = self._parse_positions([field_config])[0]
+
+        return self._set_row(field_config, values, coord.ra.degree, coord.dec.degree)
+
+    def extend(self, field_configs):
+        """Add or replace many fields at once.
+
+        The positions are parsed in a single batch, which is much quicker than
+        one at a time. Invalid entries are skipped.
+
+        Args:
+            field_configs (list): A list of field configuration dicts.
+
+        Returns:
+            list: Tuples of (config, exception) for the entries that were skipped.
+        """
+        rows = list()
+        invalid = list()
+        for field_config in field_configs:
+            try:
+                rows.append((field_config, self._validate(field_config)))
+            except Exception as e:
+                invalid.append((field_config, e))
+
+        if not rows:
+            return invalid
+
+        try:
+            coords = self._parse_positions([config for config, _ in rows])
+            ra = coords.ra.degree
+            dec = coords.dec.degree
+        except Exception:
+            # Find the bad positions one at a time
+            ra = list()
+            dec = list()
+            for field_config, values in list(rows):
+                try:
+                    coord = self._parse_positions([field_config])
+                    ra.append(coord.ra.degree[0])
+                    dec.append(coord.dec.degree[0])
+                except Exception as e:
+                    rows.remove((field_config, values))
+                    invalid.append((field_config, error.InvalidObservation(
+                        "Invalid position: {}".format(e))))
+
+        for i, (field_config, values) in enumerate(rows):
+            self._set_row(field_config, values, ra[i], dec[i])
+
+        return invalid
+
+    def update(self, other, names=None):
+        """Add or replace the fields of another catalog.
+
+        Copies the already parsed rows of `other`, so no positions are parsed.
+
+        Args:
+            other (FieldCatalog): The catalog to copy the rows from.
+            names (list, optional): Only copy these fields, defaults to all.
+        """
+        if names is None:
+            names = other.names
+
+        for name in names:
+            row = other.index(name)
+            values = {column: other._columns[column][row] for column in _DEFAULTS}
+            self._set_row(other._configs[row], values, other._ra[row], other._dec[row])
+
+    def diff(self, other, removable=None):
+        """Compare the fields of this catalog with `other`.
+
+        Args:
+            other (FieldCatalog): The new catalog.
+            removable (set, optional): Only fields in this set count as removed
+                when they aren't in `other`, defaults to all fields.
+
+        Returns:
+            FieldListDiff: Names of the fields in `other` that aren't in this
+                catalog (added), that are only in this catalog (removed) and
+                that are in both but differ (modified).
+        """
+        added = list()
+        modified = list()
+        for row, name in enumerate(other.names):
+            own_row = self.index(name)
+            if own_row is None:
+                added.append(name)
+            elif not self._same_row(own_row, other, row):
+                modified.append(name)
+
+        removed = [name for name in self._names
+                   if name not in other and (removable is None or name in removable)]
+
+        return FieldListDiff(added, removed, modified)
+
+    def remove(self, name):
+        """Remove the field called `name`.
+
+        Raises:
+            KeyError: If there is no such field.
+        """
+        row = self._index.pop(name)
+
+        for column in [self._configs, self._names, self._ra, self._dec] + \
+                list(self._columns.values()):
+            del column[row]
+
+        # Everything after the removed row moves up one
+        for later_name in self._names[row:]:
+            self._index[later_name] -= 1
+
+        self._modified()
+
+    def index(self, name):
+        """ The row of the field called `name`, or None """
+        return self._index.get(name)
+
+    def get_coord(self, row):
+        """ `SkyCoord` of a single row, without building the `coords` array """
+        return SkyCoord(ra=self._ra[row] * u.degree, dec=self._dec[row] * u.degree, frame='icrs')
+
+    def view(self, row):
+        """ A `FieldView` of `row` """
+        return FieldView(self, row)
+
+    def views(self):
+        """ A list of `FieldView`s of every row """
+        return [FieldView(self, row) for row in range(len(self))]
+
+    def make_observation(self, row):
+        """Create the `Observation` (and `Field`) for `row`.
+
+        Raises:
+            error.InvalidObservation: If the `Observation` can't be created.
+        """
+        field_config = dict(self._configs[row])
+        field_config['exp_time'] = self._columns['exp_time'][row] * u.second
+
+        field = Field(field_config['name'], field_config['position'])
+
+        try:
+            return Observation(field, **field_config)
+        except Exception:
+            raise error.InvalidObservation(
+                "Skipping invalid field config: {}".format(field_config))
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+
+        # Rebuilt on demand
+        state['_arrays'] = None
+        state['_coords'] = None
+
+        return state
+
+    def __len__(self):
+        return len(self._names)
+
+    def __str__(self):
+        return "FieldCatalog: {} fields".format(len(self))
+
+##################################################################################################
+# Private Methods
+##################################################################################################
+
+    def _validate(self, field_config):
+        """Check a config with the same rules as `Field` and `Observation`.
+
+        Returns:
+            dict: The column values for the field.
+        """
+        try:
+            name = field_config['name']
+            field_config['position']
+
+            if not name.title().replace(' ', '').replace('-', ''):
+                raise ValueError('Name is empty')
+
+            values = dict()
+            for column, default in _DEFAULTS.items():
+                value = field_config.get(column, default)
+                if column == 'exp_time':
+                    value = u.Quantity(value, u.second).value
+
+                values[column] = type(default)(value)
+
+            assert values['exp_time'] > 0.0, "Exposure time (exp_time) must be greater than 0"
+            assert values['min_nexp'] % values['exp_set_size'] == 0, \
+                "Minimum number of exposures (min_nexp) must be multiple of set size (exp_set_size)"
+            assert values['priority'] > 0.0, "Priority must be 1.0 or larger"
+        except Exception as e:
+            raise error.InvalidObservation(
+                "Skipping invalid field config: {} ({})".format(field_config, e))
+
+        return values
+
+    def _same_row(self, row, other, other_row):
+        """ If `row` holds the same field as `other_row` of `other` """
+        if (self._ra[row], self._dec[row]) != (other._ra[other_row], other._dec[other_row]):
+            return False
+
+        if any(self._columns[column][row] != other._columns[column][other_row]
+               for column in _DEFAULTS):
+            return False
+
+        try:
+            return bool(self._configs[row] == other._configs[other_row])
+        except Exception:
+            return False
+
+    def _parse_positions(self, field_configs):
+        """ Parse the `position` of each config into one `SkyCoord` """
+        return SkyCoord([config['position'] for config in field_configs], frame='icrs')
+
+    def _set_row(self, field_config, values, ra, dec):
+        name = field_config['name']
+
+        row = self._index.get(name)
+        if row is None:
+            row = len(self._names)
+            self._index[name] = row
+            self._names.append(name)
+            self._configs.append(field_config)
+            self._ra.append(ra)
+            self._dec.append(dec)
+            for column, value in values.items():
+                self._columns[column].append(value)
+        else:
+            self._configs[row] = field_config
+            self._ra[row] = ra
+            self._dec[row] = dec
+            for column, value in values.items():
+                self._columns[column][row] = value
+
+        self._modified()
+
+        return row
+
+    def _modified(self):
+        self._arrays = None
+        self._coords = None
+
+    def _get_array(self, name):
+        if self._arrays is None:
+            arrays = {column: np.array(values, dtype=type(_DEFAULTS[column]))
+                      for column, values in self._columns.items()}
+            arrays['ra'] = np.array(self._ra, dtype=float)
+            arrays['dec'] = np.array(self._dec, dtype=float)
+            arrays['minimum_duration'] = arrays['exp_time'] * arrays['min_nexp']
+            arrays['set_duration'] = arrays['exp_time'] * arrays['exp_set_size']
+
+            self._arrays = arrays
+
+        return self._arrays[name]
+
+
+class CatalogObservations(Mapping):
+
+    """ Read-only mapping of field name to `Observation` backed by a `FieldCatalog`
+
+    The `Observation` for a field is created the first time it is looked up and
+    kept until its row in the catalog is replaced or removed (see `discard`),
+    so exposure lists and merits of selected observations are preserved.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._cache = dict()
+
+    def discard(self, name):
+        """ Forget the `Observation` created for `name`, if any """
+        self._cache.pop(name, None)
+
+    def is_created(self, name):
+        """ If the `Observation` for `name` has already been created """
+        return name in self._cache
+
+    def created(self):
+        """ (name, `Observation`) pairs of the observations created so far """
+        return list(self._cache.items())
+
+    def __getitem__(self, name):
+        try:
+            return self._cache[name]
+        except KeyError:
+            row = self.catalog.index(name)
+            if row is None:
+                raise
+
+        observation = self.catalog.make_observation(row)
+        self._cache[name] = observation
+
+        return observation
+
+    def __contains__(self, name):
+        return name in self.catalog
+
+    def __iter__(self):
+        return iter(list(self.catalog.names))
+
+    def __len__(self):
+        return len(self.catalog)
@@ -1,7 +1,14 @@
+import numpy as np
+import time as timer
+
 from astropy import units as u
+from astropy.coordinates import get_moon
+from collections import OrderedDict
 
 from pocs.utils import horizon as horizon_utils
 from pocs.base import PanBase
+from pocs.scheduler import visibility
+from pocs.scheduler.catalog import FieldView
 
 
 class BaseConstraint(PanBase):
@@ -33,6 +40,68 @@ class BaseConstraint(PanBase):
     def get_score(self, time, observer, target):
         raise NotImplementedError
 
+    def get_scores(self, time, observer, observations, **kwargs):
+        """Get the veto and score for a batch of observations.
+
+        Subclasses should override this with a vectorized implementation that
+        works on the stacked `coords` of all the fields. The default simply
+        calls `get_score` once per observation.
+
+        Args:
+            time (astropy.time.Time): Time at which to score the observations.
+            observer (astroplan.Observer): The observer location.
+            observations (list): A list of `~pocs.scheduler.observation.Observation`
+                or `~pocs.scheduler.catalog.FieldView`.
+            **kwargs: Common properties shared by all constraints, e.g. `moon`,
+                `end_of_night`, `observed_list`. If present, `coords` is a
+                `SkyCoord` array of the field positions in `observations` order.
+                If `ephemeris` (a `~pocs.scheduler.ephemeris.FieldEphemeris`)
+                or `visibility_windows` (a
+                `~pocs.scheduler.visibility.VisibilityWindows`) are given then
+                `field_index` gives the row of each observation in them, as
+                it does for `sky_index` (a `~pocs.scheduler.index.SkyIndex`)
+                and `catalog` (a `~pocs.scheduler.catalog.FieldCatalog`).
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): Boolean veto array and float
+                score array (already multiplied by the `weight`), one entry
+                per observation.
+        """
+        vetoes = np.zeros(len(observations), dtype=bool)
+        scores = np.zeros(len(observations), dtype=float)
+
+        for i, observation in enumerate(observations):
+            if isinstance(observation, FieldView):
+                # `get_score` needs the full `Observation`
+                observation = observation.to_observation()
+
+            vetoes[i], scores[i] = self.get_score(time, observer, observation, **kwargs)
+
+        return vetoes, scores
+
+    def _get_coords(self, observations, kwargs):
+        """Return the stacked field coordinates, building them if not supplied."""
+        coords = kwargs.get('coords')
+        if coords is None:
+            coords = visibility.stack_coords(observations)
+
+        return coords
+
+    def _get_altaz(self, time, observer, observations, kwargs):
+        """Return the (alt, az) of the fields in degrees.
+
+        Interpolates from the nightly ephemeris when one is supplied that
+        covers `time`, otherwise does the full coordinate transform.
+        """
+        ephemeris = kwargs.get('ephemeris')
+        field_index = kwargs.get('field_index')
+        if ephemeris is not None and field_index is not None and ephemeris.covers(time):
+            return ephemeris.altaz(time, index=field_index)
+
+        altaz = observer.altaz(time, target=self._get_coords(observations, kwargs))
+
+        return altaz.alt.degree, altaz.az.degree
+
 
 class Altitude(BaseConstraint):
 
@@ -64,6 +133,19 @@ class Altitude(BaseConstraint):
             score = 100
         return veto, score * self.weight
 
+    def get_scores(self, time, observer, observations, **kwargs):
+        target_alt, target_az = self._get_altaz(time, observer, observations, kwargs)
+
+        # Note we just get nearest integer
+        target_az = target_az.astype(int) % 360
+
+        min_alt = np.asarray(self.horizon_line)[target_az]
+        vetoes = target_alt < min_alt
+
+        scores = np.where(vetoes, self._score, 100.)
+
+        return vetoes, scores * self.weight
+
     def __str__(self):
         return "Altitude"
 
@@ -83,8 +165,9 @@ class Duration(BaseConstraint):
 
         veto = not observer.target_is_up(time, target, horizon=self.horizon)
 
-        end_of_night = kwargs.get('end_of_night',
-                                  observer.tonight(time=time, horizon=-18 * u.degree)[1])
+        end_of_night = kwargs.get('end_of_night')
+        if end_of_night is None:
+            end_of_night = observer.tonight(time=time, horizon=-18 * u.degree)[1]
 
         if not veto:
             # Get the next meridian flip
@@ -123,6 +206,60 @@ class Duration(BaseConstraint):
 
         return veto, score * self.weight
 
+    def get_scores(self, time, observer, observations, **kwargs):
+        end_of_night = kwargs.get('end_of_night')
+        if end_of_night is None:
+            end_of_night = observer.tonight(time=time, horizon=-18 * u.degree)[1]
+
+        catalog = kwargs.get('catalog')
+        field_index = kwargs.get('field_index')
+
+        if catalog is not None and field_index is not None:
+            min_duration = catalog.minimum_duration[field_index]
+        else:
+            min_duration = np.array([obs.minimum_duration.value for obs in observations],
+                                    dtype=float)
+
+        windows = kwargs.get('visibility_windows')
+
+        if windows is not None and field_index is not None and \
+                windows.horizon == self.horizon and windows.covers(time):
+            # Everything comes straight from the nightly table
+            is_up = windows.is_up(time, index=field_index)
+            target_meridian = windows.next_transit(time, index=field_index)
+            target_end_time = windows.next_set(time, index=field_index)
+        else:
+            coords = self._get_coords(observations, kwargs)
+
+            altaz = self._get_altaz(time, observer, observations, kwargs)
+            is_up = altaz[0] > self.horizon.to(u.degree).value
+
+            # Get the next meridian flip and set time
+            target_meridian = visibility.transit_times(time, observer, coords, altaz=altaz)
+            target_end_time = visibility.set_times(time, observer, coords,
+                                                   horizon=self.horizon, altaz=altaz)
+
+        vetoes = ~is_up
+
+        # If it flips before end_of_night it hasn't flipped yet, so if the target
+        # can't meet the minimum duration before the flip, veto
+        min_end = time.jd + min_duration / 86400.
+        vetoes |= is_up & (target_meridian < end_of_night.jd) & (min_end > target_meridian)
+
+        # Use end_of_night if the target sets after it
+        target_end_time = np.fmin(target_end_time, end_of_night.jd)
+
+        # Total seconds is score
+        with np.errstate(invalid='ignore'):
+            scores = (target_end_time - time.jd) * 86400.
+            vetoes |= is_up & (scores < min_duration)
+
+        # Normalize the score based on total possible number of seconds
+        scores = scores / (end_of_night - time).sec
+        scores[~is_up] = self._score
+
+        return vetoes, scores * self.weight
+
     def __str__(self):
         return "Duration above {}".format(self.horizon)
 
@@ -136,10 +273,7 @@ class MoonAvoidance(BaseConstraint):
         veto = False
         score = self._score
 
-        try:
-            moon = kwargs['moon']
-        except KeyError:
-            self.logger.error("Moon must be set")
+        moon = self._get_moon(time, observer, kwargs)
 
         moon_sep = moon.separation(observation.field.coord).value
 
@@ -152,9 +286,98 @@ class MoonAvoidance(BaseConstraint):
 
         return veto, score * self.weight
 
+    def get_scores(self, time, observer, observations, **kwargs):
+        moon = self._get_moon(time, observer, kwargs)
+
+        sky_index = kwargs.get('sky_index')
+        field_index = kwargs.get('field_index')
+
+        if sky_index is not None and field_index is not None:
+            # This would potentially be within image
+            near_moon = sky_index.query_radius(moon, 15 * u.degree)
+            vetoes = np.isin(field_index, near_moon)
+
+            moon_sep = sky_index.separation(moon, index=field_index)
+        else:
+            moon_sep = moon.separation(self._get_coords(observations, kwargs)).value
+
+            # This would potentially be within image
+            vetoes = moon_sep < 15
+
+        scores = np.where(vetoes, self._score, moon_sep / 180)
+
+        return vetoes, scores * self.weight
+
     def __str__(self):
         return "Moon Avoidance"
 
+    def _get_moon(self, time, observer, kwargs):
+        """Return the Moon at `time`, computing it if not supplied."""
+        moon = kwargs.get('moon')
+        if moon is None:
+            moon = get_moon(time, observer.location)
+
+        return moon
+
+
+class SlewDistance(BaseConstraint):
+
+    """ Favor fields close to the current observation
+
+    Fields within `max_separation` of the current observation get a score
+    that falls linearly from 1 at the current position to 0 at `max_separation`,
+    which cuts down on long slews between observations. Nothing is vetoed.
+    """
+
+    @u.quantity_input(max_separation=u.degree)
+    def __init__(self, max_separation=30 * u.degree, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_separation = max_separation
+
+    def get_score(self, time, observer, observation, **kwargs):
+        score = self._score
+
+        current_observation = kwargs.get('current_observation')
+        if current_observation is not None:
+            separation = current_observation.field.coord.separation(observation.field.coord)
+            if separation < self.max_separation:
+                score = 1 - (separation / self.max_separation).decompose().value
+
+        return False, score * self.weight
+
+    def get_scores(self, time, observer, observations, **kwargs):
+        vetoes = np.zeros(len(observations), dtype=bool)
+        scores = np.full(len(observations), self._score, dtype=float)
+
+        current_observation = kwargs.get('current_observation')
+        if current_observation is None:
+            return vetoes, scores * self.weight
+
+        sky_index = kwargs.get('sky_index')
+        field_index = kwargs.get('field_index')
+        current_coord = current_observation.field.coord
+        max_separation = self.max_separation.to(u.degree).value
+
+        if sky_index is not None and field_index is not None:
+            # Only look at the fields close to the current one
+            nearby = sky_index.query_radius(current_coord, self.max_separation)
+            is_nearby = np.isin(field_index, nearby)
+
+            separation = sky_index.separation(current_coord, index=field_index[is_nearby])
+            is_nearby[is_nearby] = separation < max_separation
+            separation = separation[separation < max_separation]
+        else:
+            separation = current_coord.separation(self._get_coords(observations, kwargs)).degree
+            is_nearby = separation < max_separation
+            separation = separation[is_nearby]
+
+        scores[is_nearby] = 1 - separation / max_separation
+
+        return vetoes, scores * self.weight
+
+    def __str__(self):
+        return "Slew Distance within {}".format(self.max_separation)
+
 
 class AlreadyVisited(BaseConstraint):
 
@@ -173,12 +396,229 @@ class AlreadyVisited(BaseConstraint):
 
         observed_list = kwargs.get('observed_list')
 
-        observed_field_list = [obs.field for obs in observed_list.values()]
-
-        if observation.field in observed_field_list:
+        if any(obs.name == observation.name for obs in observed_list.values()):
             veto = True
 
         return veto, score * self.weight
 
+    def get_scores(self, time, observer, observations, **kwargs):
+        observed_list = kwargs.get('observed_list')
+        catalog = kwargs.get('catalog')
+        field_index = kwargs.get('field_index')
+
+        if catalog is not None and field_index is not None:
+            # Look up the rows of the few observed fields, not the name of every field
+            observed_rows = [catalog.index(obs.name) for obs in observed_list.values()]
+            vetoes = np.isin(field_index, [row for row in observed_rows if row is not None])
+        else:
+            observed_names = set(obs.name for obs in observed_list.values())
+            vetoes = np.array([obs.name in observed_names for obs in observations], dtype=bool)
+
+        scores = np.full(len(vetoes), self._score, dtype=float)
+
+        return vetoes, scores * self.weight
+
     def __str__(self):
         return "Already Visited"
+
+
+class Cadence(BaseConstraint):
+
+    """ Revisit fields at a regular interval
+
+    Fields that were last visited less than `interval` ago, according to the
+    `history` (a `~pocs.scheduler.history.ObservationHistory`), are vetoed.
+    After that the score rises from 0 to 1 over another `interval`, favoring
+    the fields that are most overdue. Fields that were never visited score 1.
+    """
+
+    @u.quantity_input(interval=u.hour)
+    def __init__(self, interval=1 * u.day, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.interval = interval
+
+    def get_score(self, time, observer, observation, **kwargs):
+        vetoes, scores = self._get_scores(time, [observation.name], kwargs.get('history'))
+
+        return bool(vetoes[0]), float(scores[0])
+
+    def get_scores(self, time, observer, observations, **kwargs):
+        catalog = kwargs.get('catalog')
+        field_index = kwargs.get('field_index')
+        if catalog is not None and field_index is not None:
+            names = [catalog.names[i] for i in field_index]
+        else:
+            names = [obs.name for obs in observations]
+
+        return self._get_scores(time, names, kwargs.get('history'))
+
+    def _get_scores(self, time, names, history):
+        if history is None:
+            return np.zeros(len(names), dtype=bool), np.full(len(names), self._score * self.weight)
+
+        elapsed = time.jd - history.last_visits(names)
+        never_visited = np.isnan(elapsed)
+        elapsed[never_visited] = np.inf
+
+        overdue = elapsed / self.interval.to(u.day).value - 1
+        vetoes = overdue < 0
+        scores = np.where(vetoes, self._score, np.clip(overdue, 0, 1))
+
+        return vetoes, scores * self.weight
+
+    def __str__(self):
+        return "Cadence of {}".format(self.interval)
+
+
+class ConstraintStats(object):
+
+    """ Running totals of the time spent in, and the vetoes from, each constraint
+
+    Constraints are identified by their `str`. The totals are used by `order`
+    to evaluate cheap constraints that veto a lot of fields first, so that
+    expensive ones only see the fields that are left.
+    """
+
+    def __init__(self):
+        self._totals = OrderedDict()
+
+    def record(self, name, elapsed, scored, vetoed):
+        """Add one call of a constraint
+
+        Args:
+            name (str): The constraint.
+            elapsed (float): Seconds spent in `get_scores`.
+            scored (int): Number of fields scored.
+            vetoed (int): Number of those fields vetoed.
+        """
+        totals = self._totals.setdefault(name, {'calls': 0, 'time': 0., 'scored': 0, 'vetoed': 0})
+        totals['calls'] += 1
+        totals['time'] += elapsed
+        totals['scored'] += scored
+        totals['vetoed'] += vetoed
+
+    def merge(self, other):
+        """ Add the totals of another `ConstraintStats`, e.g. from a worker process """
+        for name, totals in other._totals.items():
+            mine = self._totals.setdefault(name, {'calls': 0, 'time': 0., 'scored': 0, 'vetoed': 0})
+            for key, value in totals.items():
+                mine[key] += value
+
+    def order(self, constraints):
+        """Evaluation order for `constraints`, as indices into the list
+
+        Constraints are sorted by the fraction of fields they veto per second
+        spent on a field, highest first. Ones that haven't scored anything yet
+        go first so they are measured. Ties keep the order of `constraints`.
+        """
+        def rank(i):
+            totals = self._totals.get(str(constraints[i]))
+            if totals is None or totals['scored'] == 0:
+                return -np.inf
+
+            veto_rate = totals['vetoed'] / totals['scored']
+            time_per_field = max(totals['time'] / totals['scored'], 1e-9)
+
+            return -veto_rate / time_per_field
+
+        return sorted(range(len(constraints)), key=lambda i: (rank(i), i))
+
+    def reset(self):
+        self._totals = OrderedDict()
+
+    def to_dict(self):
+        """ The totals along with the time per field and veto rate of each constraint """
+        stats = OrderedDict()
+        for name, totals in self._totals.items():
+            stats[name] = dict(totals)
+            stats[name]['time_per_field'] = totals['time'] / max(totals['scored'], 1)
+            stats[name]['veto_rate'] = totals['vetoed'] / max(totals['scored'], 1)
+
+        return stats
+
+    def __len__(self):
+        return len(self._totals)
+
+
+def apply_constraints(constraints, time, observer, catalog, rows, common_properties, logger=None,
+                      order=None, stats=None):
+    """Score the `rows` of `catalog` with each of `constraints` in turn
+
+    Each constraint only scores the fields that haven't been vetoed yet. Every
+    field is scored independently, so scoring the rows in pieces and joining
+    the results gives exactly the same answer as scoring them all at once.
+
+    The constraints can be evaluated in any `order` without changing the
+    result: a field is kept only if no constraint vetoes it, and the scores
+    of the fields that are kept are always added up in the order of
+    `constraints`.
+
+    Args:
+        constraints (list): The `BaseConstraint`s to apply.
+        time (astropy.time.Time): The time to score at.
+        observer (astroplan.Observer): The observer location.
+        catalog (`~pocs.scheduler.catalog.FieldCatalog`): The fields.
+        rows (numpy.ndarray): Catalog rows to score.
+        common_properties (dict): Passed on to each constraint.
+        logger (logging.Logger, optional): For progress messages.
+        order (list, optional): Indices into `constraints` to evaluate them
+            in, see `ConstraintStats.order`. Defaults to the given order.
+        stats (ConstraintStats, optional): Records the time spent in and the
+            vetoes from each constraint.
+
+    Returns:
+        tuple: The rows that weren't vetoed and their merits, which start at
+            1.0 and don't include the priority.
+    """
+    obs_list = catalog.views()
+    coords = catalog.coords
+    rows = np.asarray(rows, dtype=int)
+
+    if order is None:
+        order = range(len(constraints))
+
+    # All observations start valid with a merit of 1.0
+    is_valid = np.ones(len(rows), dtype=bool)
+    constraint_scores = np.zeros((len(constraints), len(rows)), dtype=float)
+
+    for i in order:
+        constraint = constraints[i]
+
+        # Only score the observations that haven't been vetoed yet
+        valid = np.flatnonzero(is_valid)
+        if len(valid) == 0:
+            break
+
+        if logger is not None:
+            logger.info("Checking Constraint: {}".format(constraint))
+
+        valid_idx = rows[valid]
+        start = timer.perf_counter()
+        vetoes, scores = constraint.get_scores(
+            time,
+            observer,
+            [obs_list[j] for j in valid_idx],
+            coords=coords[valid_idx],
+            field_index=valid_idx,
+            catalog=catalog,
+            **common_properties)
+        elapsed = timer.perf_counter() - start
+
+        num_vetoed = np.count_nonzero(vetoes)
+        if stats is not None:
+            stats.record(str(constraint), elapsed, len(valid_idx), num_vetoed)
+
+        if logger is not None:
+            logger.debug("\t{} of {} observations vetoed by {}".format(
+                num_vetoed, len(valid_idx), constraint))
+
+        is_valid[valid[vetoes]] = False
+        constraint_scores[i, valid[~vetoes]] = scores[~vetoes]
+
+    valid = np.flatnonzero(is_valid)
+
+    merits = np.ones(len(valid), dtype=float)
+    for scores in constraint_scores:
+        merits += scores[valid]
+
+    return rows[valid], merits
@@ -1,9 +1,4 @@
-from astropy import units as u
-
-from astropy.coordinates import get_moon
-
 from pocs.utils import current_time
-from pocs.utils import listify
 from pocs.scheduler import BaseScheduler
 
 
@@ -33,50 +28,35 @@ class Scheduler(BaseScheduler):
             reread_fields_file (bool, optional): If the fields file should be reread
                 before scheduling occurs, defaults to False.
 
+        Note:
+            If the `memo` is enabled, the ranking of a pass less than
+            `scheduler.memo.bucket` seconds before `time` is reused as long as
+            the observed list, the fields and the constraints haven't changed.
+
         Returns:
             tuple or list: A tuple (or list of tuples) with name and score of ranked observations
         """
         if reread_fields_file:
             self.logger.debug("Rereading fields file")
-            self.read_field_list()
+            diff = self.read_field_list()
+            if diff:
+                self.logger.info("Fields file changed: {}".format(diff))
 
         if time is None:
             time = current_time()
 
-        valid_obs = {obs: 1.0 for obs in self.observations}
-        best_obs = []
-
-        common_properties = {
-            'end_of_night': self.observer.tonight(time=time, horizon=-18 * u.degree)[-1],
-            'moon': get_moon(time, self.observer.location),
-            'observed_list': self.observed_list
-        }
-
-        for constraint in listify(self.constraints):
-            self.logger.info("Checking Constraint: {}".format(constraint))
-            for obs_name, observation in self.observations.items():
-                if obs_name in valid_obs:
-                    self.logger.debug("\tObservation: {}".format(obs_name))
-
-                    veto, score = constraint.get_score(
-                        time, self.observer, observation, **common_properties)
-
-                    self.logger.debug("\t\tScore: {:.05f}\tVeto: {}".format(score, veto))
-
-                    if veto:
-                        self.logger.debug("\t\t{} vetoed by {}".format(obs_name, constraint))
-                        del valid_obs[obs_name]
-                        continue
+        memoized = None
+        if self.memo is not None:
+            memoized = self.memo.get(time, key=self._memo_key())
 
-                    valid_obs[obs_name] += score
-
-        for obs_name, score in valid_obs.items():
-            valid_obs[obs_name] += self.observations[obs_name].priority
+        if memoized is None:
+            ranked_obs, end_of_night = self._rank_observations(time)
+        else:
+            ranked_obs, end_of_night = memoized
 
-        if len(valid_obs) > 0:
-            # Sort the list by highest score (reverse puts in correct order)
-            best_obs = sorted(valid_obs.items(), key=lambda x: x[1])[::-1]
+        best_obs = list(ranked_obs)
 
+        if len(best_obs) > 0:
             top_obs_name, top_obs_merit = best_obs[0]
 
             # Check new best against current_observation
@@ -99,7 +79,7 @@ class Scheduler(BaseScheduler):
             if self.current_observation is not None:
                 # Favor the current observation if still available
                 end_of_next_set = time + self.current_observation.set_duration
-                if end_of_next_set < common_properties['end_of_night'] and \
+                if end_of_next_set < end_of_night and \
                         self.observation_available(self.current_observation, end_of_next_set):
 
                     self.logger.debug("Reusing {}".format(self.current_observation))
@@ -108,6 +88,10 @@ class Scheduler(BaseScheduler):
                     self.logger.warning("No valid observations found")
                     self.current_observation = None
 
+        if memoized is None and self.memo is not None:
+            # After setting the current observation, which can invalidate the memo
+            self.memo.store(time, (ranked_obs, end_of_night), key=self._memo_key())
+
         if not show_all and len(best_obs) > 0:
             best_obs = best_obs[0]
 
@@ -121,3 +105,12 @@ class Scheduler(BaseScheduler):
 ##########################################################################
 # Private Methods
 ##########################################################################
+
+    def _rank_observations(self, time):
+        """Score the catalog at `time`, see `rank_fields`
+
+        Returns:
+            tuple: The valid observations as (name, merit) from the highest
+                merit down, and the end of the night.
+        """
+        return self.rank_fields(time, self.observed_list, self.current_observation)
@@ -0,0 +1,121 @@
+import numpy as np
+
+from astropy import units as u
+from astropy.time import Time
+
+
+class FieldEphemeris(object):
+
+    """ Alt/az of every field on a coarse time grid covering a single night
+
+    The positions of fixed fields are deterministic for a given site and night,
+    so rather than running the astropy coordinate transforms on every
+    scheduling pass they are computed once for every field on a regular grid
+    (e.g. every 5 minutes from dusk to dawn). Lookups at arbitrary times
+    inside the night linearly interpolate between the two nearest grid points.
+
+    The ephemeris doesn't watch the field list; the owner (see
+    `~pocs.scheduler.scheduler.BaseScheduler.get_ephemeris`) is responsible
+    for throwing it away when the fields or the night change.
+    """
+
+    @u.quantity_input(step=u.minute)
+    def __init__(self, observer, names, coords, start_time, end_time, step=5 * u.minute):
+        """Compute the alt/az grid.
+
+        Args:
+            observer (`astroplan.Observer`): The site the fields are observed from.
+            names (list): Field names, one per entry in `coords`.
+            coords (`astropy.coordinates.SkyCoord`): Stacked field coordinates.
+            start_time (`astropy.time.Time`): Start of the night (e.g. dusk).
+            end_time (`astropy.time.Time`): End of the night (e.g. dawn).
+            step (`astropy.units.Quantity`, optional): Spacing of the time grid,
+                defaults to 5 minutes.
+        """
+        assert len(names) == len(coords), "Must have one name per coordinate"
+
+        self.observer = observer
+        self.names = list(names)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.step = step
+
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+        # Make sure the grid reaches past the end of the night
+        step_days = step.to(u.day).value
+        num_steps = int(np.ceil((end_time.jd - start_time.jd) / step_days)) + 1
+        self._jd = start_time.jd + np.arange(num_steps) * step_days
+
+        if len(coords):
+            altaz = observer.altaz(Time(self._jd, format='jd'), coords, grid_times_targets=True)
+            self._alt = np.atleast_2d(altaz.alt.degree)
+            # Unwrap the azimuth along the time axis so interpolation across
+            # north doesn't go the long way around.
+            self._az = np.degrees(np.unwrap(np.atleast_2d(altaz.az.radian), axis=1))
+        else:
+            self._alt = np.zeros((0, num_steps))
+            self._az = np.zeros((0, num_steps))
+
+##################################################################################################
+# Properties
+##################################################################################################
+
+    @property
+    def times(self):
+        """ The grid times """
+        return Time(self._jd, format='jd')
+
+##################################################################################################
+# Methods
+##################################################################################################
+
+    def covers(self, time):
+        """ If `time` falls inside the computed grid """
+        return self._jd[0] <= time.jd <= self._jd[-1]
+
+    def index(self, name):
+        """ The row for the field called `name`, or None if not in the ephemeris """
+        return self._index.get(name)
+
+    def altaz(self, time, index=None):
+        """Interpolated altitude and azimuth of the fields at `time`.
+
+        Args:
+            time (`astropy.time.Time`): A scalar time inside the night.
+            index (int or array, optional): Row(s) of the fields to return,
+                defaults to all fields.
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray): Altitude and azimuth in degrees.
+
+        Raises:
+            ValueError: If `time` is outside of the grid.
+        """
+        if not self.covers(time):
+            raise ValueError("{} is outside of the ephemeris grid".format(time.isot))
+
+        # Find the grid points on either side of time and the weight between them
+        i = min(np.searchsorted(self._jd, time.jd, side='right'), len(self._jd) - 1)
+        i = max(i, 1)
+        weight = (time.jd - self._jd[i - 1]) / (self._jd[i] - self._jd[i - 1])
+
+        if index is None:
+            index = slice(None)
+
+        alt = self._alt[index, i - 1] + weight * (self._alt[index, i] - self._alt[index, i - 1])
+        az = self._az[index, i - 1] + weight * (self._az[index, i] - self._az[index, i - 1])
+
+        return alt, az % 360.
+
+    def is_up(self, time, horizon=0 * u.degree, index=None):
+        """ If the field(s) are above `horizon` at `time` """
+        alt, _ = self.altaz(time, index=index)
+        return alt > u.Quantity(horizon, u.degree).value
+
+    def __len__(self):
+        return len(self.names)
+
+    def __str__(self):
+        return "FieldEphemeris: {} fields from {} to {} every {}".format(
+            len(self), self.start_time.isot, self.end_time.isot, self.step)
@@ -2,6 +2,7 @@ from astroplan import FixedTarget
 from astropy.coordinates import SkyCoord
 
 from pocs.base import PanBase
+from pocs.scheduler.history import field_key
 
 
 class Field(FixedTarget, PanBase):
@@ -29,7 +30,7 @@ class Field(FixedTarget, PanBase):
 
         super().__init__(SkyCoord(position, equinox=equinox, frame='icrs'), name=name, **kwargs)
 
-        self._field_name = self.name.title().replace(' ', '').replace('-', '')
+        self._field_name = field_key(self.name)
         if not self._field_name:
             raise ValueError('Name is empty')
 
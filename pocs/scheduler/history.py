@@ -0,0 +1,208 @@
+"""What has been observed of each field, across nights.
+
+The `observations` collection has a record for every image that was taken.
+Finding out how often, and when last, a field was observed from it means
+going through every record, which is too slow to do on every scheduling pass.
+`ObservationHistory` goes through them once, at startup, and is then kept up
+to date by the scheduler as observations are taken, so that each lookup is a
+single dict access.
+"""
+import numpy as np
+
+from astropy import units as u
+from astropy.time import Time
+
+
+def _parse_time(start_time):
+    """ `start_time` of an image, usually flattened (see `~pocs.utils.flatten_time`) """
+    try:
+        return Time.strptime(start_time, '%Y%m%dT%H%M%S')
+    except ValueError:
+        return Time(start_time)
+
+
+def field_key(name):
+    """ The key of a field, its `~pocs.scheduler.field.Field.field_name` """
+    return name.title().replace(' ', '').replace('-', '')
+
+
+class FieldHistory(object):
+
+    """ Visits to, and exposures of, a single field
+
+    A visit is one `~pocs.scheduler.observation.Observation` of the field,
+    i.e. one `seq_time`, however many exposures were taken.
+    """
+
+    __slots__ = ('visits', 'exposures', 'exp_time', 'last_visit', '_seq_times')
+
+    def __init__(self):
+        self.visits = 0
+        self.exposures = 0
+        self.exp_time = 0.  # seconds
+        self.last_visit = np.nan  # JD
+        self._seq_times = set()
+
+    def add_visit(self, seq_time, time):
+        """ Count a visit, unless `seq_time` has already been counted """
+        if not self.last_visit >= time.jd:
+            self.last_visit = time.jd
+
+        if seq_time is not None:
+            if seq_time in self._seq_times:
+                return False
+            self._seq_times.add(seq_time)
+
+        self.visits += 1
+
+        return True
+
+    def add_exposures(self, count, exp_time):
+        self.exposures += count
+        self.exp_time += count * exp_time
+
+    def to_dict(self):
+        return {
+            'visits': self.visits,
+            'exposures': self.exposures,
+            'exp_time': self.exp_time * u.second,
+            'last_visit': None if np.isnan(self.last_visit) else Time(self.last_visit, format='jd'),
+        }
+
+
+class ObservationHistory(object):
+
+    """ Number of visits, time of the last visit and exposure of every field
+
+    Fields are looked up by name, either the `~pocs.scheduler.field.Field.name`
+    or the `field_name` stored with the images.
+    """
+
+    def __init__(self):
+        self._fields = dict()
+        self._keys = dict()
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __contains__(self, name):
+        return self._key(name) in self._fields
+
+    def get(self, name):
+        """ The `FieldHistory` of a field, None if it was never visited """
+        return self._fields.get(self._key(name))
+
+    def visits(self, name):
+        history = self.get(name)
+        return 0 if history is None else history.visits
+
+    def last_visit(self, name):
+        """ Time of the last visit to a field, None if it was never visited """
+        history = self.get(name)
+        if history is None or np.isnan(history.last_visit):
+            return None
+
+        return Time(history.last_visit, format='jd')
+
+    def exp_time(self, name):
+        """ Total exposure time of a field """
+        history = self.get(name)
+        return (0. if history is None else history.exp_time) * u.second
+
+    def last_visits(self, names):
+        """JD of the last visit to each of `names`, NaN for a field that was never visited
+
+        Args:
+            names (iterable of str): Names of the fields, e.g. a catalog column.
+
+        Returns:
+            numpy.ndarray: The JDs, in the order of `names`.
+        """
+        fields = self._fields
+        key = self._key
+        return np.array([getattr(fields.get(key(name)), 'last_visit', np.nan) for name in names],
+                        dtype=float)
+
+    def add_visit(self, name, time, seq_time=None):
+        """Count a visit to a field
+
+        Args:
+            name (str): Name of the field.
+            time (astropy.time.Time): Start of the visit.
+            seq_time (str, optional): `seq_time` of the observation, a visit
+                with the same `seq_time` as an earlier one isn't counted again
+                but can still be the last visit.
+        """
+        return self._field(name).add_visit(seq_time, time)
+
+    def add_exposures(self, name, count, exp_time):
+        """Add to the exposures of a field
+
+        Args:
+            name (str): Name of the field.
+            count (int): Number of exposures.
+            exp_time (astropy.units.Quantity or float): Exposure time of each,
+                in seconds if a float.
+        """
+        if count:
+            self._field(name).add_exposures(count, u.Quantity(exp_time, u.second).value)
+
+    def add_observation(self, observation):
+        """ Count the exposures of an `~pocs.scheduler.observation.Observation` """
+        self.add_exposures(observation.name, len(observation.exposure_list), observation.exp_time)
+
+    def add_record(self, record):
+        """Add an image from the `observations` collection
+
+        Only the primary camera's images count as exposures, the others are
+        simultaneous.
+        """
+        data = record.get('data', record)
+        if isinstance(data.get('data'), dict):
+            data = data['data']
+
+        try:
+            name = data['field_name']
+            time = _parse_time(data['start_time'])
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        seq_time = data.get('sequence_id', '').rsplit('_', 1)[-1] or None
+        self.add_visit(name, time, seq_time=seq_time)
+
+        if data.get('is_primary', True):
+            self.add_exposures(name, 1, float(data.get('exp_time', 0.)))
+
+        return True
+
+    def load(self, db, collection='observations'):
+        """Add every image stored in `collection` of `db`
+
+        Returns:
+            int: The number of images added.
+        """
+        return sum(self.add_record(record) for record in db.find_all(collection))
+
+    def clear(self):
+        self._fields.clear()
+
+    def to_dict(self):
+        return {name: history.to_dict() for name, history in self._fields.items()}
+
+    def __str__(self):
+        return "ObservationHistory: {} fields".format(len(self))
+
+    def _key(self, name):
+        try:
+            return self._keys[name]
+        except KeyError:
+            key = self._keys[name] = field_key(name)
+            return key
+
+    def _field(self, name):
+        key = self._key(name)
+        try:
+            return self._fields[key]
+        except KeyError:
+            history = self._fields[key] = FieldHistory()
+            return history
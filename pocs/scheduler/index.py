@@ -0,0 +1,155 @@
+import numpy as np
+
+from astropy import units as u
+
+from pocs.utils import lazy_import
+
+spatial = lazy_import('scipy.spatial')
+
+
+class SkyIndex(object):
+
+    """ Spatial index over a set of sky positions for cone queries
+
+    Positions are stored as unit vectors in a KD-tree, where the straight-line
+    (chord) distance between two vectors is a monotonic function of their
+    angular separation. This makes "which fields are within X degrees of this
+    position" a sub-linear query rather than a scan over every field.
+
+    Positions can be appended with `add`. New positions are kept in a small
+    unsorted buffer that is searched directly and merged into the tree once it
+    grows past a fraction of the tree size, so adding N fields one at a time
+    stays O(N log N) overall.
+
+    Rows are numbered in the order the positions were given, which for the
+    scheduler is the order of `~pocs.scheduler.scheduler.BaseScheduler.observations`.
+    """
+
+    def __init__(self, coords=None, rebuild_fraction=0.25):
+        """Build the index.
+
+        Args:
+            coords (`astropy.coordinates.SkyCoord`, optional): Initial positions.
+            rebuild_fraction (float, optional): Merge the buffer of added
+                positions into the tree once it is this fraction of the tree
+                size, defaults to 0.25.
+        """
+        self.rebuild_fraction = rebuild_fraction
+
+        self._xyz = np.zeros((0, 3))
+        self._pending = list()
+        self._tree = None
+
+        if coords is not None and len(coords):
+            self._xyz = _unit_vectors(coords)
+            self._tree = spatial.cKDTree(self._xyz)
+
+##################################################################################################
+# Methods
+##################################################################################################
+
+    def add(self, coord):
+        """Append position(s) to the index.
+
+        Args:
+            coord (`astropy.coordinates.SkyCoord`): A scalar or array position.
+
+        Returns:
+            numpy.ndarray: The row(s) the positions were given.
+        """
+        xyz = np.atleast_2d(_unit_vectors(coord))
+        start = len(self)
+
+        self._pending.extend(xyz)
+        if len(self._pending) > max(64, self.rebuild_fraction * len(self._xyz)):
+            self._rebuild()
+
+        return np.arange(start, start + len(xyz))
+
+    def query_radius(self, coord, radius):
+        """Rows of all positions within `radius` of `coord`.
+
+        Args:
+            coord (`astropy.coordinates.SkyCoord`): A scalar position.
+            radius (`astropy.units.Quantity`): Search radius.
+
+        Returns:
+            numpy.ndarray: Sorted row numbers.
+        """
+        xyz = _unit_vectors(coord).reshape(3)
+        chord = _chord(radius)
+
+        found = list()
+        if self._tree is not None:
+            found.extend(self._tree.query_ball_point(xyz, chord))
+
+        if self._pending:
+            pending = np.asarray(self._pending)
+            within = np.flatnonzero(np.linalg.norm(pending - xyz, axis=1) <= chord)
+            found.extend(within + len(self._xyz))
+
+        return np.array(sorted(found), dtype=int)
+
+    def query_pairs(self, radius):
+        """All pairs of rows closer together than `radius`.
+
+        Args:
+            radius (`astropy.units.Quantity`): Maximum separation.
+
+        Returns:
+            set: Tuples of `(i, j)` row numbers with `i < j`.
+        """
+        self._rebuild()
+        if self._tree is None:
+            return set()
+
+        return self._tree.query_pairs(_chord(radius))
+
+    def separation(self, coord, index=None):
+        """Angular separation between `coord` and the indexed positions.
+
+        Args:
+            coord (`astropy.coordinates.SkyCoord`): A scalar position.
+            index (int or array, optional): Rows to return, defaults to all.
+
+        Returns:
+            numpy.ndarray: Separations in degrees.
+        """
+        self._rebuild()
+
+        xyz = self._xyz if index is None else self._xyz[index]
+        cos_sep = np.clip(np.dot(xyz, _unit_vectors(coord).reshape(3)), -1., 1.)
+
+        return np.degrees(np.arccos(cos_sep))
+
+    def __len__(self):
+        return len(self._xyz) + len(self._pending)
+
+    def __str__(self):
+        return "SkyIndex: {} positions".format(len(self))
+
+##################################################################################################
+# Private Methods
+##################################################################################################
+
+    def _rebuild(self):
+        """Merge the pending positions into the tree."""
+        if self._pending:
+            self._xyz = np.vstack([self._xyz, np.asarray(self._pending)])
+            self._pending = list()
+            self._tree = spatial.cKDTree(self._xyz)
+
+
+def _unit_vectors(coord):
+    """Cartesian unit vector(s) of `coord`, shape (N, 3) or (3,)."""
+    ra = coord.spherical.lon.radian
+    dec = coord.spherical.lat.radian
+
+    return np.stack([np.cos(dec) * np.cos(ra),
+                     np.cos(dec) * np.sin(ra),
+                     np.sin(dec)], axis=-1)
+
+
+def _chord(radius):
+    """Straight-line distance between unit vectors separated by `radius`."""
+    return 2 * np.sin(u.Quantity(radius, u.degree).to(u.radian).value / 2)
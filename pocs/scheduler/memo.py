@@ -0,0 +1,85 @@
+from astropy import units as u
+
+
+class ScheduleMemo(object):
+
+    """ The ranked fields of the last scheduling pass, reused for a short time
+
+    `POCS` goes back to `scheduling` after every exposure block, a failed
+    transition or bad weather, often only seconds after the last pass. As long
+    as the observed list, the fields and the constraints are the same, the
+    ranking from a pass less than `bucket` earlier is reused instead of scoring
+    the catalog again.
+
+    The scheduler calls `invalidate` whenever one of those inputs changes. The
+    `key` given to `get` and `store` (e.g. the ids of the constraints) catches
+    changes made behind the scheduler's back.
+    """
+
+    @u.quantity_input(bucket=u.second)
+    def __init__(self, bucket=60 * u.second):
+        """
+        Args:
+            bucket (astropy.units.Quantity, optional): How long a result is reused for.
+        """
+        self.bucket = bucket
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._time = None
+        self._key = None
+        self._value = None
+
+    @property
+    def is_valid(self):
+        return self._time is not None
+
+    def get(self, time, key=None):
+        """The stored result if it is for a time less than `bucket` before `time`
+
+        Returns:
+            The value given to `store`, or None on a miss.
+        """
+        if self._time is not None and key == self._key and \
+                0 <= (time.jd - self._time) * u.day < self.bucket:
+            self.hits += 1
+            return self._value
+
+        self.misses += 1
+        return None
+
+    def store(self, time, value, key=None):
+        self._time = time.jd
+        self._key = key
+        self._value = value
+
+    def invalidate(self):
+        """ Forget the stored result """
+        if self._time is not None:
+            self.invalidations += 1
+
+        self._time = None
+        self._key = None
+        self._value = None
+
+    def reset(self):
+        """ Forget the stored result and zero the counters """
+        self.invalidate()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def to_dict(self):
+        return {
+            'bucket': self.bucket,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
+
+    def __str__(self):
+        return "ScheduleMemo: {} hits, {} misses, results reused for {}".format(
+            self.hits, self.misses, self.bucket)
@@ -0,0 +1,160 @@
+"""Scoring of very large catalogs across a pool of processes.
+
+The constraints, the observer, the catalog and the nightly tables are sent to
+each worker once, when the pool starts, and kept there for every scoring
+pass. A pass then only sends the time, the rows of each shard and the small
+per-pass properties (the Moon, the end of the night, the current and already
+observed observations).
+
+The rows are split into a fixed number of contiguous shards, independent of
+the number of workers, and every field is scored on its own (see
+`~pocs.scheduler.constraint.apply_constraints`), so joining the shards in
+order gives exactly the serial result.
+"""
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pocs.scheduler.constraint import ConstraintStats
+from pocs.scheduler.constraint import apply_constraints
+from pocs.scheduler.index import SkyIndex
+from pocs.utils import process_context
+from pocs.utils.logger import get_root_logger
+
+# Properties that are part of the state sent to the workers when they start
+_WORKER_PROPERTIES = ('ephemeris', 'visibility_windows')
+
+# Properties the workers make for themselves
+_LOCAL_PROPERTIES = ('sky_index', 'catalog')
+
+# Set in each worker process by `_init_worker`
+_worker_state = dict()
+
+
+class ParallelScorer(object):
+
+    """ Scores catalog rows with a `ProcessPoolExecutor`
+
+    The pool is (re)started whenever the constraints, the observer, the
+    catalog or the nightly tables passed to `score` aren't the same objects as
+    last time, e.g. once a night. Call `reset` after changing the catalog in
+    place.
+    """
+
+    def __init__(self, workers=None, shards=None):
+        """
+        Args:
+            workers (int, optional): Number of processes, defaults to the number of cores.
+            shards (int, optional): Number of pieces the rows are split into,
+                defaults to `workers`.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = shards or self.workers
+
+        self._executor = None
+        self._state = None
+
+    def score(self, constraints, time, observer, catalog, rows, common_properties, order=None,
+              stats=None):
+        """Apply `constraints` to the `rows` of `catalog` in the workers
+
+        See `~pocs.scheduler.constraint.apply_constraints` for the arguments.
+        The `stats` of every shard are added to `stats`.
+
+        Returns:
+            tuple: The rows that weren't vetoed and their merits.
+        """
+        properties = dict(common_properties)
+        state = [list(constraints), observer, catalog]
+        state.extend(properties.pop(name, None) for name in _WORKER_PROPERTIES)
+        for name in _LOCAL_PROPERTIES:
+            properties.pop(name, None)
+
+        if self._executor is None or not self._same_state(state):
+            self._start(state)
+
+        rows = np.asarray(rows, dtype=int)
+        futures = [self._executor.submit(_score_shard, time, shard, properties, order)
+                   for shard in np.array_split(rows, self.shards) if len(shard)]
+
+        results = [future.result() for future in futures]
+        if not results:
+            return rows[:0], np.zeros(0, dtype=float)
+
+        if stats is not None:
+            for _, _, shard_stats in results:
+                stats.merge(shard_stats)
+
+        return (np.concatenate([valid_rows for valid_rows, _, _ in results]),
+                np.concatenate([merits for _, merits, _ in results]))
+
+    def reset(self):
+        """ Send everything to the workers again at the next `score` """
+        self._state = None
+
+    def shutdown(self):
+        """ Stop the workers """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        self._executor = None
+        self._state = None
+
+    def _same_state(self, state):
+        if self._state is None or len(state[0]) != len(self._state[0]):
+            return False
+
+        return all(new is old for new, old in zip(state[0], self._state[0])) and \
+            all(new is old for new, old in zip(state[1:], self._state[1:]))
+
+    def _start(self, state):
+        self.shutdown()
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=process_context(),
+                                             initializer=_init_worker,
+                                             initargs=tuple(state))
+        self._state = state
+
+    def __str__(self):
+        return "ParallelScorer: {} workers, {} shards".format(self.workers, self.shards)
+
+
+def _init_worker(constraints, observer, catalog, *night_properties):
+    """ Keep the state of a worker process, built once when it starts """
+    logger = get_root_logger()
+
+    # `PanBase` objects lose their logger when pickled
+    for constraint in constraints:
+        if getattr(constraint, 'logger', None) is None:
+            constraint.logger = logger
+
+    _worker_state.clear()
+    _worker_state.update({
+        'constraints': constraints,
+        'observer': observer,
+        'catalog': catalog,
+        'properties': dict(zip(_WORKER_PROPERTIES, night_properties)),
+    })
+
+    _worker_state['properties']['sky_index'] = SkyIndex(catalog.coords if len(catalog) else None)
+
+
+def _score_shard(time, rows, common_properties, order=None):
+    """ Score one shard of rows in a worker """
+    properties = dict(common_properties)
+    properties.update(_worker_state['properties'])
+
+    stats = ConstraintStats()
+    valid_rows, merits = apply_constraints(_worker_state['constraints'],
+                                           time,
+                                           _worker_state['observer'],
+                                           _worker_state['catalog'],
+                                           rows,
+                                           properties,
+                                           order=order,
+                                           stats=stats)
+
+    return valid_rows, merits, stats
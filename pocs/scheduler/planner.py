@@ -0,0 +1,458 @@
+import numpy as np
+
+from bisect import bisect_right
+from collections import namedtuple
+
+from astropy import units as u
+from astropy.time import Time
+
+from pocs.utils import current_time
+from pocs.scheduler import BaseScheduler
+from pocs.scheduler.constraint import ConstraintStats
+from pocs.scheduler.visibility import VisibilityWindows
+
+
+class PlanEntry(namedtuple('PlanEntry', ['name', 'start', 'end', 'merit'])):
+
+    """ A block of the night given to one field, with `start` and `end` as JD
+
+    The block starts with the slew to the field and is long enough for the
+    `minimum_duration` of the field.
+    """
+    __slots__ = ()
+
+
+class NightPlan(object):
+
+    """ The time ordered, non-overlapping `PlanEntry` blocks of one night
+
+    Lookups keep a cursor into the entries, so stepping through the night as
+    the observatory does costs O(1) per lookup.
+    """
+
+    def __init__(self, start_time, end_time, entries=None):
+        self.start_time = start_time
+        self.end_time = end_time
+
+        self._entries = list()
+        self._starts = list()
+        self._cursor = 0
+
+        for entry in entries or list():
+            self.insert(entry)
+
+    @property
+    def entries(self):
+        return list(self._entries)
+
+    @property
+    def names(self):
+        return set(entry.name for entry in self._entries)
+
+    def covers(self, time):
+        """ If `time` falls in the night of the plan """
+        return self.start_time.jd <= time.jd <= self.end_time.jd
+
+    def lookup(self, time):
+        """ The entry running at `time` or None if `time` falls in a gap """
+        jd = time.jd
+        entries = self._entries
+
+        cursor = min(self._cursor, len(entries))
+        if cursor < len(entries) and jd < entries[cursor].start:
+            # Went back in time, so search for the entry
+            cursor = max(bisect_right(self._starts, jd) - 1, 0)
+
+        while cursor < len(entries) and entries[cursor].end <= jd:
+            cursor += 1
+
+        self._cursor = cursor
+
+        if cursor < len(entries) and entries[cursor].start <= jd:
+            return entries[cursor]
+
+        return None
+
+    def upcoming(self, time):
+        """ The entries that haven't ended by `time` """
+        return [entry for entry in self._entries if entry.end > time.jd]
+
+    def insert(self, entry):
+        """ Add an entry, which must not overlap the existing entries """
+        position = bisect_right(self._starts, entry.start)
+
+        assert position == 0 or self._entries[position - 1].end <= entry.start, \
+            "Plan entries can't overlap"
+        assert position == len(self._entries) or entry.end <= self._entries[position].start, \
+            "Plan entries can't overlap"
+
+        self._entries.insert(position, entry)
+        self._starts.insert(position, entry.start)
+
+    def remove(self, names, after=None):
+        """Drop the entries for the fields in `names`
+
+        Args:
+            names (iterable): Field names.
+            after (astropy.time.Time, optional): Only drop entries that haven't
+                ended by this time, defaults to all.
+
+        Returns:
+            list: The entries that were removed.
+        """
+        names = set(names)
+        after = -np.inf if after is None else after.jd
+
+        removed = [entry for entry in self._entries
+                   if entry.name in names and entry.end > after]
+        if removed:
+            self._entries = [entry for entry in self._entries if entry not in removed]
+            self._starts = [entry.start for entry in self._entries]
+            self._cursor = 0
+
+        return removed
+
+    def gaps(self, time):
+        """ The (start, end) JD of the free time from `time` to the end of the night """
+        gaps = list()
+
+        start = max(time.jd, self.start_time.jd)
+        for entry in self._entries:
+            if entry.end <= start:
+                continue
+            if entry.start > start:
+                gaps.append((start, entry.start))
+            start = max(start, entry.end)
+
+        if start < self.end_time.jd:
+            gaps.append((start, self.end_time.jd))
+
+        return gaps
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __str__(self):
+        return "NightPlan: {} entries from {} to {}".format(
+            len(self), self.start_time.isot, self.end_time.isot)
+
+
+class Scheduler(BaseScheduler):
+
+    def __init__(self, *args, **kwargs):
+        """Plans the whole night ahead rather than picking greedily at each call
+
+        At the first call of the night a `NightPlan` is built by stepping
+        through the night: at each point the constraints score the fields that
+        are up and can complete their `minimum_duration` before they set or
+        cross the meridian, and the best one is given a block. On top of the
+        merit and priority, fields whose window closes soonest are favored (so
+        they aren't lost to fields that could be observed later) and long slews
+        from the previous block are penalized and added to the block. The
+        `rise`, `set` and `transit` times all come from the nightly
+        `~pocs.scheduler.visibility.VisibilityWindows`.
+
+        `get_observation` is then a lookup into the plan. The plan is repaired
+        rather than rebuilt: a vetoed field, a missed block (e.g. while closed
+        for weather) or a change to the fields only free up their part of the
+        night, which is filled again from the fields not already in the plan.
+
+        The `scheduler.planner` config items are:
+
+            * `step`: Minutes to move on when no field fits, default 10.
+            * `slew_rate`: Degrees per second the mount slews, default 1.5.
+            * `slew_weight`: Merit lost for a slew of 180 degrees, default 1.
+            * `urgency_weight`: Merit gained by a field that must be
+              observed now or not at all, default 1.
+        """
+        self._plan = None
+        self._plan_dirty = False
+        self._started = set()
+        self._vetoed = set()
+
+        # Kept apart from `constraint_stats`, which times the scheduling passes
+        self._plan_stats = ConstraintStats()
+
+        BaseScheduler.__init__(self, *args, **kwargs)
+
+
+##########################################################################
+# Properties
+##########################################################################
+
+    @property
+    def plan(self):
+        """ The current `NightPlan`, None until the first call of the night """
+        return self._plan
+
+##########################################################################
+# Methods
+##########################################################################
+
+    def get_observation(self, time=None, show_all=False, reread_fields_file=False):
+        """Get the observation the plan has for `time`
+
+        Args:
+            time (astropy.time.Time, optional): Time at which scheduler applies,
+                defaults to time called
+            show_all (bool, optional): Return the rest of the plan with the
+                merit of each entry, defaults to False to only get the current entry
+            reread_fields_file (bool, optional): If the fields file should be reread
+                before scheduling occurs, defaults to False.
+
+        Returns:
+            tuple or list: A tuple (or list of tuples) with name and merit of planned observations
+        """
+        if reread_fields_file:
+            self.logger.debug("Rereading fields file")
+            diff = self.read_field_list()
+            if diff:
+                self.logger.info("Fields file changed: {}".format(diff))
+
+        if time is None:
+            time = current_time()
+
+        if self._plan is None or not self._plan.covers(time):
+            self.build_plan(time)
+
+        if self._plan is None:
+            self.logger.warning("No plan for {}".format(time.isot))
+            self.current_observation = None
+            return []
+
+        self._drop_missed(time)
+        if self._plan_dirty:
+            self.repair_plan(time)
+
+        entry = self._plan.lookup(time)
+        if entry is not None:
+            observation = self.observations[entry.name]
+            if not self.observation_available(observation, time + observation.set_duration):
+                self.logger.info("{} is no longer available".format(entry.name))
+                self.veto(entry.name, time)
+                entry = self._plan.lookup(time)
+
+        if entry is None:
+            self.logger.warning("No valid observations found")
+            self.current_observation = None
+            return []
+
+        self._started.add(entry.name)
+
+        self.current_observation = self.observations[entry.name]
+        self.current_observation.merit = entry.merit
+
+        best_obs = [(e.name, e.merit) for e in self._plan.upcoming(time)]
+
+        if not show_all:
+            best_obs = best_obs[0]
+
+        return best_obs
+
+    def build_plan(self, time):
+        """Plan the whole night that `time` falls in
+
+        Args:
+            time (astropy.time.Time): A time during the night.
+
+        Returns:
+            `NightPlan` or None: None if `time` isn't during the night.
+        """
+        self._plan = None
+        self._plan_dirty = False
+        self._started = set()
+        self._vetoed = set()
+
+        twilight_horizon = self.config['location'].get('twilight_horizon', -18 * u.degree)
+        start_time, end_time = self.site_ephemeris.tonight(time, horizon=twilight_horizon)
+
+        # `tonight` returns the next night during the day
+        if time < start_time:
+            return None
+
+        self._plan = NightPlan(start_time, end_time)
+        self._fill(start_time.jd, end_time.jd)
+
+        self.logger.debug("Built {}".format(self._plan))
+        for entry in self._plan:
+            self.logger.debug("\t{} {} to {}".format(
+                entry.name,
+                Time(entry.start, format='jd').isot,
+                Time(entry.end, format='jd').isot))
+
+        return self._plan
+
+    def repair_plan(self, time):
+        """Fill the free time left in the plan from `time` on
+
+        Only the gaps are planned, entries already in the plan are kept.
+
+        Args:
+            time (astropy.time.Time): Time to repair the plan from.
+        """
+        if self._plan is None:
+            return
+
+        for start, end in self._plan.gaps(time):
+            self._fill(start, end)
+
+        self._plan_dirty = False
+        self.logger.debug("Repaired {}".format(self._plan))
+
+    def veto(self, name, time=None):
+        """Drop the rest of the plan for a field
+
+        The field isn't planned again that night and the free time is filled
+        again at the next `get_observation`.
+
+        Args:
+            name (str): Field name.
+            time (astropy.time.Time, optional): Keep entries that have already
+                ended by this time, defaults to now.
+        """
+        if self._plan is None:
+            return
+
+        if time is None:
+            time = current_time()
+
+        self._vetoed.add(name)
+        if self._plan.remove([name], after=time):
+            self.logger.debug("Vetoed {} from the plan".format(name))
+            self._plan_dirty = True
+
+    def remove_observation(self, field_name):
+        super().remove_observation(field_name)
+        self._drop_from_plan([field_name])
+
+##########################################################################
+# Private Methods
+##########################################################################
+
+    def _new_catalog(self):
+        super()._new_catalog()
+        self._plan = None
+
+    def _apply_field_diff(self, catalog, diff):
+        super()._apply_field_diff(catalog, diff)
+
+        # New fields can take any free time. Changed fields lose their entries
+        # as their durations or priorities may no longer fit.
+        self._drop_from_plan(diff.removed + diff.modified)
+        if diff.added:
+            self._plan_dirty = True
+
+    def _drop_from_plan(self, names):
+        if self._plan is not None and self._plan.remove(names):
+            self._plan_dirty = True
+
+    def _drop_missed(self, time):
+        """Free up the fields of entries that ended before `time` without being observed"""
+        missed = [entry.name for entry in self._plan
+                  if entry.end <= time.jd and entry.name not in self._started]
+        if missed:
+            self.logger.debug("Missed {}".format(missed))
+            self._drop_from_plan(missed)
+
+    def _get_windows(self, time):
+        """ The `VisibilityWindows` for the night, even if not enabled in the config """
+        windows = self.get_visibility_windows(time)
+        if windows is None:
+            windows = self._visibility_windows
+            if windows is None or not windows.covers(time):
+                horizon = self.config['location'].get('horizon', 30 * u.degree)
+                windows = VisibilityWindows.compute(self.observer, list(self.catalog.names),
+                                                    self.field_coords, self._plan.start_time,
+                                                    self._plan.end_time, horizon=horizon)
+                self._visibility_windows = windows
+
+        return windows
+
+    def _fill(self, start, end):
+        """Plan the time from `start` to `end` (as JD) with fields not already planned"""
+        planner_config = self.config['scheduler'].get('planner', {})
+        step = planner_config.get('step', 10) / 1440.
+        slew_rate = planner_config.get('slew_rate', 1.5)
+        slew_weight = planner_config.get('slew_weight', 1.)
+        urgency_weight = planner_config.get('urgency_weight', 1.)
+
+        catalog = self.catalog
+        if len(catalog) == 0:
+            return
+
+        windows = self._get_windows(Time(start, format='jd'))
+        min_duration = catalog.minimum_duration / 86400.
+        priorities = self._get_priorities()
+        night_length = self._plan.end_time.jd - self._plan.start_time.jd
+
+        unplanned = np.ones(len(catalog), dtype=bool)
+        for name in self._plan.names | self._vetoed:
+            if name in catalog:
+                unplanned[catalog.index(name)] = False
+
+        previous = self._previous_entry(start)
+
+        # The same for the whole night, only the Moon and the previous block change
+        common_properties = self._get_common_properties(Time(start, format='jd'))
+        current_observation = common_properties['current_observation']
+
+        jd = start
+        while jd < end:
+            time = Time(jd, format='jd')
+
+            # Slew from the previous block
+            if previous is not None and previous.name in catalog:
+                slew = self.sky_index.separation(
+                    catalog.get_coord(catalog.index(previous.name)))
+            else:
+                slew = np.zeros(len(catalog))
+            slew_time = slew / slew_rate / 86400.
+
+            # Fields that can complete before they set, flip or the gap ends
+            deadline = np.fmin(np.fmin(windows.next_set(time), windows.next_transit(time)),
+                               end)
+            slack = deadline - (jd + slew_time + min_duration)
+            fits = unplanned & windows.is_up(time) & (slack >= 0)
+
+            rows = np.flatnonzero(fits)
+            if len(rows):
+                common_properties['moon'] = self.site_ephemeris.moon(time)
+                if previous is not None and previous.name in catalog:
+                    common_properties['current_observation'] = self.observations[previous.name]
+                else:
+                    common_properties['current_observation'] = current_observation
+                rows, merits = self._score_fields(time, common_properties, rows=rows,
+                                                  stats=self._plan_stats)
+
+            if len(rows) == 0:
+                jd += step
+                continue
+
+            urgency = 1. - np.clip(slack[rows] / night_length, 0., 1.)
+            values = merits + priorities[rows] + \
+                urgency_weight * urgency - slew_weight * slew[rows] / 180.
+
+            best = int(np.argmax(values))
+            row = rows[best]
+
+            entry = PlanEntry(catalog.names[row], jd,
+                              jd + slew_time[row] + min_duration[row],
+                              float(merits[best] + priorities[row]))
+            self._plan.insert(entry)
+
+            unplanned[row] = False
+            previous = entry
+            jd = entry.end
+
+    def _previous_entry(self, jd):
+        """ The last entry ending by `jd` """
+        previous = None
+        for entry in self._plan:
+            if entry.end > jd:
+                break
+            previous = entry
+
+        return previous
@@ -0,0 +1,139 @@
+import time
+
+from json import loads
+
+from pocs.utils import current_time
+from pocs.utils.messaging import PanMessaging
+from pocs.scheduler.dispatch import Scheduler as DispatchScheduler
+from pocs.scheduler.server import TOPIC
+
+
+class Scheduler(DispatchScheduler):
+
+    """ Gets observations from a `~pocs.scheduler.server.SchedulerServer`
+
+    Used with ``scheduler.type: remote``, the server is found from
+    `scheduler.server.host` and `scheduler.server.port`. If the server doesn't
+    answer within `scheduler.server.timeout` seconds the observation is
+    scheduled here instead, from the local fields file, like the `dispatch`
+    scheduler does. The server isn't asked again for `scheduler.server.retry_delay`
+    seconds, so that every pass doesn't wait for the timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        DispatchScheduler.__init__(self, *args, **kwargs)
+
+        server_config = self.config['scheduler'].get('server', {})
+
+        self.unit_id = self.config.get('pan_id', self.config.get('name'))
+        self.host = server_config.get('host', 'localhost')
+        self.port = server_config.get('port', 6565)
+        self.timeout = server_config.get('timeout', 2)
+        self.retry_delay = server_config.get('retry_delay', 60)
+
+        self._requester = None
+        self._retry_at = None
+
+##########################################################################
+# Methods
+##########################################################################
+
+    def get_observation(self, time=None, show_all=False, reread_fields_file=False):
+        """Get an observation from the server, or schedule locally if it doesn't answer
+
+        The field given by the server is added to the observations if it isn't
+        in the local fields file. Only the given field is returned by the
+        server, so `show_all` is a list of one.
+
+        See `~pocs.scheduler.dispatch.Scheduler.get_observation` for the arguments.
+        """
+        if time is None:
+            time = current_time()
+
+        reply = self._request('get_observation', time=time)
+        if reply is None:
+            self.logger.debug("Scheduling locally")
+            return DispatchScheduler.get_observation(self, time=time, show_all=show_all,
+                                                     reread_fields_file=reread_fields_file)
+
+        if reread_fields_file:
+            self.read_field_list()
+
+        name = reply.get('field')
+        if name is None:
+            self.logger.warning("No valid observations found")
+            self.current_observation = None
+            return []
+
+        if name not in self.catalog:
+            self.add_observation(loads(reply['config']))
+
+        self.current_observation = self.observations[name]
+        self.current_observation.merit = reply['merit']
+
+        best_obs = (name, reply['merit'])
+
+        return [best_obs] if show_all else best_obs
+
+    def reset_observed_list(self):
+        """ Reset the observed list, here and on the server """
+        DispatchScheduler.reset_observed_list(self)
+        self._request('reset')
+
+    def release(self):
+        """ Let other units have the current field """
+        self._request('release')
+
+    def close(self):
+        if self._requester is not None:
+            self._requester.close()
+            self._requester = None
+
+##########################################################################
+# Private Methods
+##########################################################################
+
+    def _request(self, action, **kwargs):
+        """Send a request to the server and wait for the reply
+
+        After a request isn't answered, no requests are sent for `retry_delay`
+        seconds.
+
+        Returns:
+            dict or None: The reply, None if there was no answer or the request failed.
+        """
+        if self._retry_at is not None and time.monotonic() < self._retry_at:
+            return None
+
+        request = dict(kwargs, action=action, unit=self.unit_id)
+
+        if self._requester is None:
+            self._requester = PanMessaging.create_requester(self.port, host=self.host)
+
+        try:
+            self._requester.send_message(TOPIC, request)
+            topic, reply = self._requester.receive_message(timeout_ms=int(self.timeout * 1000))
+        except Exception as e:
+            self.logger.warning("Problem sending {} to the scheduler server: {}".format(action, e))
+            topic = reply = None
+
+        if topic is None:
+            # A request without a reply leaves the socket unusable
+            self.close()
+
+            self.logger.warning("No answer from the scheduler server, scheduling locally for "
+                                "{} seconds without the fields claimed by other units".format(
+                                    self.retry_delay))
+            self._retry_at = time.monotonic() + self.retry_delay
+            return None
+
+        if self._retry_at is not None:
+            self.logger.info("Scheduler server is answering again")
+            self._retry_at = None
+
+        if not reply.get('success', False):
+            self.logger.warning("Scheduler server couldn't {}: {}".format(
+                action, reply.get('message')))
+            return None
+
+        return reply
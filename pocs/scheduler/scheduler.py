@@ -1,22 +1,34 @@
+import numpy as np
 import os
-import yaml
 
 from collections import OrderedDict
 
 from astroplan import Observer
 from astropy import units as u
+from astropy.time import Time
 
 from pocs.base import PanBase
-from pocs.utils import error
 from pocs.utils import current_time
-from pocs.scheduler.field import Field
-from pocs.scheduler.observation import Observation
+from pocs.utils import flatten_time
+from pocs.utils import listify
+from pocs.utils.ephemeris import SiteEphemeris
+from pocs.scheduler.catalog import CatalogObservations
+from pocs.scheduler.catalog import FieldCatalog
+from pocs.scheduler.catalog import FieldListDiff
+from pocs.scheduler.constraint import ConstraintStats
+from pocs.scheduler.constraint import apply_constraints
+from pocs.scheduler.ephemeris import FieldEphemeris
+from pocs.scheduler.history import ObservationHistory
+from pocs.scheduler.memo import ScheduleMemo
+from pocs.scheduler.index import SkyIndex
+from pocs.scheduler.parallel import ParallelScorer
+from pocs.scheduler.visibility import VisibilityWindows
 
 
 class BaseScheduler(PanBase):
 
     def __init__(self, observer, fields_list=None, fields_file=None,
-                 constraints=list(), *args, **kwargs):
+                 constraints=list(), site_ephemeris=None, *args, **kwargs):
         """Loads `~pocs.scheduler.field.Field`s from a field
 
         Note:
@@ -34,6 +46,9 @@ class BaseScheduler(PanBase):
             fields_file (str): YAML file containing field parameters.
             constraints (list, optional): List of `Constraints` to apply to each
                 observation.
+            site_ephemeris (`~pocs.utils.ephemeris.SiteEphemeris`, optional):
+                Sun and Moon for the site, e.g. shared with the `Observatory`.
+                One is made for `observer` if not given.
             *args: Arguments to be passed to `PanBase`
             **kwargs: Keyword args to be passed to `PanBase`
         """
@@ -41,20 +56,31 @@ class BaseScheduler(PanBase):
 
         assert isinstance(observer, Observer)
 
+        self._parallel_scorer = None
+
+        memo_config = self.config['scheduler'].get('memo', {})
+        self.memo = None
+        if memo_config.get('enabled', False):
+            self.memo = ScheduleMemo(bucket=memo_config.get('bucket', 60) * u.second)
+
         self._fields_file = fields_file
         # Setting the fields_list directly will clobber anything
         # from the fields_file. It comes second so we can speicfically
         # clobber if passed.
         self._fields_list = fields_list
-        self._observations = dict()
+        self._new_catalog()
 
         self.observer = observer
+        self._site_ephemeris = site_ephemeris
 
         self.constraints = constraints
+        self.constraint_stats = ConstraintStats()
 
         self._current_observation = None
         self.observed_list = OrderedDict()
 
+        self.history = ObservationHistory()
+
         if not self.config['scheduler'].get('check_file', False):
             self.logger.debug("Reading initial set of fields")
             self.read_field_list()
@@ -71,22 +97,88 @@ class BaseScheduler(PanBase):
 
         Note:
             `read_field_list` is called if list is None
+
+            The `Observation` for a field is only created when it is looked up,
+            see `~pocs.scheduler.catalog.CatalogObservations`.
         """
         if self.has_valid_observations is False:
             self.read_field_list()
 
         return self._observations
 
+    @property
+    def catalog(self):
+        """The `~pocs.scheduler.catalog.FieldCatalog` behind `observations`
+
+        The scheduler and constraints work directly on the columns of the
+        catalog, with rows in the same order as `observations`.
+
+        Note:
+            `read_field_list` is called if the catalog is empty
+        """
+        if self.has_valid_observations is False:
+            self.read_field_list()
+
+        return self._catalog
+
+    @property
+    def field_coords(self):
+        """Returns a `SkyCoord` array of the fields of all `observations`
+
+        The coordinates are in the same order as `observations` and are cached
+        until an observation is added or removed.
+        """
+        return self.catalog.coords
+
+    @property
+    def sky_index(self):
+        """A `~pocs.scheduler.index.SkyIndex` over the fields of all `observations`
+
+        Rows are in the same order as `observations`. The index is extended as
+        observations are added and rebuilt when one is removed or replaced.
+        """
+        if self._sky_index is None:
+            self._sky_index = SkyIndex(self.field_coords if self.has_valid_observations else None)
+
+        return self._sky_index
+
+    @property
+    def site_ephemeris(self):
+        """The `~pocs.utils.ephemeris.SiteEphemeris` for the Sun and Moon
+
+        Used for the end of the night and the position of the Moon rather than
+        computing them on every scheduling pass.
+        """
+        if self._site_ephemeris is None:
+            self._site_ephemeris = SiteEphemeris(self.observer)
+
+        return self._site_ephemeris
+
+    @property
+    def constraints(self):
+        """The `~pocs.scheduler.constraint.BaseConstraint`s applied to each observation
+
+        Setting new constraints invalidates the `memo`.
+        """
+        return self._constraints
+
+    @constraints.setter
+    def constraints(self, constraints):
+        self._constraints = constraints
+        self._invalidate_memo('constraints')
+
     @property
     def has_valid_observations(self):
-        return len(self._observations.keys()) > 0
+        return len(self._observations) > 0
 
     @property
     def current_observation(self):
         """The observation that is currently selected by the scheduler
 
         Upon setting a new observation the `seq_time` is set to the current time
-        and added to the `observed_list`. An old observation is reset (so that
+        and added to the `observed_list` and as a visit to the `history`. The
+        exposures of an old observation are added to the `history` and it is
+        reset (so that
         it can be used again - see `~pocs.scheduelr.observation.reset`). If the
         new observation is the same as the old observation, nothing is done. The
         new observation can also be set to `None` to specify there is no current
@@ -102,22 +194,28 @@ class BaseScheduler(PanBase):
             # and add to the list
             if new_observation is not None:
                 # Set the new seq_time for the observation
-                new_observation.seq_time = current_time(flatten=True)
+                new_observation.seq_time = self._get_seq_time()
 
                 # Add the new observation to the list
-                self.observed_list[new_observation.seq_time] = new_observation
+                self._add_visit(new_observation)
         else:
             # If no new observation, simply reset the current
             if new_observation is None:
+                self.history.add_observation(self.current_observation)
                 self.current_observation.reset()
             else:
                 # If we have a new observation, check if same as old observation
                 if self.current_observation.name != new_observation.name:
+                    self.history.add_observation(self.current_observation)
                     self.current_observation.reset()
-                    new_observation.seq_time = current_time(flatten=True)
+                    new_observation.seq_time = self._get_seq_time()
 
                     # Add the new observation to the list
-                    self.observed_list[new_observation.seq_time] = new_observation
+                    self._add_visit(new_observation)
+
+        if getattr(self.current_observation, 'name', None) != \
+                getattr(new_observation, 'name', None):
+            self._invalidate_memo('current observation')
 
         self.logger.info("Setting new observation to {}".format(new_observation))
         self._current_observation = new_observation
@@ -181,7 +279,7 @@ class BaseScheduler(PanBase):
         """Reset the list of available observations"""
         # Clear out existing list and observations
         self.current_observation = None
-        self._observations = dict()
+        self._new_catalog()
 
     def get_observation(self, time=None, show_all=False):
         """Get a valid observation
@@ -197,48 +295,247 @@ class BaseScheduler(PanBase):
         """
         raise NotImplementedError
 
+    def rank_fields(self, time, observed_list, current_observation, exclude=None):
+        """Score the catalog at `time` for the given observing state
+
+        Nothing about the scheduler is changed, so this can rank the fields
+        for another unit, e.g. by the `~pocs.scheduler.server.SchedulerServer`.
+
+        Args:
+            time (astropy.time.Time): The time to score at.
+            observed_list (OrderedDict): The observations made so far, by name.
+            current_observation (`~pocs.scheduler.observation.Observation`):
+                The observation being made, or None.
+            exclude (set, optional): Names of fields that aren't scored, e.g.
+                those claimed by another unit.
+
+        Returns:
+            tuple: The valid fields as (name, merit) from the highest merit
+                down, with the priority included, and the end of the night.
+        """
+        catalog = self.catalog
+
+        rows = None
+        if exclude:
+            excluded = [catalog.index(name) for name in exclude if name in catalog]
+            rows = np.setdiff1d(np.arange(len(catalog)), excluded)
+
+        common_properties = self._get_common_properties(time)
+        common_properties['observed_list'] = observed_list
+        common_properties['current_observation'] = current_observation
+
+        valid_rows, merits = self._score_fields(time, common_properties, rows=rows)
+        priorities = self._get_priorities()
+
+        # Work on the catalog columns, only creating an `Observation` for the winner
+        valid_obs = OrderedDict(
+            (catalog.names[row], float(merit + priorities[row]))
+            for row, merit in zip(valid_rows, merits)
+        )
+
+        # Sort the list by highest score (reverse puts in correct order)
+        ranked_obs = sorted(valid_obs.items(), key=lambda x: x[1])[::-1]
+
+        return ranked_obs, common_properties['end_of_night']
+
     def status(self):
+        """Status of the scheduler
+
+        `constraint_stats` has the calls, total time, number of fields scored
+        and vetoed, time per field and veto rate of each constraint, and
+        `constraint_order` the order they are currently evaluated in. `memo`
+        has the hits and misses of the `memo`, if it is enabled.
+        """
+        constraints = listify(self.constraints)
+        order = self.constraint_stats.order(constraints) \
+            if self.config['scheduler'].get('adaptive_constraints', True) \
+            else range(len(constraints))
+
         return {
             'constraints': self.constraints,
             'current_observation': self.current_observation,
+            'constraint_stats': self.constraint_stats.to_dict(),
+            'constraint_order': [str(constraints[i]) for i in order],
+            'memo': self.memo.to_dict() if self.memo is not None else None,
         }
 
     def reset_observed_list(self):
-        """Reset the observed list """
+        """Reset the observed list
+
+        The `history` of earlier nights is kept.
+        """
         self.logger.debug('Resetting observed list')
         self.observed_list = OrderedDict()
+        self._invalidate_memo('observed list')
+
+    def load_history(self):
+        """Add the images in the `observations` collection of the db to the `history`
+
+        The `Observatory` calls this when it starts, unless `scheduler.load_history`
+        is False.
+        """
+        try:
+            num_images = self.history.load(self.db)
+        except Exception as e:
+            self.logger.warning("Can't load observation history: {}".format(e))
+        else:
+            self.logger.debug("Loaded {} images into the observation history".format(num_images))
 
     def observation_available(self, observation, time):
         """Check if observation is available at given time
 
+        Note:
+            Uses the nightly `FieldEphemeris` when it covers `time`.
+
         Args:
             observation (pocs.scheduler.observation): An Observation object
             time (astropy.time.Time): The time at which to check observation
 
         """
+        ephemeris = self.get_ephemeris(time)
+        if ephemeris is not None:
+            index = ephemeris.index(observation.name)
+            if index is not None:
+                return bool(ephemeris.is_up(time, horizon=30 * u.degree, index=index))
+
         return self.observer.target_is_up(time, observation.field, horizon=30 * u.degree)
 
+    def get_ephemeris(self, time):
+        """Get the `~pocs.scheduler.ephemeris.FieldEphemeris` covering `time`
+
+        The alt/az of every field is computed once per night, from dusk to dawn,
+        on the grid given by the `scheduler.ephemeris.step` config item (in
+        minutes). The ephemeris is rebuilt when the night or the fields change.
+
+        Args:
+            time (astropy.time.Time): The time the ephemeris is needed for.
+
+        Returns:
+            `FieldEphemeris` or None: None if the ephemeris is disabled via the
+                `scheduler.ephemeris.enabled` config item or `time` isn't
+                during the night.
+        """
+        ephemeris_config = self.config['scheduler'].get('ephemeris', {})
+        if not ephemeris_config.get('enabled', False):
+            return None
+
+        if self._ephemeris is None or not self._ephemeris.covers(time):
+            twilight_horizon = self.config['location'].get('twilight_horizon', -18 * u.degree)
+            start_time, end_time = self.site_ephemeris.tonight(time, horizon=twilight_horizon)
+
+            # `tonight` returns the next night during the day
+            if time < start_time:
+                return None
+
+            self._ephemeris = FieldEphemeris(self.observer,
+                                             list(self.catalog.names),
+                                             self.field_coords,
+                                             start_time,
+                                             end_time,
+                                             step=ephemeris_config.get('step', 5) * u.minute)
+            self.logger.debug("Computed {}".format(self._ephemeris))
+
+        return self._ephemeris
+
+    def get_visibility_windows(self, time, horizon=None):
+        """Get the `~pocs.scheduler.visibility.VisibilityWindows` covering `time`
+
+        The rise, set and meridian transit times of every field are computed
+        once per night and, if the `scheduler.visibility_windows.save` config
+        item is set, saved in the `scheduler` folder of the data directory so a
+        restart during the night loads them rather than recomputing. Saved
+        tables are keyed on the field set, the night and the horizon.
+
+        Args:
+            time (astropy.time.Time): The time the table is needed for.
+            horizon (astropy.units.Quantity, optional): The horizon the windows
+                are computed for, defaults to the `location.horizon` config item.
+
+        Returns:
+            `VisibilityWindows` or None: None if the table is disabled via the
+                `scheduler.visibility_windows.enabled` config item or `time`
+                isn't during the night.
+        """
+        windows_config = self.config['scheduler'].get('visibility_windows', {})
+        if not windows_config.get('enabled', False):
+            return None
+
+        if horizon is None:
+            horizon = self.config['location'].get('horizon', 30 * u.degree)
+
+        windows = self._visibility_windows
+        if windows is None or windows.horizon != horizon or not windows.covers(time):
+            twilight_horizon = self.config['location'].get('twilight_horizon', -18 * u.degree)
+            start_time, end_time = self.site_ephemeris.tonight(time, horizon=twilight_horizon)
+
+            # `tonight` returns the next night during the day
+            if time < start_time:
+                return None
+
+            names = list(self.catalog.names)
+            coords = self.field_coords
+
+            windows_path = None
+            if windows_config.get('save', False):
+                windows_path = VisibilityWindows.cache_path(
+                    os.path.join(self.config['directories']['data'], 'scheduler'),
+                    self.observer, names, coords, end_time, horizon)
+
+            windows = None
+            if windows_path is not None and os.path.exists(windows_path):
+                try:
+                    windows = VisibilityWindows.load(windows_path)
+                    self.logger.debug("Loaded {} from {}".format(windows, windows_path))
+                except Exception as e:
+                    self.logger.warning("Can't load visibility windows: {}".format(e))
+
+            if windows is None or windows.names != names or not windows.covers(time):
+                windows = VisibilityWindows.compute(self.observer, names, coords,
+                                                    start_time, end_time, horizon=horizon)
+                self.logger.debug("Computed {}".format(windows))
+
+                if windows_path is not None:
+                    try:
+                        windows.save(windows_path)
+                    except Exception as e:
+                        self.logger.warning("Can't save visibility windows: {}".format(e))
+
+            self._visibility_windows = windows
+
+        return windows
+
     def add_observation(self, field_config):
         """Adds an `Observation` to the scheduler
 
         Args:
             field_config (dict): Configuration items for `Observation`
+
+        Raises:
+            error.InvalidObservation: If the config isn't a valid `Observation`.
         """
         if 'exp_time' in field_config:
             field_config['exp_time'] = float(field_config['exp_time']) * u.second
 
         self.logger.debug("Adding {} to scheduler", field_config['name'])
-        field = Field(field_config['name'], field_config['position'])
 
-        try:
-            obs = Observation(field, **field_config)
-        except Exception:
-            raise error.InvalidObservation(
-                "Skipping invalid field config: {}".format(field_config))
+        is_new = field_config['name'] not in self._catalog
+        if is_new:
+            # Make sure the index exists before the catalog changes
+            sky_index = self.sky_index
+
+        row = self._catalog.append(field_config)
+        name = self._catalog.names[row]
+
+        if is_new:
+            coord = self._catalog.get_coord(row)
+            self._check_duplicate_position(name, coord, sky_index)
+            sky_index.add(coord)
         else:
-            if field.name in self._observations:
-                self.logger.debug("Overriding existing entry for {}".format(field.name))
-            self._observations[field.name] = obs
+            self.logger.debug("Overriding existing entry for {}".format(name))
+            self._observations.discard(name)
+            self._sky_index = None
+
+        self._reset_field_caches()
 
     def remove_observation(self, field_name):
         """Removes an `Observation` from the scheduler
@@ -248,31 +545,68 @@ class BaseScheduler(PanBase):
 
         """
         try:
-            obs = self._observations[field_name]
-            del self._observations[field_name]
-            self.logger.debug("Observation removed: {}".format(obs))
+            self._catalog.remove(field_name)
+            self._observations.discard(field_name)
+            self._sky_index = None
+            self._reset_field_caches()
+            self.logger.debug("Observation removed: {}".format(field_name))
         except Exception:
             pass
 
     def read_field_list(self):
-        """Reads the field file and creates valid `Observations` """
-        if self._fields_file is not None:
-            self.logger.debug('Reading fields from file: {}'.format(self.fields_file))
+        """Reads the field file and creates valid `Observations`
+
+        The fields file is only parsed again if its size or modification time
+        has changed since it was last read. See
+        `~pocs.scheduler.catalog.FieldCatalog.from_file` for the compiled cache
+        that is used unless the `scheduler.cache_fields_file` config item is False.
+
+        The new list is applied as a diff against the current observations:
+        fields that are new or have changed are (re)built, fields that were in
+        the previous list but not the new one are removed, and the `Observation`
+        objects of unchanged fields (with their exposures and merit) are kept.
+        Fields added with `add_observation` are never removed by a reread.
+
+        Returns:
+            `~pocs.scheduler.catalog.FieldListDiff`: The names of the fields that
+                were added, removed and modified.
+        """
+        if not isinstance(self._observations, CatalogObservations):
+            # The observations were replaced wholesale, e.g. emptied, so start over
+            self._new_catalog()
 
+        if self._fields_file is not None:
             if not os.path.exists(self.fields_file):
                 raise FileNotFoundError
 
-            with open(self.fields_file, 'r') as f:
-                self._fields_list = yaml.load(f.read())
+            stat = os.stat(self.fields_file)
+            file_stat = (stat.st_size, stat.st_mtime_ns)
+            if file_stat == self._fields_file_stat:
+                self.logger.debug('Fields file unchanged: {}'.format(self.fields_file))
+                return FieldListDiff([], [], [])
 
-        if self._fields_list is not None:
-            for field_config in self._fields_list:
-                try:
-                    self.add_observation(field_config)
-                except AssertionError:
-                    self.logger.debug("Skipping duplicate field.")
-                except Exception as e:
-                    self.logger.warning("Error adding field: {}", e)
+            self.logger.debug('Reading fields from file: {}'.format(self.fields_file))
+            use_cache = self.config['scheduler'].get('cache_fields_file', True)
+            catalog = FieldCatalog.from_file(self.fields_file, use_cache=use_cache)
+
+            self._fields_file_stat = file_stat
+            self._fields_list = catalog.configs
+        elif self._fields_list is not None:
+            catalog = FieldCatalog(self._fields_list)
+        else:
+            return FieldListDiff([], [], [])
+
+        for field_config, e in catalog.invalid:
+            self.logger.warning("Error adding field: {}", e)
+
+        diff = self._catalog.diff(catalog, removable=self._listed_fields)
+        self._listed_fields = set(catalog.names)
+
+        if diff:
+            self.logger.debug("Field list changes: {}".format(diff))
+            self._apply_field_diff(catalog, diff)
+
+        return diff
 
 ##########################################################################
 # Utility Methods
@@ -281,3 +615,178 @@ class BaseScheduler(PanBase):
 ##########################################################################
 # Private Methods
 ##########################################################################
+
+    def _get_priorities(self):
+        """Priority of every field in catalog order
+
+        The priority of an `Observation` may have been changed since it was
+        created, so those override the catalog column.
+        """
+        catalog = self.catalog
+        priorities = catalog.priority.copy()
+        for name, observation in self._observations.created():
+            priorities[catalog.index(name)] = observation.priority
+
+        return priorities
+
+    def _get_common_properties(self, time):
+        """The keyword arguments every constraint is called with at `time`"""
+        return {
+            'end_of_night': self.site_ephemeris.tonight(time, horizon=-18 * u.degree)[-1],
+            'moon': self.site_ephemeris.moon(time),
+            'observed_list': self.observed_list,
+            'history': self.history,
+            'current_observation': self.current_observation,
+            'sky_index': self.sky_index,
+            'ephemeris': self.get_ephemeris(time),
+            'visibility_windows': self.get_visibility_windows(time),
+        }
+
+    def _score_fields(self, time, common_properties, rows=None, stats=None):
+        """Apply the `constraints` to the fields of the catalog
+
+        Catalogs of at least `scheduler.parallel.min_fields` fields are scored
+        across a pool of processes if `scheduler.parallel.enabled` is set, see
+        `~pocs.scheduler.parallel.ParallelScorer`. The results are the same.
+
+        The time spent in and vetoes from each constraint are kept in `stats`
+        and, unless `scheduler.adaptive_constraints` is
+        False, used to evaluate the constraints that veto the most fields per
+        second first. That doesn't change the results either, see
+        `~pocs.scheduler.constraint.apply_constraints`.
+
+        Args:
+            time (astropy.time.Time): The time to score at.
+            common_properties (dict): Passed on to each constraint, see
+                `_get_common_properties`.
+            rows (numpy.ndarray, optional): Catalog rows to score, defaults to all.
+            stats (`~pocs.scheduler.constraint.ConstraintStats`, optional): Where
+                the constraints are timed, defaults to `constraint_stats`.
+
+        Returns:
+            tuple: The rows that weren't vetoed and their merits, which start at
+                1.0 and don't include the priority.
+        """
+        catalog = self.catalog
+        if rows is None:
+            rows = np.arange(len(catalog))
+
+        constraints = listify(self.constraints)
+
+        if stats is None:
+            stats = self.constraint_stats
+
+        order = None
+        if self.config['scheduler'].get('adaptive_constraints', True):
+            order = stats.order(constraints)
+
+        parallel_config = self.config['scheduler'].get('parallel', {})
+        if parallel_config.get('enabled', False) and \
+                len(rows) >= parallel_config.get('min_fields', 5000):
+            try:
+                if self._parallel_scorer is None:
+                    self._parallel_scorer = ParallelScorer(
+                        workers=parallel_config.get('workers') or None,
+                        shards=parallel_config.get('shards') or None)
+                    self.logger.debug("Created {}".format(self._parallel_scorer))
+
+                return self._parallel_scorer.score(constraints, time, self.observer, catalog,
+                                                   rows, common_properties, order=order,
+                                                   stats=stats)
+            except Exception as e:
+                self.logger.warning("Parallel scoring failed, scoring serially: {}".format(e))
+                self._parallel_scorer.shutdown()
+                self._parallel_scorer = None
+
+        return apply_constraints(constraints, time, self.observer, catalog, rows,
+                                 common_properties, logger=self.logger, order=order,
+                                 stats=stats)
+
+    def _new_catalog(self):
+        """Start over with an empty catalog"""
+        self._catalog = FieldCatalog()
+        self._observations = CatalogObservations(self._catalog)
+        self._fields_file_stat = None
+        self._listed_fields = set()
+        self._sky_index = None
+        self._reset_field_caches()
+
+    def _reset_field_caches(self):
+        """Throw away anything computed from the current set of observations"""
+        self._ephemeris = None
+        self._visibility_windows = None
+
+        if self._parallel_scorer is not None:
+            self._parallel_scorer.reset()
+
+        self._invalidate_memo('fields')
+
+    def _apply_field_diff(self, catalog, diff):
+        """Apply a `FieldListDiff` of the current catalog against `catalog`"""
+        for name in diff.removed:
+            self._catalog.remove(name)
+            self._observations.discard(name)
+
+        # Changed entries get a new `Observation`
+        for name in diff.modified:
+            self._observations.discard(name)
+
+        if diff.removed or diff.modified or self._sky_index is None:
+            self._catalog.update(catalog, names=diff.added + diff.modified)
+            self._sky_index = None
+        else:
+            # Only additions, so the index can be extended
+            sky_index = self.sky_index
+            self._catalog.update(catalog, names=diff.added)
+            for name in diff.added:
+                sky_index.add(self._catalog.get_coord(self._catalog.index(name)))
+
+        self._reset_field_caches()
+
+        self._check_duplicate_positions()
+
+    def _check_duplicate_position(self, name, coord, sky_index):
+        """Warn if `coord` is within `scheduler.duplicate_radius` arcsec of a field"""
+        radius = self.config['scheduler'].get('duplicate_radius', 1) * u.arcsec
+
+        rows = sky_index.query_radius(coord, radius)
+        if len(rows):
+            names = self._catalog.names
+            self.logger.warning("{} has the same position as {}".format(
+                name, [names[row] for row in rows]))
+
+    def _check_duplicate_positions(self):
+        """Warn about all pairs of fields within `scheduler.duplicate_radius` arcsec"""
+        radius = self.config['scheduler'].get('duplicate_radius', 1) * u.arcsec
+
+        names = self._catalog.names
+        for i, j in sorted(self.sky_index.query_pairs(radius)):
+            self.logger.warning("{} has the same position as {}".format(names[j], [names[i]]))
+
+    def _get_seq_time(self):
+        """Get a flattened `seq_time` that isn't already in the `observed_list`
+
+        Scheduling can select more than one observation within the same second,
+        in which case the time is bumped so earlier entries aren't overwritten.
+        """
+        seq_time = current_time()
+        while flatten_time(seq_time) in self.observed_list:
+            seq_time += 1 * u.second
+
+        return flatten_time(seq_time)
+
+    def _memo_key(self):
+        """ What a memoized result depends on besides the explicit invalidations """
+        return id(self._catalog), tuple(id(constraint) for constraint in listify(self.constraints))
+
+    def _invalidate_memo(self, reason):
+        if self.memo is not None and self.memo.is_valid:
+            self.logger.debug("Scheduling memo invalidated, {} changed".format(reason))
+            self.memo.invalidate()
+
+    def _add_visit(self, observation):
+        """ Add a newly selected observation to the `observed_list` and the `history` """
+        self.observed_list[observation.seq_time] = observation
+        self.history.add_visit(observation.name,
+                               Time.strptime(observation.seq_time, '%Y%m%dT%H%M%S'),
+                               seq_time=observation.seq_time)
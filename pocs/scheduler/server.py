@@ -0,0 +1,228 @@
+"""A scheduler shared by several units at the same site.
+
+The `SchedulerServer` holds one catalog, with its nightly tables and the Sun
+and Moon of the site, and answers requests for the next observation from the
+units over a ZeroMQ request/reply socket (see
+`~pocs.utils.messaging.PanMessaging.create_replier`). Each unit is scheduled
+with its own observed list and current observation, and a field given to one
+unit is claimed by it so that no other unit gets the same field, until the unit
+moves on, releases it or stops asking for `claim_timeout`.
+
+Units use it with ``scheduler.type: remote``, see `~pocs.scheduler.remote`.
+
+Requests and replies are messages on the ``SCHEDULER`` topic, with the
+``action`` of a request one of:
+
+  * ``get_observation``: ``unit`` and ``time``. The reply has the ``field``
+    (None if there is nothing to observe), its ``merit`` and its ``config``
+    as a JSON string, which keeps it clear of `PanMessaging.scrub_message`.
+  * ``release``: ``unit`` and optionally ``field``. Drops the claims of
+    ``unit``, or only the one on ``field``.
+  * ``reset``: ``unit``. Clears the observed list of ``unit``.
+  * ``status``: The current field of each unit and the claims.
+"""
+from collections import OrderedDict
+from json import dumps
+
+from astropy import units as u
+from astropy.time import Time
+
+from pocs.base import PanBase
+from pocs.utils import current_time
+from pocs.utils.messaging import PanMessaging
+
+TOPIC = 'SCHEDULER'
+
+
+class SchedulerServer(PanBase):
+
+    """ Serves the observations of one scheduler to several units """
+
+    def __init__(self, scheduler, port=None, claim_timeout=None, *args, **kwargs):
+        """
+        Args:
+            scheduler (`~pocs.scheduler.BaseScheduler`): Holds the catalog and
+                the constraints that every unit is scheduled with.
+            port (int, optional): Port to listen on, `scheduler.server.port`
+                by default.
+            claim_timeout (astropy.units.Quantity, optional): How long a unit
+                keeps a field without asking again, `scheduler.server.claim_timeout`
+                minutes by default.
+        """
+        super().__init__(*args, **kwargs)
+
+        server_config = self.config['scheduler'].get('server', {})
+
+        self.scheduler = scheduler
+        self.port = port or server_config.get('port', 6565)
+        if claim_timeout is None:
+            claim_timeout = server_config.get('claim_timeout', 60) * u.minute
+        self.claim_timeout = claim_timeout
+
+        self._units = dict()
+        self._claims = dict()
+        self._replier = None
+
+##################################################################################################
+# Methods
+##################################################################################################
+
+    def get_observation(self, unit_id, time=None):
+        """Get the best field for `unit_id` that no other unit has claimed
+
+        The field is claimed by `unit_id` and becomes its current observation.
+
+        Returns:
+            dict: The `field` name (None if nothing is available), its `merit`
+                and its `config` as JSON.
+        """
+        if time is None:
+            time = current_time()
+
+        scheduler = self.scheduler
+        catalog = scheduler.catalog
+        unit = self._get_unit(unit_id)
+
+        self._expire_claims(time)
+        taken = set(name for name, (owner, _) in self._claims.items() if owner != unit_id)
+
+        ranked_obs, _ = scheduler.rank_fields(time,
+                                              unit['observed_list'],
+                                              unit['current_observation'],
+                                              exclude=taken)
+        best = ranked_obs[0] if ranked_obs else None
+
+        current = unit['current_observation']
+        if best is None:
+            self.logger.debug("No valid observations for {}".format(unit_id))
+            self.release(unit_id)
+            unit['current_observation'] = None
+            return {'field': None, 'merit': None, 'config': None}
+
+        name, merit = best
+        if current is None or current.name != name:
+            self.release(unit_id)
+
+            self.logger.debug("Giving {} to {}".format(name, unit_id))
+            unit['current_observation'] = scheduler.observations[name]
+            unit['observed_list'][name] = unit['current_observation']
+            scheduler.history.add_visit(name, time)
+
+        self._claims[name] = (unit_id, time.jd + self.claim_timeout.to(u.day).value)
+
+        return {
+            'field': name,
+            'merit': merit,
+            'config': dumps(catalog.configs[catalog.index(name)], default=str),
+        }
+
+    def release(self, unit_id, field_name=None):
+        """ Drop the claims of `unit_id`, or only the one on `field_name` """
+        for name, (owner, _) in list(self._claims.items()):
+            if owner == unit_id and field_name in (None, name):
+                del self._claims[name]
+
+    def reset(self, unit_id):
+        """ Clear the observed list of `unit_id`, e.g. in the morning """
+        self._get_unit(unit_id)['observed_list'] = OrderedDict()
+
+    def status(self):
+        return {
+            'units': {unit_id: getattr(unit['current_observation'], 'name', None)
+                      for unit_id, unit in self._units.items()},
+            'claims': {name: owner for name, (owner, _) in self._claims.items()},
+        }
+
+    def handle(self, request):
+        """Answer one request
+
+        Args:
+            request (dict): The request, with the `action` to take.
+
+        Returns:
+            dict: The reply, with `success` False and a `message` if the
+                request couldn't be handled.
+        """
+        action = request.get('action')
+        unit_id = request.get('unit')
+
+        try:
+            if action == 'get_observation':
+                time = request.get('time')
+                reply = self.get_observation(unit_id, Time(time) if time else None)
+            elif action == 'release':
+                self.release(unit_id, field_name=request.get('field'))
+                reply = {}
+            elif action == 'reset':
+                self.reset(unit_id)
+                reply = {}
+            elif action == 'status':
+                reply = self.status()
+            else:
+                raise ValueError("Unknown action: {!r}".format(action))
+        except Exception as e:
+            self.logger.warning("Problem with request {}: {}".format(request, e))
+            return {'success': False, 'message': str(e)}
+
+        reply['success'] = True
+        return reply
+
+    def serve(self, stop_event=None, poll_ms=500):
+        """Answer requests until `stop_event` is set
+
+        Args:
+            stop_event (threading.Event, optional): Checked every `poll_ms`,
+                serves forever if not given.
+            poll_ms (int, optional): How long to wait for a request at a time.
+        """
+        if self._replier is None:
+            self._replier = PanMessaging.create_replier(self.port)
+            self.logger.info("Scheduler server listening on port {}".format(self.port))
+
+        try:
+            while stop_event is None or not stop_event.is_set():
+                topic, request = self._replier.receive_message(timeout_ms=poll_ms)
+                if topic is None:
+                    continue
+
+                if topic != TOPIC or not isinstance(request, dict):
+                    reply = {'success': False, 'message': 'Not a scheduler request'}
+                else:
+                    reply = self.handle(request)
+
+                self._replier.send_message(TOPIC, reply)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._replier is not None:
+            self._replier.close()
+            self._replier = None
+
+    def __str__(self):
+        return "SchedulerServer: port {}, {} units, {} claims".format(
+            self.port, len(self._units), len(self._claims))
+
+##################################################################################################
+# Private Methods
+##################################################################################################
+
+    def _get_unit(self, unit_id):
+        if unit_id is None:
+            raise ValueError("A unit is required")
+
+        try:
+            return self._units[unit_id]
+        except KeyError:
+            self.logger.info("New unit: {}".format(unit_id))
+            unit = self._units[unit_id] = {
+                'observed_list': OrderedDict(),
+                'current_observation': None,
+            }
+            return unit
+
+    def _expire_claims(self, time):
+        for name, (owner, expires) in list(self._claims.items()):
+            if expires < time.jd:
+                self.logger.debug("Claim of {} on {} expired".format(owner, name))
+                del self._claims[name]
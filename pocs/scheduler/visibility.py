@@ -0,0 +1,314 @@
+import hashlib
+import numpy as np
+import os
+
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+# Ratio of a solar day to a sidereal day, used to turn sidereal hour angles
+# into elapsed (UTC) time.
+SIDEREAL_RATE = 1.002737909350795
+
+# Length of a sidereal day in (solar) days
+SIDEREAL_DAY = 1. / SIDEREAL_RATE
+
+
+def stack_coords(observations):
+    """Stack the field positions of a list of observations into one `SkyCoord`.
+
+    Building the array from plain RA/Dec values is much cheaper than passing
+    a list of scalar `SkyCoord` objects to the `SkyCoord` initializer.
+
+    Args:
+        observations (list): A list of `~pocs.scheduler.observation.Observation`.
+
+    Returns:
+        astropy.coordinates.SkyCoord: ICRS coordinates, one per observation.
+    """
+    ra = np.array([obs.field.coord.ra.degree for obs in observations], dtype=float)
+    dec = np.array([obs.field.coord.dec.degree for obs in observations], dtype=float)
+
+    return SkyCoord(ra=ra * u.degree, dec=dec * u.degree, frame='icrs')
+
+
+def hour_angles(time, observer, coords, altaz=None):
+    """Apparent hour angle and declination of each of `coords` at `time`.
+
+    A single vectorized `altaz` transform is inverted with spherical
+    trigonometry, so the result includes the same precession, nutation and
+    aberration corrections as `~astroplan.Observer.altaz`.
+
+    Args:
+        time (astropy.time.Time): A scalar time.
+        observer (astroplan.Observer): The observer location.
+        coords (astropy.coordinates.SkyCoord): Target coordinates.
+        altaz (astropy.coordinates.SkyCoord or tuple, optional): The `altaz` of
+            `coords` at `time` if it has already been computed, either as a
+            `SkyCoord` or as a tuple of (alt, az) arrays in degrees, e.g. from
+            `~pocs.scheduler.ephemeris.FieldEphemeris.altaz`.
+
+    Returns:
+        tuple(numpy.ndarray, numpy.ndarray): Hour angles in degrees in the
+            range [-180, 180) and apparent declinations in degrees.
+    """
+    if altaz is None:
+        altaz = observer.altaz(time, coords)
+
+    if isinstance(altaz, tuple):
+        alt, az = np.radians(altaz[0]), np.radians(altaz[1])
+    else:
+        alt, az = altaz.alt.radian, altaz.az.radian
+
+    lat = observer.location.lat.radian
+
+    dec = np.arcsin(np.sin(lat) * np.sin(alt) + np.cos(lat) * np.cos(alt) * np.cos(az))
+    ha = np.arctan2(-np.sin(az) * np.cos(alt),
+                    np.cos(lat) * np.sin(alt) - np.sin(lat) * np.cos(alt) * np.cos(az))
+
+    return (np.degrees(ha) + 180.) % 360. - 180., np.degrees(dec)
+
+
+def transit_times(time, observer, coords, altaz=None):
+    """Next meridian transit of each of `coords` after `time`.
+
+    Args:
+        time (astropy.time.Time): A scalar time.
+        observer (astroplan.Observer): The observer location.
+        coords (astropy.coordinates.SkyCoord): Target coordinates.
+        altaz (astropy.coordinates.SkyCoord, optional): Precomputed `altaz`.
+
+    Returns:
+        numpy.ndarray: Transit times as JD (UTC).
+    """
+    ha, _ = hour_angles(time, observer, coords, altaz=altaz)
+
+    # Degrees of hour angle until the target is back on the meridian.
+    to_transit = (-ha) % 360.
+
+    return time.jd + _hour_angle_to_days(to_transit)
+
+
+def set_times(time, observer, coords, horizon=0 * u.degree, altaz=None):
+    """Next time each of `coords` sets below `horizon` after `time`.
+
+    Targets that never set below `horizon` get a set time of `inf` and
+    targets that never rise above it get `nan`.
+
+    Args:
+        time (astropy.time.Time): A scalar time.
+        observer (astroplan.Observer): The observer location.
+        coords (astropy.coordinates.SkyCoord): Target coordinates.
+        horizon (astropy.units.Quantity, optional): Altitude of the horizon.
+        altaz (astropy.coordinates.SkyCoord, optional): Precomputed `altaz`.
+
+    Returns:
+        numpy.ndarray: Set times as JD (UTC).
+    """
+    ha, dec = hour_angles(time, observer, coords, altaz=altaz)
+    ha_set = _setting_hour_angles(observer.location.lat.degree, dec, horizon)
+
+    with np.errstate(invalid='ignore'):
+        to_set = (ha_set - ha) % 360.
+
+    set_jd = time.jd + _hour_angle_to_days(to_set)
+    set_jd[np.isposinf(ha_set)] = np.inf
+
+    return set_jd
+
+
+def _hour_angle_to_days(ha):
+    """Convert degrees of hour angle into elapsed days."""
+    return (ha / 15.) / SIDEREAL_RATE / 24.
+
+
+def _setting_hour_angles(lat, dec, horizon):
+    """Hour angle at which each target crosses `horizon` while setting.
+
+    Returns `inf` for targets that never set and `nan` for targets that never
+    rise above the horizon.
+    """
+    lat = np.radians(lat)
+    dec = np.radians(dec)
+    alt = u.Quantity(horizon, u.degree).to(u.radian).value
+
+    cos_ha = (np.sin(alt) - np.sin(lat) * np.sin(dec)) / (np.cos(lat) * np.cos(dec))
+
+    with np.errstate(invalid='ignore'):
+        ha_set = np.degrees(np.arccos(cos_ha))
+
+    ha_set[cos_ha < -1] = np.inf
+    ha_set[cos_ha > 1] = np.nan
+
+    return ha_set
+
+
+class VisibilityWindows(object):
+
+    """ Rise, set and meridian transit times of a set of fields for one night
+
+    The times are computed once in a batch (see `compute`) for the first
+    crossing after the start of the night. Because fixed fields repeat every
+    sidereal day, the next rise, set or transit after any later time is then
+    simple arithmetic on the table, so the `Duration` constraint doesn't need
+    to do any coordinate transforms or root finding while scheduling.
+
+    Tables can be saved to and loaded from disk so that a restart in the middle
+    of the night doesn't recompute them, see `cache_path`.
+    """
+
+    def __init__(self, names, rise_time, set_time, transit_time, start_time, end_time, horizon):
+        """Create a table from already computed times.
+
+        Args:
+            names (list): Field names, one per row.
+            rise_time (numpy.ndarray): Next rise above `horizon` after `start_time` as JD.
+            set_time (numpy.ndarray): Next set below `horizon` after `start_time` as JD.
+            transit_time (numpy.ndarray): Next meridian transit after `start_time` as JD.
+            start_time (astropy.time.Time): Start of the night.
+            end_time (astropy.time.Time): End of the night.
+            horizon (astropy.units.Quantity): Altitude of the horizon.
+        """
+        assert len(names) == len(rise_time) == len(set_time) == len(transit_time), \
+            "Mismatched window arrays"
+
+        self.names = list(names)
+        self.rise_time = np.asarray(rise_time, dtype=float)
+        self.set_time = np.asarray(set_time, dtype=float)
+        self.transit_time = np.asarray(transit_time, dtype=float)
+        self.start_time = start_time
+        self.end_time = end_time
+        self.horizon = u.Quantity(horizon, u.degree)
+
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def compute(cls, observer, names, coords, start_time, end_time, horizon=0 * u.degree):
+        """Compute the windows for `coords` with a single coordinate transform.
+
+        Args:
+            observer (astroplan.Observer): The observer location.
+            names (list): Field names, one per entry in `coords`.
+            coords (astropy.coordinates.SkyCoord): Stacked field coordinates.
+            start_time (astropy.time.Time): Start of the night.
+            end_time (astropy.time.Time): End of the night.
+            horizon (astropy.units.Quantity, optional): Altitude of the horizon.
+
+        Returns:
+            VisibilityWindows: The table for the night.
+        """
+        if len(coords):
+            ha, dec = hour_angles(start_time, observer, coords)
+            ha_set = _setting_hour_angles(observer.location.lat.degree, dec, horizon)
+
+            with np.errstate(invalid='ignore'):
+                rise_time = start_time.jd + _hour_angle_to_days((-ha_set - ha) % 360.)
+                set_time = start_time.jd + _hour_angle_to_days((ha_set - ha) % 360.)
+
+            # Circumpolar fields never rise or set
+            rise_time[np.isposinf(ha_set)] = np.inf
+            set_time[np.isposinf(ha_set)] = np.inf
+
+            transit_time = start_time.jd + _hour_angle_to_days((-ha) % 360.)
+        else:
+            rise_time = set_time = transit_time = np.zeros(0)
+
+        return cls(names, rise_time, set_time, transit_time, start_time, end_time, horizon)
+
+    @classmethod
+    def load(cls, path):
+        """Load a table written by `save`."""
+        with np.load(path) as data:
+            return cls(list(data['names']),
+                       data['rise_time'],
+                       data['set_time'],
+                       data['transit_time'],
+                       Time(float(data['start_time']), format='jd'),
+                       Time(float(data['end_time']), format='jd'),
+                       float(data['horizon']) * u.degree)
+
+    def save(self, path):
+        """Write the table to `path` as a numpy `.npz` file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write then rename so a crash never leaves a partial table behind
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path,
+                 names=np.array(self.names, dtype=str),
+                 rise_time=self.rise_time,
+                 set_time=self.set_time,
+                 transit_time=self.transit_time,
+                 start_time=self.start_time.jd,
+                 end_time=self.end_time.jd,
+                 horizon=self.horizon.value)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def cache_path(directory, observer, names, coords, end_time, horizon):
+        """Path of the saved table for a (field set, night, horizon).
+
+        The night is identified by the UTC date of its end, which doesn't
+        change over the course of the night.
+        """
+        key = hashlib.sha1()
+        key.update('\n'.join(names).encode())
+        key.update(np.round(coords.ra.degree, 6).tobytes())
+        key.update(np.round(coords.dec.degree, 6).tobytes())
+        key.update('{:.6f} {:.6f} {:.3f}'.format(observer.location.lat.degree,
+                                                 observer.location.lon.degree,
+                                                 u.Quantity(horizon, u.degree).value).encode())
+
+        filename = 'visibility_{}_{}.npz'.format(end_time.isot[:10], key.hexdigest()[:16])
+
+        return os.path.join(directory, filename)
+
+##################################################################################################
+# Methods
+##################################################################################################
+
+    def covers(self, time):
+        """ If `time` falls in the night the table was computed for """
+        return self.start_time.jd <= time.jd <= self.end_time.jd
+
+    def index(self, name):
+        """ The row for the field called `name`, or None if not in the table """
+        return self._index.get(name)
+
+    def next_rise(self, time, index=None):
+        """ Next time each field rises above the horizon, as JD """
+        return self._next(self.rise_time, time, index)
+
+    def next_set(self, time, index=None):
+        """ Next time each field sets below the horizon, as JD """
+        return self._next(self.set_time, time, index)
+
+    def next_transit(self, time, index=None):
+        """ Next meridian transit of each field, as JD """
+        return self._next(self.transit_time, time, index)
+
+    def is_up(self, time, index=None):
+        """ If each field is above the horizon at `time` """
+        rise_time = self.next_rise(time, index=index)
+        set_time = self.next_set(time, index=index)
+
+        # A field is up if it sets before it next rises. Fields that never
+        # set have inf for both and fields that never rise have nan.
+        with np.errstate(invalid='ignore'):
+            return np.isposinf(set_time) | (set_time < rise_time)
+
+    def _next(self, times, time, index):
+        if index is not None:
+            times = times[index]
+
+        with np.errstate(invalid='ignore'):
+            periods = np.ceil((time.jd - times) / SIDEREAL_DAY)
+            periods = np.where(np.isfinite(periods) & (periods > 0), periods, 0)
+
+        return times + periods * SIDEREAL_DAY
+
+    def __len__(self):
+        return len(self.names)
+
+    def __str__(self):
+        return "VisibilityWindows: {} fields above {} from {} to {}".format(
+            len(self), self.horizon, self.start_time.isot, self.end_time.isot)
@@ -3,6 +3,7 @@ import yaml
 
 from transitions import State
 
+from pocs.state.trace import StateTracer
 from pocs.utils import error
 from pocs.utils import listify
 from pocs.utils import load_module
@@ -25,6 +26,9 @@ class PanStateMachine(Machine):
 
     def __init__(self, state_machine_table, **kwargs):
 
+        #: StateTracer: Time spent in each state and its steps.
+        self.tracer = StateTracer()
+
         if isinstance(state_machine_table, str):
             self.logger.info("Loading state table: {}".format(state_machine_table))
             state_machine_table = PanStateMachine.load_state_table(
@@ -185,18 +189,37 @@ class PanStateMachine(Machine):
             bool: If state was successfully changed.
         """
         state_changed = False
+        source = self.state
 
         # Get the next transition method based off `state` and `next_state`
-        transition_method_name = self._lookup_trigger()
+        with self.tracer.span(source, 'lookup'):
+            transition_method_name = self._lookup_trigger()
 
         self.logger.debug("Transition method: {}".format(transition_method_name))
 
         transition_method = getattr(self, transition_method_name, self.park)
-        state_changed = transition_method()
-        self.db.insert_current('state', {"source": self.state, "dest": self.next_state})
+        # Includes the safety check and the `on_enter` of the next state
+        with self.tracer.span(source, 'transition'):
+            state_changed = transition_method()
+
+        with self.tracer.span(source, 'db'):
+            self.db.insert_current('state', {"source": self.state, "dest": self.next_state})
 
         return state_changed
 
+    def write_state_trace(self):
+        """Write the state trace of each night
+
+        The timeline and histograms of the time spent in each state are
+        written as JSON and CSV to the `state_trace` data directory.
+        """
+        directory = os.path.join(self.config['directories']['data'], 'state_trace')
+        try:
+            paths = self.tracer.write(directory)
+            self.logger.debug("State trace written to {}".format(paths))
+        except Exception as e:
+            self.logger.warning("Can't write state trace: {}".format(e))
+
     def stop_states(self):
         """ Stops the machine loop on the next iteration """
         self.logger.info("Stopping POCS states")
@@ -235,7 +258,8 @@ class PanStateMachine(Machine):
             self.logger.debug("Always safe to move to {}".format(event_data.event.name))
             is_safe = True
         else:
-            is_safe = self.is_safe()
+            with self.tracer.span(self.state, 'safety'):
+                is_safe = self.is_safe()
 
         return is_safe
 
@@ -263,7 +287,8 @@ class PanStateMachine(Machine):
         """ Called before each state.
 
         Starts collecting stats on this particular state, which are saved during
-        the call to `after_state`.
+        the call to `after_state`, and records the time spent in the state
+        being left.
 
         Args:
             event_data(transitions.EventData):  Contains informaton about the event
@@ -273,6 +298,8 @@ class PanStateMachine(Machine):
                 event_data.event.name,
                 event_data.state.name))
 
+        self.tracer.exit(event_data.state.name)
+
     def after_state(self, event_data):
         """ Called after each state.
 
@@ -287,6 +314,11 @@ class PanStateMachine(Machine):
                 event_data.event.name,
                 event_data.state.name))
 
+        # The night is over
+        if event_data.state.name == 'sleeping' and \
+                self.config.get('state_trace', {}).get('write', True):
+            self.write_state_trace()
+
 
 ##################################################################################################
 # Class Methods
@@ -338,8 +370,12 @@ class PanStateMachine(Machine):
         # Return parking if we don't find anything
         return 'parking'
 
+    def _trace_enter(self, event_data):
+        self.tracer.enter(event_data.state.name)
+
     def _update_status(self, event_data):
-        self.status()
+        with self.tracer.span(event_data.state.name, 'status'):
+            self.status()
 
     def _update_graph(self, event_data):  # pragma: no cover
         model = event_data.model
@@ -380,7 +416,8 @@ class PanStateMachine(Machine):
             self.logger.debug("Checking {}".format(state_module))
 
             on_enter_method = getattr(state_module, 'on_enter')
-            setattr(self, 'on_enter_{}'.format(state), on_enter_method)
+            setattr(self, 'on_enter_{}'.format(state),
+                    self._traced_on_enter(state, on_enter_method))
             self.logger.debug(
                 "Added `on_enter` method from {} {}".format(
                     state_module, on_enter_method))
@@ -388,6 +425,7 @@ class PanStateMachine(Machine):
             self.logger.debug("Created state")
             s = State(name=state)
 
+            s.add_callback('enter', '_trace_enter')
             s.add_callback('enter', '_update_status')
 
             if can_graph:
@@ -400,6 +438,13 @@ class PanStateMachine(Machine):
 
         return s
 
+    def _traced_on_enter(self, state, on_enter_method):
+        def on_enter(event_data):
+            with self.tracer.span(state, 'on_enter'):
+                return on_enter_method(event_data)
+
+        return on_enter
+
     def _load_transition(self, transition):
         self.logger.debug("Loading transition: {}".format(transition))
 
@@ -20,6 +20,12 @@ def on_enter(event_data):
         camera_events = list(camera_events_info.values())
         pocs.wait_for_events(camera_events, maximum_duration, event_type='observing')
 
+        # With a pipeline, earlier exposures were processed while this one was taken
+        for job in pocs.observatory.processed_exposures():
+            if job.error is not None:
+                raise pocs_utils.error.PanError("Problem processing {}: {}".format(
+                    job.name, job.error))
+
     except pocs_utils.error.Timeout:
         pocs.logger.warning(
             "Timeout while waiting for images. Something wrong with camera, going to park.")
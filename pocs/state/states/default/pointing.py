@@ -1,6 +1,9 @@
 from pocs.images import Image
+from pocs.utils.analysis import future_event
+from pocs.utils.analysis import solve_image
 
 MAX_EXTRA_TIME = 60  # second
+MAX_SOLVE_TIME = 120  # seconds
 
 
 def on_enter(event_data):
@@ -59,6 +62,14 @@ def on_enter(event_data):
                 pocs.logger.debug("Pointing image: {}".format(pointing_image))
 
                 pocs.say("Ok, I've got the pointing picture, let's see how close we are.")
+
+                # Solve in an analysis worker, handling commands meanwhile
+                solve = pocs.observatory.analysis.submit('Solve {}'.format(pointing_id),
+                                                         solve_image, pointing_path)
+                pocs.wait_for_events(future_event(solve), MAX_SOLVE_TIME, event_type='solving')
+                solve.result()
+
+                # Read the solution
                 pointing_image.solve_field()
 
                 # Store the solved image object
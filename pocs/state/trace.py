@@ -0,0 +1,185 @@
+import csv
+import json
+import os
+import time
+
+from collections import OrderedDict
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def night_of(timestamp):
+    """Night a time belongs to
+
+    Times are shifted back by 12 hours so that a night is named after the
+    (local) date of its evening.
+
+    Args:
+        timestamp (float): Time from `time.time`.
+
+    Returns:
+        str: The night, e.g. '2016-08-13'.
+    """
+    return datetime.fromtimestamp(timestamp - 12 * 3600).strftime('%Y-%m-%d')
+
+
+class StateTracer(object):
+
+    """ Records how long the state machine spends in each state
+
+    Each record is one span: how long POCS was in a state (the `state` step),
+    or one of the steps done for it, e.g. `on_enter`, `safety`, `lookup` or
+    `db`. The records are kept in `records` and summarized per night by
+    `histograms`, so the states that take up the night can be found.
+    """
+
+    #: tuple: Upper edges in seconds of the histogram bins, the last bin has the rest.
+    bins = (0.1, 1, 10, 60, 300, 900, 3600)
+
+    fields = ('night', 'state', 'step', 'start', 'end', 'duration')
+
+    def __init__(self, maxlen=10000):
+        """
+        Args:
+            maxlen (int, optional): Number of records kept.
+        """
+        #: deque: `night`, `state`, `step`, `start`, `end` and `duration` of each span.
+        self.records = deque(maxlen=maxlen)
+
+        self._entered = dict()
+
+    def enter(self, state):
+        """ Note that the machine has entered `state` """
+        self._entered[state] = (time.time(), time.monotonic())
+
+    def exit(self, state):
+        """ Note that the machine is leaving `state`, recording the time spent in it """
+        try:
+            start, started = self._entered.pop(state)
+        except KeyError:
+            return
+
+        self._record(state, 'state', start, time.monotonic() - started)
+
+    @contextmanager
+    def span(self, state, step):
+        """Record how long the block takes as `step` of `state`
+
+        Args:
+            state (str): The state the step is for.
+            step (str): Name of the step.
+        """
+        start = time.time()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._record(state, step, start, time.monotonic() - started)
+
+    @property
+    def nights(self):
+        """ Nights there are records for """
+        return list(OrderedDict.fromkeys(record['night'] for record in self.records))
+
+    def timeline(self, night=None):
+        """Records of `night` in the order they finished
+
+        Args:
+            night (str, optional): The night, see `night_of`, defaults to all.
+
+        Returns:
+            list: The records.
+        """
+        return [record for record in self.records
+                if night is None or record['night'] == night]
+
+    def histograms(self, night=None):
+        """Duration of each step of each state, per night
+
+        Args:
+            night (str, optional): Only this night, defaults to all.
+
+        Returns:
+            dict: For each night, state and step the `count`, `total`,
+                `mean` and `max` seconds, and the number of spans in each of
+                the `bins`.
+        """
+        histograms = OrderedDict()
+        for record in self.timeline(night):
+            steps = histograms.setdefault(record['night'], OrderedDict()).setdefault(
+                record['state'], OrderedDict())
+            stats = steps.setdefault(record['step'], {
+                'count': 0,
+                'total': 0.,
+                'max': 0.,
+                'bins': [0] * (len(self.bins) + 1),
+            })
+
+            duration = record['duration']
+            stats['count'] += 1
+            stats['total'] += duration
+            stats['max'] = max(stats['max'], duration)
+            stats['bins'][sum(1 for edge in self.bins if duration > edge)] += 1
+
+        for states in histograms.values():
+            for steps in states.values():
+                for stats in steps.values():
+                    stats['mean'] = stats['total'] / stats['count']
+
+        return histograms
+
+    def time_in_states(self, night=None):
+        """ Seconds spent in each state, largest first """
+        totals = dict()
+        for record in self.timeline(night):
+            if record['step'] == 'state':
+                totals[record['state']] = totals.get(record['state'], 0.) + record['duration']
+
+        return OrderedDict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+    def to_json(self, path, night=None):
+        """ Write the timeline and histograms of `night` to `path` """
+        with open(path, 'w') as f:
+            json.dump({
+                'timeline': self.timeline(night),
+                'bins': self.bins,
+                'histograms': self.histograms(night),
+            }, f, indent=2)
+
+    def to_csv(self, path, night=None):
+        """ Write the timeline of `night` to `path` """
+        with open(path, 'w') as f:
+            writer = csv.DictWriter(f, fieldnames=self.fields)
+            writer.writeheader()
+            writer.writerows(self.timeline(night))
+
+    def write(self, directory):
+        """Write the JSON and CSV of each night to `directory`
+
+        Returns:
+            list: Names of the files written.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        paths = list()
+        for night in self.nights:
+            base_path = os.path.join(directory, 'state_trace_{}'.format(night))
+            self.to_json(base_path + '.json', night=night)
+            self.to_csv(base_path + '.csv', night=night)
+            paths.extend([base_path + '.json', base_path + '.csv'])
+
+        return paths
+
+    def __str__(self):
+        return "StateTracer: {} records".format(len(self.records))
+
+    def _record(self, state, step, start, duration):
+        self.records.append(OrderedDict([
+            ('night', night_of(start)),
+            ('state', state),
+            ('step', step),
+            ('start', start),
+            ('end', start + duration),
+            ('duration', duration),
+        ]))
@@ -33,6 +33,8 @@ def config(images_dir, messaging_ports):
         _one_time_config['db']['name'] = 'panoptes_testing'
         _one_time_config['name'] = 'PAN000'  # Make sure always testing with PAN000
         _one_time_config['scheduler']['fields_file'] = 'simulator.yaml'
+        # Don't write compiled fields file caches into resources/targets
+        _one_time_config['scheduler']['cache_fields_file'] = False
 
     # Make a copy before we modify based on test fixtures.
     result = copy.deepcopy(_one_time_config)
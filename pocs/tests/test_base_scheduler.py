@@ -1,4 +1,5 @@
 import pytest
+import shutil
 import yaml
 
 from astropy import units as u
@@ -18,8 +19,11 @@ def constraints():
 
 
 @pytest.fixture
-def simple_fields_file(config):
-    return config['directories']['targets'] + '/simulator.yaml'
+def simple_fields_file(config, tmpdir):
+    # A copy, so the compiled cache isn't written next to the original
+    fields_file = str(tmpdir.join('simulator.yaml'))
+    shutil.copy(config['directories']['targets'] + '/simulator.yaml', fields_file)
+    return fields_file
 
 
 @pytest.fixture
@@ -126,6 +130,61 @@ def test_loading_target_file_via_property(simple_fields_file, observer, constrai
     assert scheduler.observations is not None
 
 
+def test_reread_unchanged_fields_file(observer, field_list, constraints, tmpdir):
+    fields_file = tmpdir.join('fields.yaml')
+    fields_file.write(yaml.dump(field_list))
+
+    scheduler = Scheduler(observer, fields_file=str(fields_file), constraints=constraints)
+    observation = scheduler.observations['HD 189733']
+
+    # Unchanged, so nothing is recreated
+    scheduler.read_field_list()
+    assert scheduler.observations['HD 189733'] is observation
+
+    fields_file.write(yaml.dump(field_list[:2]))
+    scheduler.read_field_list()
+    assert len(scheduler.observations) == 2
+
+
+def test_reread_applies_diff(observer, field_list, constraints, tmpdir):
+    fields_file = tmpdir.join('fields.yaml')
+    fields_file.write(yaml.dump(field_list))
+
+    scheduler = Scheduler(observer, fields_file=str(fields_file), constraints=constraints)
+    scheduler.add_observation({'name': 'Added Field', 'position': '12h30m01s +08d08m08s'})
+
+    kept = scheduler.observations['HD 189733']
+    kept.merit = 42.
+    kept.exposure_list['image_0'] = 'foo.fits'
+    modified = scheduler.observations['HD 209458']
+
+    new_list = [dict(field) for field in field_list[:4]]
+    new_list[1]['priority'] = 5000
+    new_list.append({'name': 'New Field', 'position': '08h40m24s +19d40m00.12s'})
+    fields_file.write(yaml.dump(new_list))
+
+    diff = scheduler.read_field_list()
+    assert diff.added == ['New Field']
+    assert diff.modified == ['HD 209458']
+    assert sorted(diff.removed) == sorted(field['name'] for field in field_list[4:])
+
+    # Unchanged observations keep their state
+    assert scheduler.observations['HD 189733'] is kept
+    assert scheduler.observations['HD 189733'].merit == 42.
+    assert len(scheduler.observations['HD 189733'].exposure_list) == 1
+
+    assert scheduler.observations['HD 209458'] is not modified
+    assert scheduler.observations['HD 209458'].priority == 5000
+
+    # Fields that weren't in the file are left alone
+    assert 'Added Field' in scheduler.observations
+    assert len(scheduler.observations) == 6
+    assert len(scheduler.sky_index) == 6
+
+    # Nothing changed
+    assert not scheduler.read_field_list()
+
+
 def test_with_location(scheduler):
     assert isinstance(scheduler, Scheduler)
 
@@ -19,6 +19,8 @@ from pocs.utils.config import load_config
 from pocs.utils.error import NotFound
 from pocs.utils.images import fits as fits_utils
 from pocs.utils import error
+from pocs.utils.pipeline import Pipeline
+from pocs.utils.sync import SynchronizedStart
 from pocs import hardware
 
 
@@ -338,6 +340,45 @@ def test_observation(camera, images_dir):
     assert len(glob.glob(observation_pattern)) == 1
 
 
+def test_observation_pipeline(camera, images_dir):
+    """
+    Tests take_observation() with the exposure processed in a pipeline
+    """
+    field = Field('Test Observation', '20h00m43.7135s +22d42m39.0645s')
+    observation = Observation(field, exp_time=1.5 * u.second)
+    observation.seq_time = '19991231T235958'
+    pipeline = Pipeline()
+
+    readout_event = camera.take_observation(observation, headers={}, pipeline=pipeline)
+    assert readout_event.wait(timeout=10)
+
+    pipeline.wait()
+    job = pipeline.finished()[0]
+    assert job.error is None
+    observation_pattern = os.path.join(images_dir, 'fields', 'TestObservation',
+                                       camera.uid, observation.seq_time, '*.fits*')
+    assert len(glob.glob(observation_pattern)) == 1
+
+
+def test_observation_sync_start(camera, images_dir):
+    """
+    Tests take_observation() started with a SynchronizedStart
+    """
+    field = Field('Test Observation', '20h00m43.7135s +22d42m39.0645s')
+    observation = Observation(field, exp_time=1.5 * u.second)
+    observation.seq_time = '19991231T235957'
+    sync_start = SynchronizedStart([camera.name])
+
+    observation_event = camera.take_observation(observation, headers={}, sync_start=sync_start)
+    assert observation_event.wait(timeout=60)
+
+    assert list(sync_start.skews) == [camera.name]
+    observation_pattern = os.path.join(images_dir, 'fields', 'TestObservation',
+                                       camera.uid, observation.seq_time, '*.fits*')
+    fits_file = glob.glob(observation_pattern)[0]
+    assert fits_utils.getval(fits_file, 'STARTSKW') == pytest.approx(sync_start.skews[camera.name])
+
+
 def test_autofocus_coarse(camera, patterns, counter):
     autofocus_event = camera.autofocus(coarse=True)
     autofocus_event.wait()
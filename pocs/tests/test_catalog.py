@@ -0,0 +1,183 @@
+import numpy as np
+import os
+import pytest
+import yaml
+
+from astropy import units as u
+
+from pocs.scheduler.catalog import CatalogObservations
+from pocs.scheduler.catalog import FieldCatalog
+from pocs.scheduler.catalog import FieldView
+from pocs.scheduler.observation import Observation
+from pocs.utils import error
+
+
+@pytest.fixture
+def field_list():
+    return [
+        {'name': 'HD 189733', 'position': '20h00m43.7135s +22d42m39.0645s', 'priority': 100},
+        {'name': 'HD 209458', 'position': '22h03m10.7721s +18d53m03.543s', 'priority': 50},
+        {'name': 'Tres 3', 'position': '17h52m07.02s +37d32m46.2012s',
+         'exp_set_size': 15, 'min_nexp': 240},
+        {'name': 'KIC 8462852', 'position': '20h06m15.4536s +44d27m24.75s',
+         'exp_time': 60, 'exp_set_size': 15, 'min_nexp': 45},
+    ]
+
+
+@pytest.fixture
+def catalog(field_list):
+    return FieldCatalog(field_list)
+
+
+def test_columns(catalog):
+    assert len(catalog) == 4
+    assert catalog.names == ['HD 189733', 'HD 209458', 'Tres 3', 'KIC 8462852']
+    assert np.array_equal(catalog.priority, [100, 50, 100, 100])
+    assert np.array_equal(catalog.exp_time, [120, 120, 120, 60])
+    assert np.array_equal(catalog.min_nexp, [60, 60, 240, 45])
+    assert np.array_equal(catalog.minimum_duration, [7200, 7200, 28800, 2700])
+    assert np.array_equal(catalog.set_duration, [1200, 1200, 1800, 900])
+    assert catalog.coords[2].ra.to_string(unit=u.hour) == '17h52m07.02s'
+
+
+def test_view_matches_observation(catalog):
+    for row in range(len(catalog)):
+        view = catalog.view(row)
+        observation = view.to_observation()
+
+        assert isinstance(observation, Observation)
+        assert view.name == observation.name
+        assert view.priority == observation.priority
+        assert view.exp_time == observation.exp_time
+        assert view.minimum_duration == observation.minimum_duration
+        assert view.set_duration == observation.set_duration
+        assert view.coord.separation(observation.field.coord) < 1 * u.arcsec
+
+
+def test_view_slots(catalog):
+    view = catalog.views()[0]
+    assert isinstance(view, FieldView)
+    with pytest.raises(AttributeError):
+        view.merit = 1
+
+
+def test_invalid_fields(catalog):
+    invalid = catalog.extend([
+        {'name': 'Bad exp_time', 'position': '12h30m01s +08d08m08s', 'exp_time': -10},
+        {'name': 'Bad nexp', 'position': '12h30m01s +08d08m08s', 'min_nexp': 11},
+        {'name': 'Bad priority', 'position': '12h30m01s +08d08m08s', 'priority': 0},
+        {'name': '', 'position': '12h30m01s +08d08m08s'},
+        {'name': 'No position'},
+        {'name': 'Bad position', 'position': 'Not a position'},
+        {'name': 'Good', 'position': '12h30m01s +08d08m08s'},
+    ])
+
+    assert len(invalid) == 6
+    assert all(isinstance(e, error.InvalidObservation) for _, e in invalid)
+    assert len(catalog) == 5
+    assert 'Good' in catalog
+
+    with pytest.raises(error.InvalidObservation):
+        catalog.append({'name': 'Bad exp_time', 'position': '12h30m01s +08d08m08s',
+                        'exp_time': -10})
+
+
+def test_replace_and_remove(catalog):
+    catalog.ra  # Build the arrays
+
+    assert catalog.append({'name': 'HD 209458', 'position': '22h03m10.7721s +18d53m03.543s',
+                           'priority': 500}) == 1
+    assert len(catalog) == 4
+    assert catalog.priority[1] == 500
+
+    catalog.remove('HD 209458')
+    assert len(catalog) == 3
+    assert catalog.index('Tres 3') == 1
+    assert catalog.index('KIC 8462852') == 2
+    assert catalog.names == ['HD 189733', 'Tres 3', 'KIC 8462852']
+    assert len(catalog.coords) == 3
+
+    with pytest.raises(KeyError):
+        catalog.remove('HD 209458')
+
+
+def test_catalog_observations(catalog):
+    observations = CatalogObservations(catalog)
+
+    assert len(observations) == 4
+    assert list(observations.keys()) == catalog.names
+    assert 'Tres 3' in observations
+    assert not observations.is_created('Tres 3')
+
+    observation = observations['Tres 3']
+    assert observations.is_created('Tres 3')
+    assert observations['Tres 3'] is observation
+    assert observations.created() == [('Tres 3', observation)]
+
+    observations.discard('Tres 3')
+    assert observations['Tres 3'] is not observation
+
+    with pytest.raises(KeyError):
+        observations['Not a field']
+
+
+def test_from_file_cache(field_list, tmpdir):
+    fields_file = tmpdir.join('fields.yaml')
+    fields_file.write(yaml.dump(field_list))
+    cache_file = FieldCatalog.cache_path(str(fields_file))
+
+    catalog = FieldCatalog.from_file(str(fields_file))
+    assert catalog.names == [field['name'] for field in field_list]
+    assert os.path.exists(cache_file)
+
+    # Comes from the cache, not the YAML
+    cached = FieldCatalog.from_file(str(fields_file))
+    assert cached.names == catalog.names
+    assert np.array_equal(cached.ra, catalog.ra)
+
+    # Touched but unchanged keeps the cached copy
+    os.utime(str(fields_file), ns=(0, 0))
+    assert FieldCatalog.from_file(str(fields_file)).names == catalog.names
+
+    # Changed
+    fields_file.write(yaml.dump(field_list[:2] + [{'name': 'Bad', 'exp_time': -1}]))
+    catalog = FieldCatalog.from_file(str(fields_file))
+    assert catalog.names == ['HD 189733', 'HD 209458']
+    assert len(catalog.invalid) == 1
+
+    # No cache
+    os.remove(cache_file)
+    assert len(FieldCatalog.from_file(str(fields_file), use_cache=False)) == 2
+    assert not os.path.exists(cache_file)
+
+
+def test_from_file_corrupt_cache(field_list, tmpdir):
+    fields_file = tmpdir.join('fields.yaml')
+    fields_file.write(yaml.dump(field_list))
+
+    with open(FieldCatalog.cache_path(str(fields_file)), 'w') as f:
+        f.write('Not a pickle')
+
+    assert len(FieldCatalog.from_file(str(fields_file))) == 4
+
+
+def test_diff(catalog, field_list):
+    new_list = [dict(field) for field in field_list[1:]]
+    new_list[0]['priority'] = 1
+    new_list.append({'name': 'New', 'position': '12h30m01s +08d08m08s'})
+    new_catalog = FieldCatalog(new_list)
+
+    diff = catalog.diff(new_catalog)
+    assert diff.added == ['New']
+    assert diff.removed == ['HD 189733']
+    assert diff.modified == ['HD 209458']
+    assert str(diff) == '1 added, 1 removed, 1 modified'
+
+    # Only listed fields can be removed
+    assert catalog.diff(new_catalog, removable=set()).removed == []
+
+    assert not catalog.diff(FieldCatalog(field_list))
+
+    catalog.update(new_catalog, names=diff.added + diff.modified)
+    catalog.remove('HD 189733')
+    assert not catalog.diff(new_catalog)
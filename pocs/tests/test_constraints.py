@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 import yaml
 
@@ -17,6 +18,11 @@ from pocs.scheduler.constraint import BaseConstraint
 from pocs.scheduler.constraint import Duration
 from pocs.scheduler.constraint import MoonAvoidance
 from pocs.scheduler.constraint import AlreadyVisited
+from pocs.scheduler.constraint import Cadence
+from pocs.scheduler.constraint import ConstraintStats
+from pocs.scheduler.constraint import apply_constraints
+from pocs.scheduler.catalog import FieldCatalog
+from pocs.scheduler.history import ObservationHistory
 
 from pocs.utils import horizon as horizon_utils
 
@@ -235,6 +241,25 @@ def test_moon_avoidance(observer):
     assert score2 > score1
 
 
+def test_moon_avoidance_no_moon(observer):
+    mac = MoonAvoidance()
+
+    time = Time('2016-08-13 10:00:00')
+    moon = get_moon(time, observer.location)
+
+    observations = [Observation(Field('Sabik', '17h10m23s -15d43m30s')),
+                    Observation(Field('Hat-P-16', '00h38m17.59s +42d27m47.2s'))]
+
+    # The Moon is computed when it isn't given
+    assert mac.get_score(time, observer, observations[0]) == \
+        mac.get_score(time, observer, observations[0], moon=moon)
+
+    vetoes, scores = mac.get_scores(time, observer, observations)
+    expected_vetoes, expected_scores = mac.get_scores(time, observer, observations, moon=moon)
+    assert list(vetoes) == list(expected_vetoes) == [True, False]
+    assert scores == pytest.approx(expected_scores)
+
+
 def test_already_visited(observer):
     avc = AlreadyVisited()
 
@@ -258,3 +283,158 @@ def test_already_visited(observer):
 
     assert veto1 is True
     assert veto2 is False
+
+
+def test_already_visited_scores(observer, field_list):
+    avc = AlreadyVisited()
+    time = Time('2016-08-13 10:00:00')
+
+    observations = [Observation(Field(**f), **f) for f in field_list]
+    observed_list = OrderedDict([('01:00', observations[1]), ('02:00', observations[2])])
+
+    vetoes, _ = avc.get_scores(time, observer, observations, observed_list=observed_list)
+    assert vetoes.tolist() == [False, True, True] + [False] * (len(observations) - 3)
+
+    # The same from the catalog rows
+    catalog = FieldCatalog(field_list)
+    field_index = np.arange(len(catalog))[::-1]
+    catalog_vetoes, _ = avc.get_scores(time, observer, None, observed_list=observed_list,
+                                       catalog=catalog, field_index=field_index)
+    assert catalog_vetoes.tolist() == vetoes[::-1].tolist()
+
+
+def test_cadence(observer, field_list):
+    cadence = Cadence(interval=2 * u.day)
+    time = Time('2016-08-13 10:00:00')
+
+    observations = [Observation(Field(**f), **f) for f in field_list]
+
+    history = ObservationHistory()
+    history.add_visit(observations[0].name, time - 1 * u.day)
+    history.add_visit(observations[1].name, time - 3 * u.day)
+    history.add_visit(observations[2].name, time - 5 * u.day)
+
+    vetoes, scores = cadence.get_scores(time, observer, observations, history=history)
+    assert vetoes.tolist() == [True] + [False] * (len(observations) - 1)
+    assert scores[1] == pytest.approx(0.5)
+    # Overdue by more than the interval, or never visited
+    assert all(scores[2:] == 1.)
+
+    veto, score = cadence.get_score(time, observer, observations[1], history=history)
+    assert veto is False and score == pytest.approx(0.5)
+
+    # The same from the catalog rows
+    catalog = FieldCatalog(field_list)
+    field_index = np.arange(len(catalog))[::-1]
+    catalog_vetoes, catalog_scores = cadence.get_scores(
+        time, observer, None, history=history, catalog=catalog, field_index=field_index)
+    assert catalog_vetoes.tolist() == vetoes[::-1].tolist()
+    assert catalog_scores == pytest.approx(scores[::-1])
+
+    # Nothing to go on without a history
+    vetoes, scores = cadence.get_scores(time, observer, observations)
+    assert not any(vetoes)
+
+
+def test_base_get_scores(observer, field_list):
+    time = Time('2016-08-13 10:00:00')
+
+    observations = [Observation(Field(**f), **f) for f in field_list]
+
+    avc = AlreadyVisited()
+    observed_list = OrderedDict()
+    observed_list['01:00'] = observations[0]
+
+    vetoes, scores = BaseConstraint.get_scores(
+        avc, time, observer, observations, observed_list=observed_list)
+
+    assert len(vetoes) == len(observations)
+    assert vetoes[0]
+    assert not any(vetoes[1:])
+
+
+@pytest.mark.parametrize('time', ['2016-08-13 10:00:00', '2016-09-11 07:08:00'])
+def test_batch_scores_match(observer, field_list, horizon_line, time):
+    time = Time(time)
+    end_of_night = observer.tonight(time=time, horizon=-18 * u.degree)[-1]
+    moon = get_moon(time, observer.location)
+
+    observations = [Observation(Field(**f), **f) for f in field_list]
+
+    observed_list = OrderedDict()
+    observed_list['01:00'] = observations[1]
+
+    common_properties = {
+        'end_of_night': end_of_night,
+        'moon': moon,
+        'observed_list': observed_list,
+    }
+
+    constraints = [
+        Altitude(horizon_line),
+        Duration(30 * u.degree),
+        MoonAvoidance(),
+        AlreadyVisited(),
+    ]
+
+    for constraint in constraints:
+        vetoes, scores = constraint.get_scores(time, observer, observations, **common_properties)
+        assert len(vetoes) == len(scores) == len(observations)
+
+        for i, observation in enumerate(observations):
+            veto, score = constraint.get_score(time, observer, observation, **common_properties)
+            assert vetoes[i] == veto
+            # The batch Duration uses closed-form set/transit times rather than
+            # astroplan's grid search, so allow a few seconds of slack.
+            assert scores[i] == pytest.approx(score, abs=1e-3)
+
+
+def test_constraint_stats():
+    constraints = [Duration(30 * u.degree), MoonAvoidance(), AlreadyVisited()]
+    stats = ConstraintStats()
+
+    # Not measured yet, so keeps the given order
+    assert stats.order(constraints) == [0, 1, 2]
+
+    stats.record(str(constraints[0]), 1.0, 100, 50)
+    stats.record(str(constraints[1]), 0.01, 100, 10)
+    assert stats.order(constraints) == [2, 1, 0]
+
+    stats.record(str(constraints[2]), 0.001, 100, 0)
+    assert stats.order(constraints) == [1, 0, 2]
+
+    other = ConstraintStats()
+    other.record(str(constraints[0]), 1.0, 100, 50)
+    stats.merge(other)
+
+    totals = stats.to_dict()[str(constraints[0])]
+    assert totals['calls'] == 2
+    assert totals['scored'] == 200
+    assert totals['veto_rate'] == 0.5
+    assert totals['time_per_field'] == 0.01
+
+
+def test_apply_constraints_order(observer, field_list, horizon_line):
+    time = Time('2016-08-13 10:00:00')
+    catalog = FieldCatalog(field_list)
+    rows = np.arange(len(catalog))
+
+    common_properties = {
+        'end_of_night': observer.tonight(time=time, horizon=-18 * u.degree)[-1],
+        'moon': get_moon(time, observer.location),
+        'observed_list': OrderedDict(),
+    }
+
+    constraints = [Altitude(horizon_line), MoonAvoidance(), Duration(30 * u.degree)]
+
+    stats = ConstraintStats()
+    expected = apply_constraints(constraints, time, observer, catalog, rows, common_properties,
+                                 stats=stats)
+    assert 0 < len(expected[0]) < len(rows)
+    assert len(stats) == len(constraints)
+
+    for order in [[2, 1, 0], [1, 2, 0], stats.order(constraints)]:
+        valid_rows, merits = apply_constraints(constraints, time, observer, catalog, rows,
+                                               common_properties, order=order)
+        assert np.array_equal(valid_rows, expected[0])
+        assert np.array_equal(merits, expected[1])
@@ -45,6 +45,17 @@ def test_simple_insert(db):
     assert record['data']['test'] == rec['test']
 
 
+def test_find_all(db):
+    assert list(db.find_all('observations')) == []
+
+    ids = [db.insert('observations', {'test': i}) for i in range(3)]
+    db.insert_current('observations', {'test': 'current'}, store_permanently=False)
+
+    records = list(db.find_all('observations'))
+    assert [record['_id'] for record in records] == ids
+    assert [record['data']['test'] for record in records] == [0, 1, 2]
+
+
 # Filter out (hide) "UserWarning: Collection not available"
 @pytest.mark.filterwarnings('ignore')
 def test_bad_collection(db):
@@ -1,5 +1,6 @@
 import os
 import pytest
+import shutil
 import yaml
 
 from astropy import units as u
@@ -12,6 +13,7 @@ from pocs.scheduler.dispatch import Scheduler
 
 from pocs.scheduler.constraint import Duration
 from pocs.scheduler.constraint import MoonAvoidance
+from pocs.scheduler.memo import ScheduleMemo
 
 
 @pytest.fixture
@@ -27,12 +29,14 @@ def observer(config):
 
 
 @pytest.fixture()
-def field_file(config):
+def field_file(config, tmpdir):
     scheduler_config = config.get('scheduler', {})
 
-    # Read the targets from the file
+    # Read the targets from a copy of the file, so the compiled cache isn't
+    # written next to the original
     fields_file = scheduler_config.get('fields_file', 'simple.yaml')
-    fields_path = os.path.join(config['directories']['targets'], fields_file)
+    fields_path = str(tmpdir.join(fields_file))
+    shutil.copy(os.path.join(config['directories']['targets'], fields_file), fields_path)
 
     return fields_path
 
@@ -100,14 +104,92 @@ def test_get_observation(scheduler):
     assert isinstance(best[1], float)
 
 
-def test_get_observation_reread(field_list, observer, temp_file, constraints):
+def test_rank_fields(scheduler):
+    time = Time('2016-08-13 10:00:00')
+
+    ranked, _ = scheduler.rank_fields(time, scheduler.observed_list, None)
+    assert ranked[0][0] == 'HD 189733'
+
+    ranked, _ = scheduler.rank_fields(time, scheduler.observed_list, None,
+                                      exclude={'HD 189733', 'Not a field'})
+    assert 'HD 189733' not in dict(ranked)
+    assert len(ranked) > 0
+
+    # Only ranked, nothing is observed
+    assert scheduler.current_observation is None
+    assert len(scheduler.observed_list) == 0
+
+
+def test_constraint_stats(scheduler):
+    time = Time('2016-08-13 10:00:00')
+
+    scheduler.get_observation(time=time)
+    status = scheduler.status()
+
+    assert set(status['constraint_stats'].keys()) == \
+        set(str(constraint) for constraint in scheduler.constraints)
+    assert sorted(status['constraint_order']) == \
+        sorted(str(constraint) for constraint in scheduler.constraints)
+
+    for stats in status['constraint_stats'].values():
+        assert stats['calls'] == 1
+        assert stats['time'] > 0
+        assert 0 <= stats['veto_rate'] <= 1
+
+    # Reordering doesn't change the answer
+    best = scheduler.get_observation(time=time, show_all=True)
+    scheduler.config['scheduler']['adaptive_constraints'] = False
+    assert scheduler.get_observation(time=time, show_all=True) == best
+
+
+def test_memo(scheduler, field_list):
+    time = Time('2016-08-13 10:00:00')
+    best = scheduler.get_observation(time=time, show_all=True)
+
+    scheduler.memo = ScheduleMemo(bucket=60 * u.second)
+    assert scheduler.get_observation(time=time, show_all=True) == best
+    assert scheduler.memo.misses == 1
+
+    # Reused within the bucket, without scoring the catalog
+    calls = scheduler.status()['constraint_stats']['Moon Avoidance']['calls']
+    assert scheduler.get_observation(time=time + 30 * u.second, show_all=True) == best
+    assert scheduler.memo.hits == 1
+    assert scheduler.status()['constraint_stats']['Moon Avoidance']['calls'] == calls
+    assert scheduler.status()['memo']['hits'] == 1
+
+    # But not after it
+    scheduler.get_observation(time=time + 90 * u.second)
+    assert scheduler.memo.misses == 2
+
+    # Nor after the inputs change
+    scheduler.reset_observed_list()
+    assert not scheduler.memo.is_valid
+    scheduler.get_observation(time=time)
+
+    scheduler.add_observation(dict(field_list[0], priority=10))
+    assert not scheduler.memo.is_valid
+    assert scheduler.get_observation(time=time, show_all=True) != best
+
+    scheduler.constraints = [MoonAvoidance()]
+    assert not scheduler.memo.is_valid
+    scheduler.get_observation(time=time)
+
+    scheduler.current_observation = None
+    assert not scheduler.memo.is_valid
+
+    assert scheduler.memo.hits == 1
+    assert scheduler.memo.invalidations == 4
+
+
+def test_get_observation_reread(field_list, observer, tmpdir, constraints):
     time = Time('2016-08-13 10:00:00')
 
     # Write out the field list
-    with open(temp_file, 'w') as f:
+    fields_file = str(tmpdir.join('fields.yaml'))
+    with open(fields_file, 'w') as f:
         f.write(yaml.dump(field_list))
 
-    scheduler = Scheduler(observer, fields_file=temp_file, constraints=constraints)
+    scheduler = Scheduler(observer, fields_file=fields_file, constraints=constraints)
 
     # Get observation as above
     best = scheduler.get_observation(time=time)
@@ -115,7 +197,7 @@ def test_get_observation_reread(field_list, observer, temp_file, constraints):
     assert isinstance(best[1], float)
 
     # Alter the field file - note same target but new name
-    with open(temp_file, 'a') as f:
+    with open(fields_file, 'a') as f:
         f.write(yaml.dump([{
             'name': 'New Name',
             'position': '20h00m43.7135s +22d42m39.0645s',
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from astroplan import Observer
+
+from pocs.scheduler.dispatch import Scheduler
+from pocs.scheduler.constraint import Duration
+from pocs.scheduler.constraint import MoonAvoidance
+from pocs.scheduler.ephemeris import FieldEphemeris
+
+
+@pytest.fixture
+def observer(config):
+    loc = config['location']
+    location = EarthLocation(lon=loc['longitude'], lat=loc['latitude'], height=loc['elevation'])
+    return Observer(location=location, name="Test Observer", timezone=loc['timezone'])
+
+
+@pytest.fixture
+def coords():
+    ra = np.linspace(0, 350, 36)
+    dec = np.tile([-60, -30, 0, 30, 60, 85], 6)
+    return SkyCoord(ra=ra * u.degree, dec=dec * u.degree)
+
+
+@pytest.fixture
+def night(observer):
+    return observer.tonight(time=Time('2016-09-01 08:00:00'), horizon=-18 * u.degree)
+
+
+@pytest.fixture
+def ephemeris(observer, coords, night):
+    names = ['Field {:02d}'.format(i) for i in range(len(coords))]
+    return FieldEphemeris(observer, names, coords, night[0], night[1])
+
+
+def test_grid_covers_night(ephemeris, night):
+    assert len(ephemeris) == 36
+    assert ephemeris.covers(night[0])
+    assert ephemeris.covers(night[1])
+    assert not ephemeris.covers(night[0] - 1 * u.minute)
+    assert abs((ephemeris.times[0] - night[0]).sec) < 1
+    assert ephemeris.times[-1] >= night[1]
+
+
+def test_interpolated_altaz(ephemeris, observer, coords, night):
+    for offset in [0, 17.3, 123.4, 250]:
+        time = night[0] + offset * u.minute
+        if not ephemeris.covers(time):
+            continue
+
+        alt, az = ephemeris.altaz(time)
+        altaz = observer.altaz(time, coords)
+
+        assert np.allclose(alt, altaz.alt.degree, atol=0.1)
+        az_diff = (az - altaz.az.degree + 180.) % 360. - 180.
+        # Azimuth moves quickly near the zenith
+        assert np.all(np.abs(az_diff)[altaz.alt.degree < 80] < 0.5)
+
+
+def test_altaz_index(ephemeris, night):
+    time = night[0] + 42 * u.minute
+    alt, az = ephemeris.altaz(time)
+
+    index = ephemeris.index('Field 07')
+    assert index == 7
+    assert ephemeris.index('Not a field') is None
+
+    single_alt, single_az = ephemeris.altaz(time, index=index)
+    assert single_alt == alt[7]
+    assert single_az == az[7]
+
+    rows = np.array([3, 1, 4])
+    assert np.array_equal(ephemeris.altaz(time, index=rows)[0], alt[rows])
+    assert np.array_equal(ephemeris.is_up(time, horizon=30 * u.degree), alt > 30)
+
+
+def test_altaz_outside_grid(ephemeris, night):
+    with pytest.raises(ValueError):
+        ephemeris.altaz(night[1] + 1 * u.hour)
+
+
+def test_scheduler_ephemeris(config, observer):
+    scheduler = Scheduler(observer,
+                          fields_list=[{'name': 'HD 189733', 'position': '20h00m43.7135s +22d42m39.0645s'},
+                                       {'name': 'M5', 'position': '15h18m33.2201s +02d04m51.7008s'}],
+                          constraints=[MoonAvoidance(), Duration(30 * u.deg)])
+    scheduler.config['scheduler']['ephemeris'] = {'enabled': True, 'step': 5}
+
+    # Daytime
+    assert scheduler.get_ephemeris(Time('2016-09-01 23:00:00')) is None
+
+    time = Time('2016-09-01 08:00:00')
+    ephemeris = scheduler.get_ephemeris(time)
+    assert len(ephemeris) == 2
+    assert ephemeris.covers(time)
+
+    # Reused during the night
+    assert scheduler.get_ephemeris(time + 1 * u.hour) is ephemeris
+
+    # Changing the fields throws it away
+    scheduler.remove_observation('M5')
+    ephemeris = scheduler.get_ephemeris(time)
+    assert len(ephemeris) == 1
+
+    scheduler.config['scheduler']['ephemeris'] = {'enabled': False}
+    assert scheduler.get_ephemeris(time) is None
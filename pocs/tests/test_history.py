@@ -0,0 +1,117 @@
+import pytest
+
+from astroplan import Observer
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from pocs.scheduler.dispatch import Scheduler
+from pocs.scheduler.field import Field
+from pocs.scheduler.history import ObservationHistory
+from pocs.scheduler.observation import Observation
+
+
+@pytest.fixture
+def observer(config):
+    loc = config['location']
+    location = EarthLocation(lon=loc['longitude'], lat=loc['latitude'], height=loc['elevation'])
+    return Observer(location=location, name="Test Observer", timezone=loc['timezone'])
+
+
+@pytest.fixture
+def field_list():
+    return [
+        {'name': 'HD 189733', 'position': '20h00m43.7135s +22d42m39.0645s'},
+        {'name': 'Wasp 33', 'position': '02h26m51.0582s +37d33m01.733s'},
+    ]
+
+
+def image_record(field_name, start_time, seq_time, exp_time=120., is_primary=True):
+    return {
+        'field_name': field_name,
+        'start_time': start_time,
+        'sequence_id': 'PAN000_14d3bd_{}'.format(seq_time),
+        'exp_time': exp_time,
+        'is_primary': is_primary,
+    }
+
+
+def test_history():
+    history = ObservationHistory()
+    time = Time('2016-08-13 10:00:00')
+
+    assert 'HD 189733' not in history
+    assert history.visits('HD 189733') == 0
+    assert history.last_visit('HD 189733') is None
+    assert history.exp_time('HD 189733') == 0 * u.second
+
+    assert history.add_visit('HD 189733', time, seq_time='20160813T100000')
+    # Counted once
+    assert not history.add_visit('HD 189733', time, seq_time='20160813T100000')
+    history.add_visit('HD 189733', time - 1 * u.day, seq_time='20160812T100000')
+    history.add_exposures('HD 189733', 3, 120 * u.second)
+
+    # Looked up by name or `field_name`
+    assert 'Hd189733' in history
+    assert history.visits('HD 189733') == 2
+    assert history.last_visit('Hd189733').isot == time.isot
+    assert history.exp_time('HD 189733') == 360 * u.second
+    assert history.get('HD 189733').exposures == 3
+
+    last_visits = history.last_visits(['HD 189733', 'Wasp 33'])
+    assert last_visits[0] == time.jd
+    assert last_visits[1] != last_visits[1]  # NaN
+
+
+def test_load(db):
+    for i, seq_time in enumerate(['20160812T100000', '20160813T100000']):
+        for j in range(2):
+            start_time = '{}{:02d}'.format(seq_time[:-2], j)
+            for is_primary in [True, False]:
+                db.insert('observations', {
+                    'data': image_record('Hd189733', start_time, seq_time, is_primary=is_primary),
+                    'sequence_id': seq_time,
+                })
+    # Not an image
+    db.insert('observations', {'data': {'junk': True}})
+
+    history = ObservationHistory()
+    assert history.load(db) == 8
+
+    assert len(history) == 1
+    assert history.visits('HD 189733') == 2
+    assert history.get('HD 189733').exposures == 4
+    assert history.exp_time('HD 189733') == 480 * u.second
+    assert history.last_visit('HD 189733').isot == '2016-08-13T10:00:01.000'
+
+
+def test_scheduler_history(db, observer, field_list):
+    db.insert('observations', {
+        'data': image_record('Wasp33', '20160812T100000', '20160812T100000'),
+    })
+
+    scheduler = Scheduler(observer, fields_list=field_list, db=db)
+    scheduler.load_history()
+    assert scheduler.history.visits('Wasp 33') == 1
+
+    observation = scheduler.observations['HD 189733']
+    scheduler.current_observation = observation
+    assert scheduler.history.visits('HD 189733') == 1
+    assert scheduler.history.last_visit('HD 189733') is not None
+
+    observation.exposure_list['image_0'] = 'image_0.fits'
+    observation.exposure_list['image_1'] = 'image_1.fits'
+    scheduler.current_observation = scheduler.observations['Wasp 33']
+
+    # The exposures are counted when the observation changes
+    assert scheduler.history.get('HD 189733').exposures == 2
+    assert scheduler.history.exp_time('HD 189733') == 2 * observation.exp_time
+    assert scheduler.history.visits('Wasp 33') == 2
+
+    # The history is kept for the next night
+    scheduler.reset_observed_list()
+    assert scheduler.history.visits('HD 189733') == 1
+
+    assert 'history' in scheduler._get_common_properties(Time('2016-08-13 10:00:00'))
+    assert str(Observation(Field('Wasp 33', '02h26m51.0582s +37d33m01.733s')).field.field_name) \
+        in scheduler.history.to_dict()
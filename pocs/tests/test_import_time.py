@@ -0,0 +1,49 @@
+import os
+import pytest
+
+from pocs.utils import lazy_import
+from pocs.utils.import_time import IMPORT_TIME_LIMIT
+from pocs.utils.import_time import imported_lazy_modules
+from pocs.utils.import_time import measure_import
+from pocs.utils.import_time import parse_importtime
+from pocs.utils.import_time import slowest
+
+OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     zipimport
+import time:       300 |        500 |   numpy
+import time:      2000 |       3000 |   matplotlib.pyplot
+import time:      1000 |       4500 | pocs.core
+"""
+
+
+def test_parse_importtime():
+    records = parse_importtime(OUTPUT)
+    assert [record['module'] for record in records] == [
+        'zipimport', 'numpy', 'matplotlib.pyplot', 'pocs.core']
+    assert [record['depth'] for record in records] == [2, 1, 1, 0]
+    assert records[-1]['cumulative'] == pytest.approx(0.0045)
+    assert records[-1]['self'] == pytest.approx(0.001)
+
+    assert [record['module'] for record in slowest(records, count=1)] == ['matplotlib.pyplot']
+    assert imported_lazy_modules(records) == []
+    assert imported_lazy_modules(records, modules=['matplotlib.pyplot']) == ['matplotlib.pyplot']
+
+
+def test_lazy_import():
+    json = lazy_import('json')
+    assert json.loads('[1]') == [1]
+
+    missing = lazy_import('no_such_module')
+    with pytest.raises(ImportError):
+        missing.anything
+
+
+def test_import_pocs_core():
+    records = measure_import('pocs.core')
+
+    # The heavy dependencies aren't imported until they are used
+    assert imported_lazy_modules(records) == []
+
+    limit = float(os.getenv('POCS_IMPORT_TIME_LIMIT', IMPORT_TIME_LIMIT))
+    total = max(record['cumulative'] for record in records if record['module'] == 'pocs.core')
+    assert total < limit
@@ -5,8 +5,11 @@ import time
 from astropy import units as u
 from astropy.time import Time
 
+from concurrent.futures import Future
+
 from pocs import hardware
 import pocs.version
+from pocs.images import OffsetError
 from pocs.observatory import Observatory
 from pocs.scheduler.dispatch import Scheduler
 from pocs.scheduler.observation import Observation
@@ -236,6 +239,24 @@ def test_observe(observatory):
     assert len(observatory.scheduler.observed_list) == 0
 
 
+def test_offset_of_earlier_observation(observatory):
+    os.environ['POCSTIME'] = '2016-08-13 15:00:00'
+    observatory.get_observation()
+    seq_time = observatory.current_observation.seq_time
+
+    offset_info = OffsetError(1 * u.arcsec, 1 * u.arcsec, 1.4 * u.arcsec)
+    future = Future()
+    future.set_result(offset_info)
+    observatory._store_offset('image', seq_time, future)
+    assert observatory.current_offset_info is offset_info
+
+    # The offset arrives after a new observation has started
+    observatory.current_observation.seq_time = '20160813T150500'
+    assert observatory.current_offset_info is None
+    observatory.update_tracking()
+    assert observatory._current_offset is None
+
+
 def test_cleanup_missing_config_keys(observatory):
     os.environ['POCSTIME'] = '2016-08-13 15:00:00'
 
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from astropy import units as u
+from astropy.time import Time
+
+from pocs.scheduler import benchmark
+from pocs.scheduler.dispatch import Scheduler
+from pocs.scheduler.parallel import ParallelScorer
+
+
+@pytest.fixture
+def observer(config):
+    return benchmark.get_observer(config)
+
+
+@pytest.fixture
+def fields(config):
+    templates = benchmark.load_target_fields(config['directories']['targets'])
+    return benchmark.synthetic_fields(300, templates, latitude=config['location']['latitude'])
+
+
+@pytest.fixture
+def scheduler(config, observer, fields):
+    return Scheduler(observer, fields_list=fields, constraints=benchmark.get_constraints(config))
+
+
+@pytest.fixture
+def scorer():
+    scorer = ParallelScorer(workers=2, shards=3)
+    yield scorer
+    scorer.shutdown()
+
+
+@pytest.fixture
+def time():
+    return Time('2016-09-02 08:00:00')
+
+
+def test_matches_serial(scheduler, scorer, time):
+    properties = scheduler._get_common_properties(time)
+    rows = np.arange(len(scheduler.catalog))
+
+    serial = scheduler._score_fields(time, properties)
+    assert 0 < len(serial[0]) < len(rows)
+
+    for _ in range(2):
+        parallel = scorer.score(scheduler.constraints, time, scheduler.observer,
+                                scheduler.catalog, rows, properties)
+        assert np.array_equal(parallel[0], serial[0])
+        assert np.array_equal(parallel[1], serial[1])
+
+    # A subset of the rows
+    subset = rows[::7]
+    serial = scheduler._score_fields(time, properties, rows=subset)
+    parallel = scorer.score(scheduler.constraints, time, scheduler.observer,
+                            scheduler.catalog, subset, properties)
+    assert np.array_equal(parallel[0], serial[0])
+    assert np.array_equal(parallel[1], serial[1])
+
+
+def test_state_sent_once(scheduler, scorer, time):
+    properties = scheduler._get_common_properties(time)
+    rows = np.arange(len(scheduler.catalog))
+
+    scorer.score(scheduler.constraints, time, scheduler.observer, scheduler.catalog, rows,
+                 properties)
+    executor = scorer._executor
+
+    scorer.score(scheduler.constraints, time + 10 * u.minute, scheduler.observer,
+                 scheduler.catalog, rows, scheduler._get_common_properties(time + 10 * u.minute))
+    assert scorer._executor is executor
+
+    scorer.reset()
+    scorer.score(scheduler.constraints, time, scheduler.observer, scheduler.catalog, rows,
+                 properties)
+    assert scorer._executor is not executor
+
+
+def test_scheduler_parallel(config, observer, fields, time):
+    serial = Scheduler(observer, fields_list=fields,
+                       constraints=benchmark.get_constraints(config))
+    expected = serial.get_observation(time=time, show_all=True)
+
+    config['scheduler']['parallel'] = {'enabled': True, 'workers': 2, 'min_fields': 0}
+    scheduler = Scheduler(observer, fields_list=fields,
+                          constraints=benchmark.get_constraints(config), config=config)
+    try:
+        assert scheduler.get_observation(time=time, show_all=True) == expected
+        assert scheduler._parallel_scorer is not None
+
+        # Changing the fields sends them to the workers again
+        for s in [serial, scheduler]:
+            s.remove_observation(expected[0][0])
+
+        valid_rows, merits = scheduler._score_fields(time, scheduler._get_common_properties(time))
+        expected_rows, expected_merits = serial._score_fields(
+            time, serial._get_common_properties(time))
+        assert np.array_equal(valid_rows, expected_rows)
+        assert np.array_equal(merits, expected_merits)
+    finally:
+        scheduler._parallel_scorer.shutdown()
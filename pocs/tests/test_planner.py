@@ -0,0 +1,218 @@
+import pytest
+import yaml
+
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from astroplan import Observer
+
+from pocs.scheduler.constraint import Duration
+from pocs.scheduler.constraint import MoonAvoidance
+from pocs.scheduler.planner import NightPlan
+from pocs.scheduler.planner import PlanEntry
+from pocs.scheduler.planner import Scheduler
+
+
+@pytest.fixture
+def constraints():
+    return [MoonAvoidance(), Duration(30 * u.deg)]
+
+
+@pytest.fixture
+def observer(config):
+    loc = config['location']
+    location = EarthLocation(lon=loc['longitude'], lat=loc['latitude'], height=loc['elevation'])
+    return Observer(location=location, name="Test Observer", timezone=loc['timezone'])
+
+
+@pytest.fixture()
+def field_list():
+    return yaml.load("""
+    -
+        name: HD 189733
+        position: 20h00m43.7135s +22d42m39.0645s
+        priority: 100
+    -
+        name: HD 209458
+        position: 22h03m10.7721s +18d53m03.543s
+        priority: 100
+    -
+        name: Tres 3
+        position: 17h52m07.02s +37d32m46.2012s
+        priority: 100
+        exp_set_size: 15
+        min_nexp: 240
+    -
+        name: M5
+        position: 15h18m33.2201s +02d04m51.7008s
+        priority: 50
+    -
+        name: KIC 8462852
+        position: 20h06m15.4536s +44d27m24.75s
+        priority: 50
+        exp_time: 60
+        exp_set_size: 15
+        min_nexp: 45
+    -
+        name: Wasp 33
+        position: 02h26m51.0582s +37d33m01.733s
+        priority: 100
+    -
+        name: M42
+        position: 05h35m17.2992s -05d23m27.996s
+        priority: 25
+        exp_time: 240
+    -
+        name: M44
+        position: 08h40m24s +19d40m00.12s
+        priority: 50
+    """)
+
+
+@pytest.fixture
+def scheduler(field_list, observer, constraints):
+    return Scheduler(observer, fields_list=field_list, constraints=constraints)
+
+
+@pytest.fixture
+def time():
+    # Shortly after dusk
+    return Time('2016-08-13 06:30:00')
+
+
+def test_night_plan():
+    plan = NightPlan(Time(2457600.5, format='jd'), Time(2457601., format='jd'))
+
+    plan.insert(PlanEntry('A', 2457600.6, 2457600.7, 1.))
+    plan.insert(PlanEntry('B', 2457600.8, 2457600.9, 1.))
+
+    with pytest.raises(AssertionError):
+        plan.insert(PlanEntry('C', 2457600.65, 2457600.75, 1.))
+
+    assert plan.lookup(Time(2457600.55, format='jd')) is None
+    assert plan.lookup(Time(2457600.65, format='jd')).name == 'A'
+    assert plan.lookup(Time(2457600.85, format='jd')).name == 'B'
+    # Back in time
+    assert plan.lookup(Time(2457600.61, format='jd')).name == 'A'
+    assert plan.lookup(Time(2457600.95, format='jd')) is None
+
+    assert plan.gaps(Time(2457600.5, format='jd')) == [
+        (2457600.5, 2457600.6), (2457600.7, 2457600.8), (2457600.9, 2457601.)]
+
+    assert plan.remove(['A']) == [PlanEntry('A', 2457600.6, 2457600.7, 1.)]
+    assert plan.names == {'B'}
+
+
+def test_build_plan(scheduler, time):
+    best = scheduler.get_observation(time=time, show_all=True)
+
+    plan = scheduler.plan
+    assert len(plan) > 1
+    assert best == [(entry.name, entry.merit) for entry in plan]
+    assert scheduler.current_observation.name == best[0][0]
+
+    # Each field once, in order and without overlap
+    assert len(plan.names) == len(plan)
+    entries = plan.entries
+    for entry, next_entry in zip(entries[:-1], entries[1:]):
+        assert entry.start < entry.end <= next_entry.start
+
+    for entry in entries:
+        minimum_duration = scheduler.observations[entry.name].minimum_duration
+        assert (entry.end - entry.start) * u.day >= minimum_duration
+        assert entry.end <= plan.end_time.jd
+
+    # Planning doesn't count as scheduling passes
+    assert len(scheduler.constraint_stats) == 0
+
+
+def test_lookup(scheduler, time):
+    first = scheduler.get_observation(time=time)
+    plan = scheduler.plan
+
+    # Later in the same block, nothing is replanned
+    assert scheduler.get_observation(time=time + 5 * u.minute) == first
+    assert scheduler.plan is plan
+
+    second = plan.entries[1]
+    assert scheduler.get_observation(time=Time(second.start, format='jd') + 1 * u.minute) == \
+        (second.name, second.merit)
+    assert scheduler.plan is plan
+
+
+def test_daytime(scheduler):
+    assert scheduler.get_observation(time=Time('2016-08-13 22:00:00')) == []
+    assert scheduler.plan is None
+    assert scheduler.current_observation is None
+
+
+def test_veto(scheduler, time):
+    scheduler.get_observation(time=time)
+    later = scheduler.plan.entries[1:]
+
+    first = scheduler.plan.entries[0]
+    scheduler.veto(first.name, time=time)
+
+    scheduler.get_observation(time=time)
+    assert first.name not in scheduler.plan.names
+    if scheduler.current_observation is not None:
+        assert scheduler.current_observation.name != first.name
+
+    # The rest of the plan is untouched
+    for entry in later:
+        assert entry in scheduler.plan.entries
+
+
+def test_missed_entries(scheduler, time):
+    scheduler.get_observation(time=time)
+    entries = scheduler.plan.entries
+    assert len(entries) > 2
+
+    # Closed for weather until after the second block
+    resume = Time(entries[1].end, format='jd') + 1 * u.minute
+    scheduler.get_observation(time=resume)
+
+    assert entries[0] in scheduler.plan.entries
+    assert entries[1] not in scheduler.plan.entries
+    for entry in entries[2:]:
+        assert entry in scheduler.plan.entries
+
+
+def test_fields_change(scheduler, field_list, time):
+    scheduler.get_observation(time=time)
+    entries = scheduler.plan.entries
+    removed = entries[-1].name
+
+    scheduler.fields_list = [field for field in field_list if field['name'] != removed]
+    # Setting a new list clears the plan
+    assert scheduler.plan is None
+
+    scheduler.get_observation(time=time)
+    entries = scheduler.plan.entries
+
+    scheduler.remove_observation(entries[-1].name)
+    scheduler.get_observation(time=time)
+    assert entries[-1].name not in scheduler.plan.names
+    for entry in entries[:-1]:
+        assert entry in scheduler.plan.entries
+
+
+def test_fields_file_diff(field_list, observer, tmpdir, constraints, time):
+    fields_file = str(tmpdir.join('fields.yaml'))
+    with open(fields_file, 'w') as f:
+        f.write(yaml.dump(field_list))
+
+    scheduler = Scheduler(observer, fields_file=fields_file, constraints=constraints)
+    scheduler.get_observation(time=time)
+    entries = scheduler.plan.entries
+    last = entries[-1]
+
+    # Drop the field of the last block
+    with open(fields_file, 'w') as f:
+        f.write(yaml.dump([field for field in field_list if field['name'] != last.name]))
+
+    scheduler.get_observation(time=time, reread_fields_file=True)
+    assert last.name not in scheduler.plan.names
+    for entry in entries[:-1]:
+        assert entry in scheduler.plan.entries
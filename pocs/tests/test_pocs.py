@@ -218,6 +218,52 @@ def test_wait_for_events_timeout(pocs):
     t2.cancel()
 
 
+def test_wait_for_events_wakeup(pocs):
+    test_events = [threading.Event(), threading.Event()]
+
+    threading.Timer(0.2, test_events[0].set).start()
+    threading.Timer(0.5, test_events[1].set).start()
+
+    # Returns as soon as the last event is set, not after sleep_delay
+    start_time = time.monotonic()
+    pocs.wait_for_events(test_events, 30, sleep_delay=20)
+    assert time.monotonic() - start_time < 5
+
+    assert len(pocs.wakeup_latency) == 1
+    assert pocs.wakeup_latency[-1] < 1
+
+
+def test_wait_for_events_no_waiters_left(pocs):
+    test_event = threading.Event()
+
+    with pytest.raises(error.Timeout):
+        pocs.wait_for_events(test_event, 1, sleep_delay=0.5)
+
+    # The waiter stops once the call has returned, not after the timeout
+    time.sleep(0.5)
+    assert not [t for t in threading.enumerate() if t.name == 'EventWaiter']
+
+
+def test_sleep_park_command(observatory, cmd_publisher):
+    os.environ['POCSTIME'] = '2016-08-13 13:00:00'
+    pocs = POCS(observatory, messaging=True)
+    pocs.initialize()
+
+    try:
+        threading.Timer(1, cmd_publisher.send_message, args=('POCS-CMD', 'park')).start()
+
+        # The command ends the sleep as soon as it arrives
+        start_time = time.monotonic()
+        pocs.sleep(60, with_status=False)
+        assert time.monotonic() - start_time < 30
+        assert pocs.interrupted
+
+        assert pocs.commands.latencies[-1]['command'] == 'park'
+        assert pocs.commands.latencies[-1]['latency'] < 1
+    finally:
+        pocs.power_down()
+
+
 def test_is_weather_safe_no_simulator(pocs):
     pocs.initialize()
     pocs.config['simulator'] = ['camera', 'mount', 'night']
@@ -416,6 +462,13 @@ def test_run_complete(pocs):
 
     pocs.run(exit_when_done=True, run_once=True)
     assert pocs.state == 'sleeping'
+
+    # Time spent in each state
+    time_in_states = pocs.tracer.time_in_states()
+    assert {'ready', 'scheduling', 'slewing', 'observing'} <= set(time_in_states)
+    steps = {record['step'] for record in pocs.tracer.records}
+    assert {'state', 'on_enter', 'safety', 'lookup', 'db'} <= steps
+
     pocs.power_down()
 
 
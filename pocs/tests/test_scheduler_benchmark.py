@@ -0,0 +1,61 @@
+import json
+
+from astropy import units as u
+
+from pocs.scheduler import benchmark
+
+
+def test_synthetic_fields(config):
+    templates = benchmark.load_target_fields(config['directories']['targets'])
+    assert len(templates) > 0
+    assert len(set(field['name'] for field in templates)) == len(templates)
+
+    fields = benchmark.synthetic_fields(len(templates) + 50, templates,
+                                        latitude=config['location']['latitude'])
+    assert len(fields) == len(templates) + 50
+    assert fields[:len(templates)] == templates
+    assert len(set(field['name'] for field in fields)) == len(fields)
+
+    # Reproducible
+    assert benchmark.synthetic_fields(60, templates, seed=3) == \
+        benchmark.synthetic_fields(60, templates, seed=3)
+
+    assert len(benchmark.synthetic_fields(2, templates)) == 2
+
+
+def test_night(config):
+    observer = benchmark.get_observer(config)
+    start_time, end_time = benchmark.get_night(observer)
+
+    assert start_time.isot.startswith('2016-09-02')
+    assert 8 * u.hour < end_time - start_time < 12 * u.hour
+
+
+def test_run_benchmark(config):
+    messages = list()
+    results = benchmark.run_benchmark(sizes=[10, 40], step=30 * u.minute, config=config,
+                                      trace_memory=True, log=messages.append)
+
+    assert [result.num_fields for result in results] == [10, 40]
+    assert len(messages) > 0
+
+    for result in results:
+        assert result.passes > 0
+        assert len(result.sequence) == result.passes
+        assert result.peak_rss > 0
+        assert result.peak_traced > 0
+
+        percentiles = result.percentiles()
+        assert 0 < percentiles[50] <= percentiles[99]
+
+        assert set(result.constraint_costs.keys()) == \
+            set(str(constraint) for constraint in benchmark.get_constraints(config))
+        for cost in result.constraint_costs.values():
+            assert cost['calls'] > 0
+            assert cost['time'] > 0
+
+        assert any(entry['field'] is not None for entry in result.sequence)
+        assert '{} fields'.format(result.num_fields) in result.summary()
+
+        # Serializable
+        json.dumps(result.to_dict())
@@ -0,0 +1,152 @@
+import threading
+
+import pytest
+import yaml
+
+from astroplan import Observer
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from pocs.scheduler.constraint import Duration
+from pocs.scheduler.constraint import MoonAvoidance
+from pocs.scheduler.dispatch import Scheduler
+from pocs.scheduler.remote import Scheduler as RemoteScheduler
+from pocs.scheduler.server import SchedulerServer
+
+SERVER_PORT = 46565
+
+
+@pytest.fixture
+def observer(config):
+    loc = config['location']
+    location = EarthLocation(lon=loc['longitude'], lat=loc['latitude'], height=loc['elevation'])
+    return Observer(location=location, name="Test Observer", timezone=loc['timezone'])
+
+
+@pytest.fixture()
+def field_list():
+    return yaml.load("""
+    -
+        name: HD 189733
+        position: 20h00m43.7135s +22d42m39.0645s
+        priority: 100
+    -
+        name: HD 209458
+        position: 22h03m10.7721s +18d53m03.543s
+        priority: 100
+    -
+        name: Tres 3
+        position: 17h52m07.02s +37d32m46.2012s
+        priority: 100
+        exp_set_size: 15
+        min_nexp: 240
+    -
+        name: KIC 8462852
+        position: 20h06m15.4536s +44d27m24.75s
+        priority: 50
+        exp_time: 60
+        exp_set_size: 15
+        min_nexp: 45
+    """)
+
+
+@pytest.fixture
+def server(observer, field_list):
+    scheduler = Scheduler(observer, fields_list=field_list,
+                          constraints=[MoonAvoidance(), Duration(30 * u.deg)])
+    return SchedulerServer(scheduler, port=SERVER_PORT, claim_timeout=30 * u.minute)
+
+
+@pytest.fixture
+def running_server(server):
+    stop = threading.Event()
+    thread = threading.Thread(target=server.serve, kwargs={'stop_event': stop, 'poll_ms': 50})
+    thread.start()
+    yield server
+    stop.set()
+    thread.join()
+
+
+@pytest.fixture
+def time():
+    return Time('2016-08-13 10:00:00')
+
+
+def request(server, action, **kwargs):
+    reply = server.handle(dict(kwargs, action=action))
+    assert reply['success']
+    return reply
+
+
+def test_units_get_different_fields(server, time):
+    first = request(server, 'get_observation', unit='PAN001', time=time.isot)
+    second = request(server, 'get_observation', unit='PAN002', time=time.isot)
+
+    assert first['field'] is not None
+    assert second['field'] is not None
+    assert first['field'] != second['field']
+    assert first['merit'] >= second['merit']
+
+    assert request(server, 'status')['claims'] == {
+        first['field']: 'PAN001',
+        second['field']: 'PAN002',
+    }
+
+    # Asking again keeps the same field
+    assert request(server, 'get_observation', unit='PAN001', time=time.isot)['field'] == \
+        first['field']
+
+    # Once released, the best field is free for the other unit
+    request(server, 'release', unit='PAN001')
+    request(server, 'reset', unit='PAN002')
+    assert request(server, 'get_observation', unit='PAN002', time=time.isot)['field'] == \
+        first['field']
+
+
+def test_claims_expire(server, time):
+    first = request(server, 'get_observation', unit='PAN001', time=time.isot)
+
+    later = (time + 45 * u.minute).isot
+    assert request(server, 'get_observation', unit='PAN002', time=later)['field'] == \
+        first['field']
+
+
+def test_bad_requests(server):
+    assert not server.handle({'action': 'get_observation'})['success']
+    assert not server.handle({'action': 'dance', 'unit': 'PAN001'})['success']
+
+
+def test_remote_scheduler(running_server, observer, field_list, time):
+    # Each unit only knows some of the fields
+    units = []
+    for unit_id, fields in [('PAN001', field_list[:1]), ('PAN002', field_list[1:2])]:
+        unit = RemoteScheduler(observer, fields_list=fields, constraints=[MoonAvoidance()])
+        unit.unit_id = unit_id
+        unit.port = SERVER_PORT
+        units.append(unit)
+
+    try:
+        names = [unit.get_observation(time=time)[0] for unit in units]
+        assert names[0] != names[1]
+
+        for unit, name in zip(units, names):
+            assert unit.current_observation.name == name
+            assert name in unit.observations
+
+        assert running_server.status()['claims'] == dict(zip(names, ['PAN001', 'PAN002']))
+
+        # No answer, so scheduled locally
+        units[0].close()
+        units[0].port = SERVER_PORT + 1
+        units[0].timeout = 0.2
+        assert units[0].get_observation(time=time, show_all=True)
+        assert units[0]._requester is None
+
+        # Not asked again until the retry delay has passed
+        units[0].port = SERVER_PORT
+        assert units[0].get_observation(time=time, show_all=True)
+        assert units[0]._requester is None
+    finally:
+        for unit in units:
+            unit.close()
@@ -0,0 +1,157 @@
+import numpy as np
+import pytest
+
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.coordinates import get_moon
+from astropy.time import Time
+
+from astroplan import Observer
+
+from pocs.scheduler import BaseScheduler as Scheduler
+from pocs.scheduler.constraint import MoonAvoidance
+from pocs.scheduler.constraint import SlewDistance
+from pocs.scheduler.field import Field
+from pocs.scheduler.index import SkyIndex
+from pocs.scheduler.observation import Observation
+
+
+@pytest.fixture
+def coords():
+    np.random.seed(42)
+    ra = np.random.uniform(0, 360, 500)
+    dec = np.degrees(np.arcsin(np.random.uniform(-1, 1, 500)))
+    return SkyCoord(ra=ra * u.degree, dec=dec * u.degree)
+
+
+@pytest.fixture
+def observer(config):
+    loc = config['location']
+    location = EarthLocation(lon=loc['longitude'], lat=loc['latitude'], height=loc['elevation'])
+    return Observer(location=location, name="Test Observer", timezone=loc['timezone'])
+
+
+def test_query_radius(coords):
+    index = SkyIndex(coords)
+    assert len(index) == 500
+
+    center = SkyCoord(ra=120 * u.degree, dec=-30 * u.degree)
+    for radius in [1, 15, 60, 180]:
+        expected = np.flatnonzero(center.separation(coords).degree <= radius)
+        assert np.array_equal(index.query_radius(center, radius * u.degree), expected)
+
+
+def test_add(coords):
+    index = SkyIndex(coords[:100])
+
+    # Added one at a time, which goes through the pending buffer
+    for i in range(100, 500):
+        assert index.add(coords[i]) == [i]
+
+    assert len(index) == 500
+
+    center = SkyCoord(ra=10 * u.degree, dec=20 * u.degree)
+    expected = np.flatnonzero(center.separation(coords).degree <= 30)
+    assert np.array_equal(index.query_radius(center, 30 * u.degree), expected)
+
+
+def test_empty_index():
+    index = SkyIndex()
+    assert len(index) == 0
+    assert len(index.query_radius(SkyCoord(0 * u.degree, 0 * u.degree), 10 * u.degree)) == 0
+    assert index.query_pairs(1 * u.degree) == set()
+
+    index.add(SkyCoord(0 * u.degree, 0 * u.degree))
+    assert list(index.query_radius(SkyCoord(1 * u.degree, 0 * u.degree), 2 * u.degree)) == [0]
+
+
+def test_separation_and_pairs(coords):
+    index = SkyIndex(coords)
+    center = SkyCoord(ra=250 * u.degree, dec=45 * u.degree)
+
+    assert np.allclose(index.separation(center), center.separation(coords).degree)
+    assert np.allclose(index.separation(center, index=[3, 7]),
+                       center.separation(coords[[3, 7]]).degree)
+
+    pairs = index.query_pairs(3 * u.degree)
+    for i, j in pairs:
+        assert coords[i].separation(coords[j]) <= 3 * u.degree
+
+
+def test_moon_avoidance_index(observer, coords):
+    time = Time('2016-08-13 10:00:00')
+    moon = get_moon(time, observer.location)
+
+    observations = [Observation(Field('Field {}'.format(i), coord))
+                    for i, coord in enumerate(coords[:200])]
+
+    constraint = MoonAvoidance()
+    vetoes, scores = constraint.get_scores(time, observer, observations, moon=moon)
+    index_vetoes, index_scores = constraint.get_scores(time, observer, observations, moon=moon,
+                                                       sky_index=SkyIndex(coords[:200]),
+                                                       field_index=np.arange(200))
+
+    assert np.array_equal(vetoes, index_vetoes)
+    assert np.allclose(scores, index_scores, atol=1e-3)
+
+
+def test_slew_distance(observer, coords):
+    time = Time('2016-08-13 10:00:00')
+    observations = [Observation(Field('Field {}'.format(i), coord))
+                    for i, coord in enumerate(coords[:200])]
+    field_index = np.arange(200)
+    sky_index = SkyIndex(coords[:200])
+
+    constraint = SlewDistance(max_separation=40 * u.degree)
+
+    # No current observation, nothing is favored
+    vetoes, scores = constraint.get_scores(time, observer, observations, sky_index=sky_index,
+                                           field_index=field_index)
+    assert not vetoes.any()
+    assert np.all(scores == 0)
+
+    current = observations[0]
+    vetoes, scores = constraint.get_scores(time, observer, observations, sky_index=sky_index,
+                                           field_index=field_index,
+                                           current_observation=current)
+    assert not vetoes.any()
+    assert scores[0] == pytest.approx(1)
+
+    separation = current.field.coord.separation(coords[:200]).degree
+    assert np.all(scores[separation >= 40] == 0)
+    assert np.all(scores[separation < 40] > 0)
+
+    # Same answer without the index
+    scan_scores = constraint.get_scores(time, observer, observations,
+                                        current_observation=current)[1]
+    assert np.allclose(scores, scan_scores)
+
+    for i in [0, 5, 17]:
+        assert constraint.get_score(time, observer, observations[i],
+                                    current_observation=current)[1] == \
+            pytest.approx(scores[i], abs=1e-6)
+
+
+def test_scheduler_index(observer, caplog):
+    scheduler = Scheduler(observer, fields_list=[
+        {'name': 'HD 189733', 'position': '20h00m43.7135s +22d42m39.0645s'},
+        {'name': 'M5', 'position': '15h18m33.2201s +02d04m51.7008s'},
+    ])
+
+    index = scheduler.sky_index
+    assert len(index) == 2
+
+    scheduler.add_observation({'name': 'M5 again', 'position': '15h18m33.2201s +02d04m51.7008s'})
+    assert scheduler.sky_index is index
+    assert len(index) == 3
+    assert 'M5 again has the same position' in caplog.text
+
+    m5 = scheduler.observations['M5'].field.coord
+    names = list(scheduler.observations.keys())
+    assert [names[i] for i in scheduler.sky_index.query_radius(m5, 1 * u.degree)] == \
+        ['M5', 'M5 again']
+
+    scheduler.remove_observation('M5')
+    assert len(scheduler.sky_index) == 2
+    assert scheduler.sky_index is not index
@@ -0,0 +1,70 @@
+import csv
+import json
+import pytest
+import time
+
+from pocs.state.trace import StateTracer
+from pocs.state.trace import night_of
+
+
+def test_state_spans():
+    tracer = StateTracer()
+
+    tracer.enter('scheduling')
+    with tracer.span('scheduling', 'on_enter'):
+        time.sleep(0.2)
+    tracer.exit('scheduling')
+
+    # Never entered
+    tracer.exit('slewing')
+
+    steps = [(record['state'], record['step']) for record in tracer.records]
+    assert steps == [('scheduling', 'on_enter'), ('scheduling', 'state')]
+
+    on_enter, state = tracer.records
+    assert 0.2 <= on_enter['duration'] <= state['duration']
+    assert state['end'] - state['start'] == pytest.approx(state['duration'])
+    assert tracer.nights == [night_of(time.time())]
+
+
+def test_histograms():
+    tracer = StateTracer()
+    for duration in [0.05, 0.5, 5, 5000]:
+        tracer._record('analyzing', 'state', time.time(), duration)
+    tracer._record('slewing', 'state', time.time(), 30)
+
+    night = night_of(time.time())
+    stats = tracer.histograms()[night]['analyzing']['state']
+    assert stats['count'] == 4
+    assert stats['max'] == 5000
+    assert stats['mean'] == stats['total'] / 4
+    assert stats['bins'] == [1, 1, 1, 0, 0, 0, 0, 1]
+
+    assert list(tracer.time_in_states(night)) == ['analyzing', 'slewing']
+    assert tracer.histograms(night='1999-12-31') == {}
+
+
+def test_night_of():
+    # Before noon is the previous night
+    assert night_of(time.mktime((2016, 8, 14, 3, 0, 0, 0, 0, -1))) == '2016-08-13'
+    assert night_of(time.mktime((2016, 8, 14, 21, 0, 0, 0, 0, -1))) == '2016-08-14'
+
+
+def test_write(tmpdir):
+    tracer = StateTracer()
+    with tracer.span('pointing', 'safety'):
+        pass
+
+    night = tracer.nights[0]
+    paths = tracer.write(str(tmpdir.join('state_trace')))
+    assert [path.split('/')[-1] for path in paths] == [
+        'state_trace_{}.json'.format(night), 'state_trace_{}.csv'.format(night)]
+
+    with open(paths[0]) as f:
+        trace = json.load(f)
+    assert trace['timeline'][0]['step'] == 'safety'
+    assert trace['histograms'][night]['pointing']['safety']['count'] == 1
+
+    with open(paths[1]) as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['state'], row['step']) for row in rows] == [('pointing', 'safety')]
@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from astroplan import Observer
+
+from pocs.scheduler.constraint import Duration
+from pocs.scheduler.dispatch import Scheduler
+from pocs.scheduler.observation import Observation
+from pocs.scheduler.field import Field
+from pocs.scheduler import visibility
+from pocs.scheduler.visibility import VisibilityWindows
+
+
+@pytest.fixture
+def observer(config):
+    loc = config['location']
+    location = EarthLocation(lon=loc['longitude'], lat=loc['latitude'], height=loc['elevation'])
+    return Observer(location=location, name="Test Observer", timezone=loc['timezone'])
+
+
+@pytest.fixture
+def coords():
+    ra = np.linspace(0, 350, 36)
+    dec = np.tile([-85, -40, 0, 20, 50, 85], 6)
+    return SkyCoord(ra=ra * u.degree, dec=dec * u.degree)
+
+
+@pytest.fixture
+def names(coords):
+    return ['Field {:02d}'.format(i) for i in range(len(coords))]
+
+
+@pytest.fixture
+def night(observer):
+    return observer.tonight(time=Time('2016-09-01 03:00:00'), horizon=-18 * u.degree)
+
+
+@pytest.fixture
+def windows(observer, names, coords, night):
+    return VisibilityWindows.compute(observer, names, coords, night[0], night[1],
+                                     horizon=30 * u.degree)
+
+
+def test_windows_match_altaz(windows, observer, coords, night):
+    for fraction in [0, 0.25, 0.5, 0.75, 1]:
+        time = night[0] + fraction * (night[1] - night[0])
+        assert windows.covers(time)
+
+        altaz = observer.altaz(time, coords)
+        assert np.array_equal(windows.is_up(time), altaz.alt.degree > 30)
+
+        set_time = visibility.set_times(time, observer, coords, horizon=30 * u.degree)
+        transit_time = visibility.transit_times(time, observer, coords)
+
+        # Within 10 seconds
+        assert np.allclose(windows.next_set(time), set_time, atol=10 / 86400., equal_nan=True)
+        assert np.allclose(windows.next_transit(time), transit_time, atol=10 / 86400.)
+
+
+def test_windows_never_rise_or_set(windows, night):
+    dec = np.tile([-85, -40, 0, 20, 50, 85], 6)
+
+    # Never above 30 degrees from Mauna Loa
+    assert np.all(np.isnan(windows.set_time[dec == -85]))
+    assert not np.any(windows.is_up(night[0])[dec == -85])
+
+
+def test_windows_index(windows, night):
+    index = windows.index('Field 05')
+    assert index == 5
+    assert windows.index('Not a field') is None
+    assert windows.next_transit(night[0], index=index) == windows.transit_time[5]
+
+
+def test_windows_save_load(windows, observer, names, coords, night, tmpdir):
+    path = VisibilityWindows.cache_path(str(tmpdir), observer, names, coords,
+                                        night[1], 30 * u.degree)
+    assert path.startswith(str(tmpdir))
+
+    # Keyed on horizon, night and field set
+    assert path != VisibilityWindows.cache_path(str(tmpdir), observer, names, coords,
+                                                night[1], 20 * u.degree)
+    assert path != VisibilityWindows.cache_path(str(tmpdir), observer, names, coords,
+                                                night[1] + 1 * u.day, 30 * u.degree)
+    assert path != VisibilityWindows.cache_path(str(tmpdir), observer, names[:-1], coords[:-1],
+                                                night[1], 30 * u.degree)
+
+    windows.save(path)
+    loaded = VisibilityWindows.load(path)
+
+    assert loaded.names == windows.names
+    assert loaded.horizon == windows.horizon
+    assert np.allclose(loaded.set_time, windows.set_time, equal_nan=True)
+    assert np.allclose(loaded.transit_time, windows.transit_time)
+    assert loaded.covers(night[0] + 1 * u.hour)
+
+
+def test_duration_with_windows(windows, observer, names, coords, night):
+    observations = [Observation(Field(name, coord)) for name, coord in zip(names, coords)]
+    field_index = np.arange(len(observations))
+    time = night[0] + 2 * u.hour
+
+    duration = Duration(30 * u.degree)
+    vetoes, scores = duration.get_scores(time, observer, observations, end_of_night=night[1])
+    table_vetoes, table_scores = duration.get_scores(time, observer, observations,
+                                                     end_of_night=night[1],
+                                                     visibility_windows=windows,
+                                                     field_index=field_index)
+
+    assert np.array_equal(vetoes, table_vetoes)
+    assert np.allclose(scores, table_scores, atol=1e-3)
+
+
+def test_scheduler_windows_saved(config, observer, tmpdir):
+    config['directories']['data'] = str(tmpdir)
+    config['scheduler']['visibility_windows'] = {'enabled': True, 'save': True}
+    fields_list = [
+        {'name': 'HD 189733', 'position': '20h00m43.7135s +22d42m39.0645s'},
+        {'name': 'M5', 'position': '15h18m33.2201s +02d04m51.7008s'},
+    ]
+
+    scheduler = Scheduler(observer, fields_list=fields_list, config=config)
+
+    # Daytime
+    assert scheduler.get_visibility_windows(Time('2016-09-01 23:00:00')) is None
+
+    time = Time('2016-09-01 08:00:00')
+    windows = scheduler.get_visibility_windows(time)
+    assert len(windows) == 2
+    assert scheduler.get_visibility_windows(time + 1 * u.hour) is windows
+    assert len(tmpdir.join('scheduler').listdir()) == 1
+
+    # A new scheduler (e.g. after a restart) loads the saved table
+    scheduler = Scheduler(observer, fields_list=fields_list, config=config)
+    loaded = scheduler.get_visibility_windows(time)
+    assert loaded is not windows
+    assert np.array_equal(loaded.set_time, windows.set_time)
+
+    # Changing the fields throws it away
+    scheduler.remove_observation('M5')
+    assert len(scheduler.get_visibility_windows(time)) == 1
+    assert len(tmpdir.join('scheduler').listdir()) == 2
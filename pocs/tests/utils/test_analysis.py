@@ -0,0 +1,95 @@
+import math
+import os
+
+import pytest
+
+from astropy import units as u
+
+from pocs.utils import analysis
+from pocs.utils.analysis import AnalysisExecutor
+from pocs.utils.analysis import future_event
+from pocs.utils.analysis import image_offset
+from pocs.utils.analysis import solve_image
+
+
+@pytest.fixture(params=[0, 1], ids=['inline', 'workers'])
+def executor(request):
+    executor = AnalysisExecutor(workers=request.param, depth=2)
+    yield executor
+    executor.shutdown()
+
+
+def test_submit(executor):
+    futures = [executor.submit('sqrt {}'.format(i), math.sqrt, i) for i in range(5)]
+    assert [future.result(timeout=30) for future in futures] == [math.sqrt(i) for i in range(5)]
+
+    executor.wait()
+    assert executor.pending == 0
+
+    status = executor.status()
+    assert status['completed'] == 5
+    assert status['failed'] == 0
+    assert status['max_latency'] >= status['mean_latency'] >= 0
+
+    assert [latency['name'] for latency in executor.latencies][0] == 'sqrt 0'
+    assert all(latency['run'] >= 0 for latency in executor.latencies)
+
+
+def test_failed(executor):
+    future = executor.submit('bad', math.sqrt, -1)
+    assert future_event(future).wait(timeout=30)
+
+    with pytest.raises(ValueError):
+        future.result()
+
+    assert executor.status()['failed'] == 1
+    assert executor.pending == 0
+
+
+def test_worker_died():
+    executor = AnalysisExecutor(workers=1, depth=2)
+    try:
+        # Breaks the pool
+        future = executor.submit('die', os._exit, 1)
+        assert future_event(future).wait(timeout=30)
+        assert future.exception() is not None
+
+        # New workers are started
+        futures = [executor.submit('sqrt', math.sqrt, 4) for _ in range(3)]
+        assert [future.result(timeout=30) for future in futures] == [2.] * 3
+
+        executor.wait(timeout=30)
+        assert executor.pending == 0
+    finally:
+        executor.shutdown()
+
+
+def test_submit_failed(monkeypatch):
+    class BadPool(object):
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def submit(self, *args, **kwargs):
+            raise RuntimeError('No workers')
+
+    monkeypatch.setattr(analysis, 'ProcessPoolExecutor', BadPool)
+    executor = AnalysisExecutor(workers=1, depth=1)
+
+    # The slot is given back, so none of these block
+    for _ in range(3):
+        future = executor.submit('sqrt', math.sqrt, 4)
+        with pytest.raises(RuntimeError):
+            future.result(timeout=1)
+
+    assert executor.pending == 0
+    assert executor.failed == 3
+    executor.wait(timeout=1)
+
+
+def test_solved_image(executor, solved_fits_file):
+    solve_info = executor.submit('solve', solve_image, solved_fits_file).result(timeout=60)
+    assert solve_info['solved_fits_file'] == solved_fits_file
+
+    offset = executor.submit('offset', image_offset, solved_fits_file, solved_fits_file,
+                             skip_solved=True).result(timeout=60)
+    assert offset.magnitude.to(u.arcsec).value == pytest.approx(0)
@@ -0,0 +1,66 @@
+import queue
+import time
+
+import pytest
+
+from pocs.utils.commands import CommandQueue
+from pocs.utils.commands import CommandReceiver
+
+
+def test_priority():
+    commands = CommandQueue()
+    assert commands.empty()
+
+    commands.put({'message': 'unknown'})
+    assert commands.wakeup.is_set()
+    commands.wakeup.clear()
+
+    commands.put({'message': 'shutdown'})
+    commands.put({'message': 'park'})
+    assert commands.qsize() == 3
+
+    # Priority commands first, in the order they arrived
+    assert commands.get_nowait()['message'] == 'shutdown'
+    assert commands.wakeup.is_set()
+    assert commands.get_nowait()['message'] == 'park'
+    commands.wakeup.clear()
+    assert commands.get_nowait()['message'] == 'unknown'
+    assert not commands.wakeup.is_set()
+
+    with pytest.raises(queue.Empty):
+        commands.get_nowait()
+
+    assert [latency['command'] for latency in commands.latencies] == [
+        'shutdown', 'park', 'unknown']
+    assert all(latency['latency'] >= 0 for latency in commands.latencies)
+
+
+def test_receiver(message_forwarder, cmd_publisher):
+    commands = CommandQueue()
+    receiver = CommandReceiver(message_forwarder['cmd_ports'][1], commands)
+    receiver.start()
+    assert receiver.is_running
+
+    try:
+        # Wait for the subscription to reach the forwarder
+        for _ in range(50):
+            cmd_publisher.send_message('POCS-CMD', 'ping')
+            if commands.wakeup.wait(timeout=0.1):
+                break
+
+        while not commands.empty():
+            commands.get_nowait()
+        commands.wakeup.clear()
+
+        cmd_publisher.send_message('POCS', 'not a command')
+        sent = time.monotonic()
+        cmd_publisher.send_message('POCS-CMD', 'park')
+
+        assert commands.wakeup.wait(timeout=5)
+        assert time.monotonic() - sent < 0.5
+        assert commands.get_nowait()['message'] == 'park'
+        assert commands.empty()
+    finally:
+        receiver.stop()
+
+    assert not receiver.is_running
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import time
+
+import pytest
+
+from pocs.utils.housekeeping import HousekeepingQueue
+
+
+def sleep_cmd(seconds, exit_code=0):
+    return [sys.executable, '-c', 'import sys, time; time.sleep({}); sys.exit({})'.format(
+        seconds, exit_code)]
+
+
+@pytest.fixture
+def state_file(tmpdir):
+    return str(tmpdir.join('housekeeping.json'))
+
+
+def test_parallel(tmpdir, state_file):
+    queue = HousekeepingQueue(state_file, workers=3)
+
+    directories = [str(tmpdir.mkdir('seq{}'.format(i))) for i in range(3)]
+    for directory in directories:
+        tmpdir.join(os.path.basename(directory), 'image.fits').write('x' * 1000)
+        queue.add(directory, sleep_cmd(1))
+
+    assert queue.pending == directories
+
+    start_time = time.monotonic()
+    summary = queue.run()
+
+    # Run at the same time
+    assert time.monotonic() - start_time < 2.5
+    assert summary['jobs'] == 3
+    assert summary['failed'] == 0
+    assert summary['jobs_per_hour'] > 0
+    assert summary['mb_per_second'] > 0
+
+    assert queue.pending == []
+    assert [result['size'] for result in queue.results] == [1000] * 3
+    assert all(result['duration'] >= 1 for result in queue.results)
+
+    assert queue.run()['jobs'] == 0
+
+
+def test_failed(tmpdir, state_file):
+    queue = HousekeepingQueue(state_file, timeout=0.5)
+    queue.add(str(tmpdir.join('error')), sleep_cmd(0, exit_code=1))
+    queue.add(str(tmpdir.join('slow')), sleep_cmd(5))
+    queue.add(str(tmpdir.join('missing')), [str(tmpdir.join('no_such_script'))])
+
+    assert queue.run()['failed'] == 3
+    assert queue.pending == []
+
+
+def test_resume(tmpdir, state_file):
+    queue = HousekeepingQueue(state_file)
+    queue.add(str(tmpdir.join('seq0')), sleep_cmd(0))
+    queue.add(str(tmpdir.join('seq1')), sleep_cmd(0))
+
+    # Interrupted while the first was running
+    with open(state_file) as f:
+        jobs = json.load(f)
+    jobs[str(tmpdir.join('seq0'))]['state'] = 'running'
+    with open(state_file, 'w') as f:
+        json.dump(jobs, f)
+
+    resumed = HousekeepingQueue(state_file)
+    assert resumed.pending == [str(tmpdir.join('seq0')), str(tmpdir.join('seq1'))]
+    assert resumed.run()['jobs'] == 2
+
+    assert HousekeepingQueue(state_file).pending == []
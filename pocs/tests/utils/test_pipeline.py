@@ -0,0 +1,58 @@
+import threading
+
+from pocs.utils.pipeline import Pipeline
+
+
+def test_in_order():
+    pipeline = Pipeline(size=0)
+    done = list()
+
+    jobs = [pipeline.submit('job{}'.format(i), done.append, i) for i in range(10)]
+    pipeline.wait()
+
+    assert done == list(range(10))
+    assert pipeline.pending == 0
+    assert all(job.done.is_set() for job in jobs)
+    assert [job.name for job in pipeline.finished()] == [job.name for job in jobs]
+    assert pipeline.finished() == []
+
+
+def test_errors():
+    pipeline = Pipeline()
+
+    def fail():
+        raise ValueError('Bad image')
+
+    failed = pipeline.submit('fail', fail)
+    worked = pipeline.submit('work', lambda: 42)
+    pipeline.wait()
+
+    assert isinstance(failed.error, ValueError)
+    assert 'failed' in str(failed)
+    assert worked.error is None
+    assert worked.result == 42
+
+
+def test_backpressure():
+    pipeline = Pipeline(size=1)
+    release = threading.Event()
+
+    pipeline.submit('running', release.wait)
+    pipeline.submit('waiting', lambda: None)
+
+    # Full, so the next job has to wait
+    submitted = threading.Event()
+
+    def submit():
+        pipeline.submit('blocked', lambda: None)
+        submitted.set()
+
+    threading.Thread(target=submit).start()
+    assert not submitted.wait(timeout=0.5)
+    assert pipeline.pending == 2
+
+    release.set()
+    assert submitted.wait(timeout=5)
+
+    pipeline.wait()
+    assert len(pipeline.finished()) == 3
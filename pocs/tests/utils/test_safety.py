@@ -0,0 +1,90 @@
+import time
+
+import pytest
+
+from astroplan import Observer
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from pocs.utils import current_time
+from pocs.utils.ephemeris import SiteEphemeris
+from pocs.utils.safety import SafetyMonitor
+
+
+@pytest.fixture
+def ephemeris(config):
+    loc = config['location']
+    location = EarthLocation(lon=loc['longitude'], lat=loc['latitude'], height=loc['elevation'])
+    return SiteEphemeris(Observer(location=location, timezone=loc['timezone']))
+
+
+@pytest.fixture
+def monitor(config, ephemeris, memory_db):
+    monitor = SafetyMonitor(ephemeris=ephemeris, config=config, db=memory_db)
+    yield monitor
+    monitor.stop()
+
+
+def test_get_current(monitor, memory_db):
+    assert monitor.get_current('power') is None
+
+    # Without messages the database is used
+    memory_db.insert_current('power', {'main': True})
+    assert monitor.get_current('power')['data']['main'] is True
+
+    now = current_time()
+    monitor.handle_message('environment', {'data': {'power': {'main': False},
+                                                    'date': now.isot}})
+    monitor.handle_message('environment', {'data': {'no_power': 1, 'date': now.isot}})
+    monitor.handle_message('weather', {'data': {'safe': True,
+                                                'date': (now - 300 * u.second).isot}})
+    monitor.handle_message('weather', {'data': {'safe': True}})
+
+    assert monitor.get_current('power', stale=90)['data']['main'] is False
+    assert monitor.get_current('weather')['data']['safe'] is True
+
+    # Too old, so the database is read instead
+    assert monitor.get_current('weather', stale=180) is None
+    memory_db.insert_current('weather', {'safe': False})
+    assert monitor.get_current('weather', stale=180)['data']['safe'] is False
+
+
+def test_is_dark(monitor, ephemeris):
+    evening = Time('2016-08-13 05:00:00')  # 19:00 HST
+    assert monitor.is_dark(evening) is False
+    sunset = monitor._dark_range[1]
+
+    assert monitor.is_dark(evening + 10 * u.minute) is False
+    assert monitor._dark_range[1] == sunset
+
+    night = Time(sunset + 1 / 24, format='jd')
+    assert monitor.is_dark(night) is True
+    assert monitor.is_dark(night) == ephemeris.is_night(night, horizon=-18 * u.degree)
+    assert monitor._dark_range[0] == night.jd
+
+
+def test_free_space(monitor):
+    free_space = monitor.free_space()
+    assert free_space.unit == u.gigabyte
+
+    refreshed = monitor._free_space_time
+    assert monitor.free_space() is free_space
+    assert monitor._free_space_time == refreshed
+
+
+def test_messages(monitor, msg_publisher):
+    monitor.start()
+    assert monitor.is_running
+
+    for _ in range(20):
+        msg_publisher.send_message('weather', {'data': {'safe': True,
+                                                        'date': current_time().isot}})
+        if monitor.get_current('weather') is not None:
+            break
+        time.sleep(0.5)
+
+    assert monitor.get_current('weather', stale=180)['data']['safe'] is True
+
+    monitor.stop()
+    assert not monitor.is_running
@@ -0,0 +1,60 @@
+import pytest
+
+from astroplan import Observer
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.coordinates import get_moon
+from astropy.time import Time
+
+from pocs.utils.ephemeris import SiteEphemeris
+
+
+@pytest.fixture(scope='module')
+def observer():
+    location = EarthLocation(lat=19.54 * u.degree, lon=-155.58 * u.degree, height=3400 * u.meter)
+    return Observer(location=location, name="Test Observer", timezone='US/Hawaii')
+
+
+@pytest.fixture(scope='module')
+def ephemeris(observer):
+    return SiteEphemeris(observer)
+
+
+@pytest.mark.parametrize('time', ['2016-08-13 10:00:00', '2016-08-13 22:00:00'])
+def test_matches_astroplan(ephemeris, observer, time):
+    time = Time(time)
+    horizon = -18 * u.degree
+
+    assert ephemeris.is_night(time, horizon=horizon) == observer.is_night(time, horizon=horizon)
+
+    for mine, theirs in zip(ephemeris.tonight(time, horizon=horizon),
+                            observer.tonight(time=time, horizon=horizon)):
+        assert abs((mine - theirs).sec) < 5
+
+    assert abs((ephemeris.sun_set_time(time) -
+                observer.sun_set_time(time, which='next')).sec) < 5
+    assert abs((ephemeris.twilight_morning_astronomical(time) -
+                observer.twilight_morning_astronomical(time, which='next')).sec) < 5
+
+    assert ephemeris.moon(time).separation(get_moon(time, observer.location)) < 1 * u.arcsec
+    assert ephemeris.moon_altaz(time)[0] - observer.moon_altaz(time).alt < 1 * u.arcsec
+    assert ephemeris.moon_illumination(time) == pytest.approx(
+        float(observer.moon_illumination(time)), abs=1e-6)
+
+
+def test_moving_window(ephemeris):
+    time = Time('2016-08-13 10:00:00')
+    ephemeris.moon(time)
+    start_time = ephemeris.start_time
+    assert ephemeris.covers(time)
+
+    # Still inside the grid
+    ephemeris.is_night(time + 6 * u.hour)
+    assert ephemeris.start_time == start_time
+
+    # Moves on when asked about a later day
+    later = time + 3 * u.day
+    assert not ephemeris.covers(later)
+    ephemeris.is_night(later)
+    assert ephemeris.covers(later)
+    assert ephemeris.start_time > start_time
@@ -0,0 +1,95 @@
+import threading
+import time
+
+from astropy import units as u
+
+from pocs.utils.status import StatusCache
+
+
+class Counter(object):
+
+    def __init__(self, value=None):
+        self.calls = 0
+        self.value = value
+
+    def __call__(self):
+        self.calls += 1
+        return {'calls': self.calls} if self.value is None else self.value
+
+
+def test_ttl():
+    mount = Counter()
+    observer = Counter()
+
+    status = StatusCache()
+    status.add('mount', mount)
+    status.add('observer', observer, ttl=1 * u.hour)
+
+    assert status.get() == {'mount': {'calls': 1}, 'observer': {'calls': 1}}
+    assert status.get() == {'mount': {'calls': 2}, 'observer': {'calls': 1}}
+    assert status.get('observer') == {'calls': 1}
+    assert status.age('observer') < 1
+
+    status.invalidate('observer')
+    assert status.get('observer') == {'calls': 2}
+
+
+def test_key():
+    observation = ['HD 189733']
+    field = Counter()
+
+    status = StatusCache()
+    status.add('observation', field, ttl=3600, key=lambda: observation[0])
+
+    status.get()
+    status.get()
+    assert field.calls == 1
+
+    observation[0] = 'Wasp 33'
+    status.get()
+    assert field.calls == 2
+
+
+def test_none_and_errors():
+    def broken():
+        raise ValueError('No answer')
+
+    status = StatusCache()
+    status.add('dome', Counter(value=None))
+    status.add('camera', lambda: None)
+
+    assert list(status.get()) == ['dome']
+
+    # The last status is kept when a refresh fails
+    status.add('dome', broken)
+    status._values['dome'] = {'calls': 1}
+    assert status.get() == {'dome': {'calls': 1}}
+
+
+def test_background():
+    refreshed = threading.Event()
+
+    def slow():
+        refreshed.set()
+        time.sleep(0.5)
+        return {'slow': True}
+
+    status = StatusCache()
+    status.add('mount', slow, ttl=60)
+
+    status.start(interval=0.05)
+    try:
+        assert status.is_running
+        assert refreshed.wait(timeout=5)
+
+        # Answered at once while the refresh is still going
+        start = time.monotonic()
+        status.get()
+        assert time.monotonic() - start < 0.25
+
+        time.sleep(0.6)
+        assert status.get() == {'mount': {'slow': True}}
+    finally:
+        status.stop()
+
+    assert not status.is_running
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from pocs.utils.sync import SynchronizedStart
+
+
+def run_cameras(sync_start, delays, withdrawn=()):
+    """ Each camera sets up for its delay then waits, returns the release times seen """
+    released = dict()
+
+    def camera(name, delay):
+        time.sleep(delay)
+        if name in withdrawn:
+            sync_start.withdraw(name)
+            return
+
+        sync_start.wait(name)
+        released[name] = time.time()
+        sync_start.started(name)
+
+    threads = [threading.Thread(target=camera, args=item) for item in delays.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return released
+
+
+def test_start_together():
+    sync_start = SynchronizedStart(['cam0', 'cam1', 'cam2'])
+    released = run_cameras(sync_start, {'cam0': 0, 'cam1': 0.2, 'cam2': 0.5})
+
+    # Nobody starts until the slowest camera is ready
+    assert min(released.values()) >= sync_start.release_time
+    assert sync_start.release_time - min(released.values()) < 0.1
+    assert sorted(sync_start.skews) == ['cam0', 'cam1', 'cam2']
+    assert 0 <= sync_start.max_skew < 0.1
+
+
+def test_withdraw():
+    sync_start = SynchronizedStart(['cam0', 'cam1'], timeout=5)
+
+    start_time = time.time()
+    released = run_cameras(sync_start, {'cam0': 0, 'cam1': 0.2}, withdrawn=['cam1'])
+
+    assert list(released) == ['cam0']
+    assert time.time() - start_time < 1
+    assert list(sync_start.skews) == ['cam0']
+
+
+def test_timeout():
+    # cam1 never shows up
+    sync_start = SynchronizedStart(['cam0', 'cam1'], timeout=0.5)
+
+    start_time = time.time()
+    released = run_cameras(sync_start, {'cam0': 0})
+
+    assert list(released) == ['cam0']
+    assert 0.5 <= time.time() - start_time < 2
+
+
+def test_no_skews():
+    assert SynchronizedStart(['cam0']).max_skew == 0
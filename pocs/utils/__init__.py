@@ -1,4 +1,6 @@
 import contextlib
+import importlib
+import multiprocessing
 import os
 import shutil
 import signal
@@ -247,6 +249,64 @@ def load_module(module_name):
     return module
 
 
+def process_context():
+    """The `multiprocessing` context for pools of worker processes.
+
+    POCS runs status, messaging and logging threads, which a forked process
+    would inherit in whatever state they were in, so the workers are started
+    with `forkserver`, or `spawn` where that isn't available.
+
+    Returns:
+        multiprocessing.context.BaseContext: Pass as the `mp_context` of a
+            `concurrent.futures.ProcessPoolExecutor`.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+
+    return multiprocessing.get_context('spawn')
+
+
+def lazy_import(module_name):
+    """Import a module when it is first used.
+
+    Heavy optional dependencies, e.g. matplotlib or scipy, are only needed by
+    a few methods. Getting them with `lazy_import` at the top of a module,
+    instead of ``import``, keeps them from slowing down everything that
+    imports that module.
+
+    .. doctest::
+
+        >>> from pocs.utils import lazy_import
+        >>> math = lazy_import('math')
+        >>> math.sqrt(4)
+        2.0
+
+    Args:
+        module_name (str): Name of module to import.
+
+    Returns:
+        A stand-in for the module, which imports it when one of its attributes
+        is first used.
+    """
+    return _LazyModule(module_name)
+
+
+class _LazyModule(object):
+
+    def __init__(self, module_name):
+        self._module_name = module_name
+        self._module = None
+
+    def __getattr__(self, name):
+        if self._module is None:
+            self._module = importlib.import_module(self._module_name)
+
+        return getattr(self._module, name)
+
+    def __repr__(self):
+        return "<lazy module '{}'>".format(self._module_name)
+
+
 def altaz_to_radec(alt=35, az=90, location=None, obstime=None, verbose=False):
     """Convert alt/az degrees to RA/Dec SkyCoord.
 
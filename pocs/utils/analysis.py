@@ -0,0 +1,223 @@
+"""Plate solving and offsets, run in worker processes.
+
+Solving an image shells out to astrometry.net and takes tens of seconds, so
+the `AnalysisExecutor` runs these jobs in a process pool and hands back a
+`concurrent.futures.Future` for each, letting the state machine move on while
+the image is solved.
+"""
+import threading
+import time
+
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait as wait_for_futures
+from concurrent.futures.process import BrokenProcessPool
+
+from pocs.images import Image
+from pocs.utils import process_context
+from pocs.utils.logger import get_root_logger
+
+
+def solve_image(fits_file, **kwargs):
+    """Plate solve `fits_file`, which is replaced by the solved file
+
+    Args:
+        fits_file (str): Name of the FITS file.
+        **kwargs (dict): Options passed to `~pocs.images.Image.solve_field`.
+
+    Returns:
+        dict: The solved header, with the `solved_fits_file`.
+    """
+    solve_info = Image(fits_file).solve_field(**kwargs)
+
+    # Only keep plain values, to send back from the worker
+    return {key: value for key, value in solve_info.items()
+            if isinstance(value, (str, int, float, bool))}
+
+
+def image_offset(fits_file, pointing_file, **kwargs):
+    """Plate solve `fits_file` and find its offset from the pointing image
+
+    Args:
+        fits_file (str): Name of the FITS file.
+        pointing_file (str): Name of the solved pointing image.
+        **kwargs (dict): Options passed to `~pocs.images.Image.solve_field`.
+
+    Returns:
+        `~pocs.images.OffsetError`: Offset of `fits_file` from the pointing image.
+    """
+    kwargs.setdefault('skip_solved', False)
+
+    image = Image(fits_file)
+    image.solve_field(**kwargs)
+
+    return image.compute_offset(Image(pointing_file))
+
+
+def future_event(future):
+    """ A `threading.Event` that is set when `future` is done """
+    event = threading.Event()
+    future.add_done_callback(lambda f: event.set())
+
+    return event
+
+
+def _timed(func, args, kwargs):
+    started = time.time()
+    result = func(*args, **kwargs)
+
+    return result, started, time.time()
+
+
+class AnalysisExecutor(object):
+
+    """ Runs analysis jobs in worker processes and returns futures
+
+    At most `depth` jobs are pending at a time; `submit` waits for one to
+    finish when there are more. The latency of each job is kept in
+    `latencies`: how long it waited for a worker, how long it ran and the
+    total from being submitted to its result.
+
+    With no workers the jobs are run as they are submitted, which is how the
+    analysis was done before there was a pool.
+    """
+
+    def __init__(self, workers=1, depth=2, logger=None):
+        """
+        Args:
+            workers (int, optional): Number of worker processes, 0 to run jobs
+                when they are submitted.
+            depth (int, optional): Number of jobs that can be pending.
+            logger (optional): Logger for failed jobs.
+        """
+        self.workers = workers
+        self.depth = depth
+        self.logger = logger or get_root_logger()
+
+        #: deque: `name`, `wait`, `run` and `total` seconds of the latest jobs.
+        self.latencies = deque(maxlen=100)
+        self.completed = 0
+        self.failed = 0
+
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(depth)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """ Number of jobs that haven't finished """
+        return len(self._pending)
+
+    def submit(self, name, func, *args, **kwargs):
+        """Run `func(*args, **kwargs)` in a worker
+
+        `func` must be a module level function, e.g. `solve_image` or
+        `image_offset`, and its arguments must pickle.
+
+        Args:
+            name (str): Name of the job for the metrics.
+            func (callable): The job.
+
+        Returns:
+            concurrent.futures.Future: The result of `func`.
+        """
+        self._slots.acquire()
+
+        submitted = time.time()
+        future = Future()
+        with self._lock:
+            self._pending.add(future)
+
+        def done(job):
+            try:
+                result, started, finished = job.result()
+            except Exception as e:
+                self.failed += 1
+                self.logger.warning("Analysis job {} failed: {}".format(name, e))
+                future.set_exception(e)
+            else:
+                self.completed += 1
+                self.latencies.append({
+                    'name': name,
+                    'wait': started - submitted,
+                    'run': finished - started,
+                    'total': time.time() - submitted,
+                })
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self._pending.discard(future)
+                self._slots.release()
+
+        if self.workers > 0:
+            try:
+                job = self._submit(func, args, kwargs)
+            except Exception as e:
+                # Nothing will run, so give back the slot
+                self.failed += 1
+                self.logger.warning("Can't submit analysis job {}: {}".format(name, e))
+                with self._lock:
+                    self._pending.discard(future)
+                self._slots.release()
+                future.set_exception(e)
+
+                return future
+        else:
+            job = Future()
+            try:
+                job.set_result(_timed(func, args, kwargs))
+            except Exception as e:
+                job.set_exception(e)
+
+        job.add_done_callback(done)
+
+        return future
+
+    def wait(self, timeout=None):
+        """ Wait until every pending job has finished """
+        with self._lock:
+            pending = list(self._pending)
+
+        wait_for_futures(pending, timeout=timeout)
+
+    def status(self):
+        status = {
+            'pending': self.pending,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
+
+        if self.latencies:
+            totals = [latency['total'] for latency in self.latencies]
+            status['mean_latency'] = sum(totals) / len(totals)
+            status['max_latency'] = max(totals)
+
+        return status
+
+    def shutdown(self):
+        """ Wait for the pending jobs and stop the workers """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __str__(self):
+        return "AnalysisExecutor: {} workers, {}/{} pending".format(
+            self.workers, self.pending, self.depth)
+
+    def _submit(self, func, args, kwargs):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=process_context())
+
+        try:
+            return self._executor.submit(_timed, func, args, kwargs)
+        except BrokenProcessPool:
+            # A worker died, which breaks the whole pool
+            self.logger.warning("Analysis workers stopped, starting new ones")
+            self._executor.shutdown(wait=False)
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=process_context())
+
+            return self._executor.submit(_timed, func, args, kwargs)
@@ -0,0 +1,149 @@
+import itertools
+import queue
+import threading
+import time
+import zmq
+
+from collections import deque
+
+from pocs.utils.logger import get_root_logger
+from pocs.utils.messaging import PanMessaging
+
+#: tuple: Commands handed out before any others.
+PRIORITY_COMMANDS = ('park', 'shutdown')
+
+
+class CommandQueue(object):
+
+    """ Commands for POCS, waking it up as soon as one arrives
+
+    Works like a `queue.Queue` for `POCS.check_messages`, except that
+    `PRIORITY_COMMANDS` are handed out before the others and that `put` sets
+    `wakeup`, which `POCS.sleep` and `POCS.wait_for_events` wait on.
+
+    The seconds from each command being put to it being handed out are kept
+    in `latencies`.
+    """
+
+    def __init__(self, wakeup=None, priority=PRIORITY_COMMANDS):
+        """
+        Args:
+            wakeup (threading.Event, optional): Set when a command is put.
+            priority (tuple, optional): Commands handed out first.
+        """
+        self.wakeup = wakeup or threading.Event()
+        self.priority = priority
+
+        #: deque: `command` and `latency` of the latest commands.
+        self.latencies = deque(maxlen=100)
+
+        self._queue = queue.PriorityQueue()
+        self._count = itertools.count()
+
+    def put(self, msg_obj):
+        """ Add the command in `msg_obj` and wake up POCS """
+        priority = 0 if msg_obj.get('message') in self.priority else 1
+        self._queue.put((priority, next(self._count), time.monotonic(), msg_obj))
+        self.wakeup.set()
+
+    def get_nowait(self):
+        """Next command, priority commands first
+
+        Sets `wakeup` again if there are more commands.
+
+        Raises:
+            queue.Empty: If there are no commands.
+        """
+        _, _, received, msg_obj = self._queue.get_nowait()
+
+        # Come back for the rest
+        if not self._queue.empty():
+            self.wakeup.set()
+
+        self.latencies.append({
+            'command': msg_obj.get('message'),
+            'latency': time.monotonic() - received,
+        })
+
+        return msg_obj
+
+    def empty(self):
+        return self._queue.empty()
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class CommandReceiver(object):
+
+    """ Puts the commands sent to POCS in a `CommandQueue`
+
+    Listens in a background thread, which blocks until a message arrives so
+    that commands are queued as soon as they are received.
+    """
+
+    def __init__(self, port, commands, topic='POCS-CMD', logger=None):
+        """
+        Args:
+            port (int): Port of the message forwarder to subscribe to.
+            commands (CommandQueue): Queue the commands are put in.
+            topic (str, optional): Topic the commands are sent on.
+            logger (optional): Logger.
+        """
+        self.port = port
+        self.commands = commands
+        self.topic = topic
+        self.logger = logger or get_root_logger()
+
+        # How often the thread checks if it should stop, in ms
+        self.stop_check_interval = 500
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """ Listen for commands in a background thread """
+        if self.is_running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='CommandReceiver', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+
+    def __str__(self):
+        return "CommandReceiver: {} on port {}".format(self.topic, self.port)
+
+    def _run(self):
+        subscriber = PanMessaging.create_subscriber(self.port, topic=self.topic)
+
+        poller = zmq.Poller()
+        poller.register(subscriber.socket, zmq.POLLIN)
+
+        try:
+            while not self._stop.is_set():
+                if dict(poller.poll(self.stop_check_interval)).get(subscriber.socket) != zmq.POLLIN:
+                    continue
+
+                # Take everything that has arrived
+                while True:
+                    topic, msg_obj = subscriber.receive_message(flags=zmq.NOBLOCK)
+                    if topic is None:
+                        break
+
+                    if topic == self.topic and msg_obj:
+                        self.commands.put(msg_obj)
+        except Exception as e:  # pragma: no cover
+            self.logger.warning("Command receiver stopped: {}".format(e))
+        finally:
+            subscriber.close()
@@ -1,6 +1,5 @@
 import abc
 import os
-import pymongo
 import threading
 import weakref
 from warnings import warn
@@ -9,9 +8,13 @@ from glob import glob
 from bson.objectid import ObjectId
 
 from pocs.utils import current_time
+from pocs.utils import lazy_import
 from pocs.utils import serializers as json_util
 from pocs.utils.config import load_config
 
+# Only needed with a mongo database
+pymongo = lazy_import('pymongo')
+
 
 class AbstractPanDB(metaclass=abc.ABCMeta):
     def __init__(self, db_name=None, collection_names=list(), logger=None, **kwargs):
@@ -105,6 +108,18 @@ class AbstractPanDB(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    @abc.abstractclassmethod
+    def find_all(self, collection):
+        """Iterate over all the records of a collection.
+
+        Args:
+            collection (str): Name of valid collection within the db.
+
+        Returns:
+            iterable of dict: The records in the order they were inserted.
+        """
+        raise NotImplementedError
+
     @abc.abstractclassmethod
     def clear_current(self, type):
         """Clear the current record of a certain type
@@ -163,6 +178,8 @@ class PanDB(object):
             raise ValueError('db_type, a string, must be provided and not empty')
 
         collection_names = PanDB.collection_names()
+        if db_name is not None:
+            kwargs['db_name'] = db_name
 
         if db_type == 'mongo':
             try:
@@ -302,6 +319,10 @@ class PanMongoDB(AbstractPanDB):
             obj_id = ObjectId(obj_id)
         return collection.find_one({'_id': obj_id})
 
+    def find_all(self, collection):
+        self.validate_collection(collection)
+        return getattr(self, collection).find().sort('_id', pymongo.ASCENDING)
+
     def clear_current(self, type):
         self.current.delete_one({'type': type})
 
@@ -390,6 +411,8 @@ class PanFileDB(AbstractPanDB):
 
     def find(self, collection, obj_id):
         collection_fn = self._get_file(collection)
+        if not os.path.exists(collection_fn):
+            return None
         with open(collection_fn, 'r') as f:
             for line in f:
                 # Note: We can speed this up for the case where the obj_id doesn't
@@ -401,6 +424,16 @@ class PanFileDB(AbstractPanDB):
                     return obj
         return None
 
+    def find_all(self, collection):
+        self.validate_collection(collection)
+        collection_fn = self._get_file(collection)
+        try:
+            with open(collection_fn, 'r') as f:
+                for line in f:
+                    yield json_util.loads(line)
+        except FileNotFoundError:
+            return
+
     def clear_current(self, type):
         current_f = os.path.join(self._storage_dir, 'current_{}.json'.format(type))
         try:
@@ -501,6 +534,12 @@ class PanMemoryDB(AbstractPanDB):
             obj = json_util.loads(obj)
         return obj
 
+    def find_all(self, collection):
+        self.validate_collection(collection)
+        with self.lock:
+            objs = list(self.collections.get(collection, {}).values())
+        return [json_util.loads(obj) for obj in objs]
+
     def clear_current(self, entry_type):
         try:
             del self.current[entry_type]
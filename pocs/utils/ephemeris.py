@@ -0,0 +1,218 @@
+import numpy as np
+
+from astroplan import moon_phase_angle
+from astropy import units as u
+from astropy.coordinates import CartesianRepresentation
+from astropy.coordinates import GCRS
+from astropy.coordinates import SkyCoord
+from astropy.coordinates import get_moon
+from astropy.coordinates import get_sun
+from astropy.time import Time
+
+
+class SiteEphemeris(object):
+
+    """ Sun and Moon for a site, computed once on a time grid and interpolated
+
+    Checking whether it is dark, the twilight times, the position of the Moon
+    and its illumination all need astropy coordinate transforms that take
+    tens of milliseconds each. The `Observatory`, `POCS` and the scheduler ask
+    for them over and over while idle or waiting, so instead the Sun and Moon
+    are computed for a window of time around the first request on a fine grid
+    (every 2 minutes by default) and everything else is interpolated from it.
+    The window moves on when a request falls outside of it, so the grid is
+    only recomputed a few times a day.
+
+    Rise, set and twilight times are found where the interpolated altitude of
+    the Sun crosses the horizon, which is at least as precise as the grid
+    search `astroplan` does. Methods follow the `astroplan.Observer` ones of the
+    same name, only for a single time and always for the `next` event.
+    """
+
+    @u.quantity_input(step=u.minute, before=u.day, after=u.day)
+    def __init__(self, observer, step=2 * u.minute, before=6 * u.hour, after=1.5 * u.day):
+        """
+        Args:
+            observer (`astroplan.Observer`): The site.
+            step (astropy.units.Quantity, optional): Spacing of the grid.
+            before (astropy.units.Quantity, optional): How far the grid goes
+                back from the time it is computed for.
+            after (astropy.units.Quantity, optional): How far the grid goes
+                forward from the time it is computed for. Must be more than a
+                day to find the next rise and set from anywhere in the grid.
+        """
+        assert after > 1 * u.day, "The grid must reach more than a day ahead"
+
+        self.observer = observer
+        self.step = step
+        self.before = before
+        self.after = after
+
+        self._jd = None
+
+##################################################################################################
+# Properties
+##################################################################################################
+
+    @property
+    def start_time(self):
+        return None if self._jd is None else Time(self._jd[0], format='jd')
+
+    @property
+    def end_time(self):
+        return None if self._jd is None else Time(self._jd[-1], format='jd')
+
+##################################################################################################
+# Methods
+##################################################################################################
+
+    def covers(self, time):
+        """ If `time` and the day after it fall in the grid """
+        return self._jd is not None and self._jd[0] <= time.jd and time.jd + 1 <= self._jd[-1]
+
+    def compute(self, time):
+        """Compute the grid around `time`
+
+        Called automatically whenever a lookup isn't covered by the grid.
+        """
+        step = self.step.to(u.day).value
+        start = time.jd - self.before.to(u.day).value
+        num_steps = int(np.ceil((self.before + self.after).to(u.day).value / step)) + 1
+        self._jd = start + np.arange(num_steps) * step
+
+        times = Time(self._jd, format='jd')
+
+        sun = self.observer.altaz(times, get_sun(times))
+        self._sun_alt = sun.alt.degree
+        self._sun_az = np.degrees(np.unwrap(sun.az.radian))
+
+        moon = get_moon(times, self.observer.location)
+        self._moon_ra = np.degrees(np.unwrap(moon.ra.radian))
+        self._moon_dec = moon.dec.degree
+        self._moon_distance = moon.distance.to(u.km).value
+        self._obsgeoloc = moon.frame.obsgeoloc.xyz.to(u.m).value
+        self._obsgeovel = moon.frame.obsgeovel.xyz.to(u.m / u.s).value
+
+        moon_altaz = self.observer.altaz(times, moon)
+        self._moon_alt = moon_altaz.alt.degree
+        self._moon_az = np.degrees(np.unwrap(moon_altaz.az.radian))
+
+        self._moon_phase = moon_phase_angle(times).to(u.radian).value
+
+    def sun_altaz(self, time):
+        """ Alt and az of the Sun at `time` """
+        self._update(time)
+
+        return (self._interp(time, self._sun_alt) * u.degree,
+                (self._interp(time, self._sun_az) % 360) * u.degree)
+
+    def moon_altaz(self, time):
+        """ Alt and az of the Moon at `time` """
+        self._update(time)
+
+        return (self._interp(time, self._moon_alt) * u.degree,
+                (self._interp(time, self._moon_az) % 360) * u.degree)
+
+    def moon(self, time):
+        """ Position of the Moon at `time` as seen from the site, like `get_moon` """
+        self._update(time)
+
+        interp = self._interp
+        frame = GCRS(obstime=time,
+                     obsgeoloc=CartesianRepresentation(
+                         [interp(time, xyz) for xyz in self._obsgeoloc] * u.m),
+                     obsgeovel=CartesianRepresentation(
+                         [interp(time, xyz) for xyz in self._obsgeovel] * u.m / u.s))
+
+        return SkyCoord(ra=(interp(time, self._moon_ra) % 360) * u.degree,
+                        dec=interp(time, self._moon_dec) * u.degree,
+                        distance=interp(time, self._moon_distance) * u.km,
+                        frame=frame)
+
+    def moon_phase(self, time):
+        """ Orbital phase angle of the Moon, pi is new and 0 is full """
+        self._update(time)
+
+        return self._interp(time, self._moon_phase) * u.radian
+
+    def moon_illumination(self, time):
+        """ Fraction of the Moon that is illuminated """
+        self._update(time)
+
+        return (1 + np.cos(self._interp(time, self._moon_phase))) / 2.0
+
+    @u.quantity_input(horizon=u.degree)
+    def is_night(self, time, horizon=0 * u.degree):
+        """ If the Sun is below `horizon` at `time` """
+        self._update(time)
+
+        return bool(self._interp(time, self._sun_alt) < horizon.to(u.degree).value)
+
+    @u.quantity_input(horizon=u.degree)
+    def sun_set_time(self, time, horizon=0 * u.degree):
+        """ Next time the Sun sets below `horizon` """
+        return self._next_crossing(time, horizon, rising=False)
+
+    @u.quantity_input(horizon=u.degree)
+    def sun_rise_time(self, time, horizon=0 * u.degree):
+        """ Next time the Sun rises above `horizon` """
+        return self._next_crossing(time, horizon, rising=True)
+
+    def twilight_evening_astronomical(self, time):
+        return self.sun_set_time(time, horizon=-18 * u.degree)
+
+    def twilight_morning_astronomical(self, time):
+        return self.sun_rise_time(time, horizon=-18 * u.degree)
+
+    @u.quantity_input(horizon=u.degree)
+    def tonight(self, time, horizon=0 * u.degree):
+        """Start and end of the current or next night, like `astroplan.Observer.tonight`
+
+        Returns:
+            tuple: `time` if it is night and the next sunset otherwise, and the
+                sunrise after that.
+        """
+        if self.is_night(time, horizon=horizon):
+            start_time = time
+        else:
+            start_time = self.sun_set_time(time, horizon=horizon)
+
+        return start_time, self.sun_rise_time(start_time, horizon=horizon)
+
+    def __str__(self):
+        if self._jd is None:
+            return "SiteEphemeris: not computed"
+
+        return "SiteEphemeris: {} to {} every {}".format(
+            self.start_time.isot, self.end_time.isot, self.step)
+
+##################################################################################################
+# Private Methods
+##################################################################################################
+
+    def _update(self, time):
+        if not self.covers(time):
+            self.compute(time)
+
+    def _interp(self, time, values):
+        return float(np.interp(time.jd, self._jd, values))
+
+    def _next_crossing(self, time, horizon, rising):
+        self._update(time)
+
+        alt = self._sun_alt - horizon.to(u.degree).value
+        first = np.searchsorted(self._jd, time.jd, side='right') - 1
+
+        if rising:
+            crossings = np.flatnonzero((alt[first:-1] <= 0) & (alt[first + 1:] > 0))
+        else:
+            crossings = np.flatnonzero((alt[first:-1] >= 0) & (alt[first + 1:] < 0))
+
+        for i in crossings + first:
+            # Linear interpolation between the grid points on either side
+            jd = self._jd[i] + (self._jd[i + 1] - self._jd[i]) * alt[i] / (alt[i] - alt[i + 1])
+            if jd > time.jd:
+                return Time(jd, format='jd')
+
+        # The Sun never crosses the horizon in the next day, e.g. near the poles
+        return Time(np.nan, format='jd')
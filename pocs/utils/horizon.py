@@ -1,5 +1,8 @@
 import numpy as np
-from scipy import interpolate
+
+from pocs.utils import lazy_import
+
+interpolate = lazy_import('scipy.interpolate')
 
 
 class Horizon(object):
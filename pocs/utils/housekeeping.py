@@ -0,0 +1,190 @@
+import json
+import os
+import subprocess
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pocs.utils.logger import get_root_logger
+
+
+def directory_size(directory):
+    """ Total size in bytes of the files in `directory` """
+    size = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+
+    return size
+
+
+class HousekeepingQueue(object):
+
+    """ Runs the housekeeping commands of image directories, several at a time
+
+    Each job is a command, e.g. ``scripts/upload_image_dir.py``, run on one
+    directory. Jobs for different directories are independent, so `run` runs
+    up to `workers` of them at once.
+
+    The jobs that haven't finished are kept in `state_file`, so that if
+    housekeeping is interrupted the next `run` picks up the jobs that were left.
+    """
+
+    def __init__(self, state_file, workers=2, timeout=3600, logger=None):
+        """
+        Args:
+            state_file (str): JSON file the unfinished jobs are kept in.
+            workers (int, optional): Number of jobs run at once.
+            timeout (float, optional): Seconds after which a job is killed.
+            logger (optional): Logger for the jobs.
+        """
+        self.state_file = state_file
+        self.workers = workers
+        self.timeout = timeout
+        self.logger = logger or get_root_logger()
+
+        #: list: `directory`, `state`, `duration` and `size` of each job run.
+        self.results = list()
+
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._load()
+
+    @property
+    def pending(self):
+        """ Directories whose housekeeping hasn't finished """
+        return list(self._jobs)
+
+    def add(self, directory, cmd):
+        """Add the housekeeping of `directory`
+
+        Args:
+            directory (str): The image directory.
+            cmd (list): The command to run, as for `subprocess.Popen`.
+        """
+        with self._lock:
+            self._jobs[directory] = {'cmd': cmd, 'state': 'pending'}
+            self._save()
+
+    def run(self):
+        """Run every pending job, waiting until they are done
+
+        Returns:
+            dict: Summary of the jobs, see `summary`.
+        """
+        with self._lock:
+            directories = list(self._jobs)
+
+        if not directories:
+            return self.summary([], 0)
+
+        self.logger.info("Housekeeping for {} directories, {} at a time",
+                         len(directories), self.workers)
+
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self._run_job, directories))
+
+        summary = self.summary(results, time.monotonic() - start_time)
+        self.logger.info("Housekeeping done: {}", summary)
+
+        return summary
+
+    def summary(self, results, duration):
+        """Throughput of `results` run in `duration` seconds
+
+        Returns:
+            dict: The number of `jobs` and how many `failed`, the total
+                `duration`, `jobs_per_hour` and `mb_per_second` processed.
+        """
+        size = sum(result['size'] for result in results)
+
+        return {
+            'jobs': len(results),
+            'failed': sum(1 for result in results if result['state'] != 'done'),
+            'duration': duration,
+            'jobs_per_hour': len(results) / duration * 3600 if duration > 0 else 0,
+            'mb_per_second': size / 1e6 / duration if duration > 0 else 0,
+        }
+
+    def __str__(self):
+        return "HousekeepingQueue: {} pending, {} workers".format(len(self._jobs), self.workers)
+
+    def _run_job(self, directory):
+        with self._lock:
+            job = self._jobs[directory]
+            job['state'] = 'running'
+            self._save()
+
+        size = directory_size(directory)
+        self.logger.info('Cleaning directory {}'.format(directory))
+
+        start_time = time.monotonic()
+        try:
+            proc = subprocess.Popen(job['cmd'],
+                                    universal_newlines=True,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE)
+            self.logger.debug('Cleaning {} pid={}'.format(directory, proc.pid))
+
+            try:
+                outs, errs = proc.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                outs, errs = proc.communicate(timeout=10)
+
+            state = 'done' if proc.returncode == 0 else 'failed'
+            if state == 'failed' and errs:
+                self.logger.warning("Problem cleaning {}: {}".format(directory, errs))
+        except Exception as e:
+            self.logger.warning("Problem cleaning {}: {}".format(directory, e))
+            state = 'failed'
+
+        result = {
+            'directory': directory,
+            'state': state,
+            'duration': time.monotonic() - start_time,
+            'size': size,
+        }
+        self.logger.debug('Cleaned {directory} in {duration:.1f} s: {state}'.format(**result))
+
+        with self._lock:
+            # Failed jobs aren't retried
+            del self._jobs[directory]
+            self._save()
+            self.results.append(result)
+
+        return result
+
+    def _load(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                jobs = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.logger.warning("Can't read housekeeping jobs from {}: {}".format(
+                self.state_file, e))
+            return
+
+        for directory, job in jobs.items():
+            if job['state'] == 'running':
+                self.logger.info("Housekeeping of {} was interrupted, running it again",
+                                 directory)
+            job['state'] = 'pending'
+            self._jobs[directory] = job
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file, 'w') as f:
+                json.dump(self._jobs, f, indent=2)
+        except Exception as e:
+            self.logger.warning("Can't save housekeeping jobs to {}: {}".format(
+                self.state_file, e))
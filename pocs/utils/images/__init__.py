@@ -2,13 +2,12 @@ import os
 import subprocess
 import shutil
 from contextlib import suppress
+from functools import lru_cache
 
-from matplotlib import pyplot as plt
 from warnings import warn
 
 from astropy.wcs import WCS
 from astropy.io.fits import open as open_fits
-from astropy.visualization import (PercentileInterval, LogStretch, ImageNormalize)
 
 from glob import glob
 from copy import copy
@@ -16,13 +15,27 @@ from dateutil import parser as date_parser
 
 from pocs.utils import current_time
 from pocs.utils import error
+from pocs.utils import lazy_import
 from pocs.utils.images import fits as fits_utils
 from pocs.utils.images import focus as focus_utils
 
-palette = copy(plt.cm.inferno)
-palette.set_over('w', 1.0)
-palette.set_under('k', 1.0)
-palette.set_bad('g', 1.0)
+# Only needed to plot images
+plt = lazy_import('matplotlib.pyplot')
+visualization = lazy_import('astropy.visualization')
+
+
+@lru_cache()
+def get_palette():
+    """Colour map for images, `inferno` with saturated pixels in white.
+
+    Made on first use, to only import matplotlib when an image is plotted.
+    """
+    palette = copy(plt.cm.inferno)
+    palette.set_over('w', 1.0)
+    palette.set_under('k', 1.0)
+    palette.set_bad('g', 1.0)
+
+    return palette
 
 
 def make_images_dir():
@@ -160,7 +173,8 @@ def _make_pretty_from_fits(fname=None,
 
         title = '{} ({}s {}) {}'.format(field, exp_time, filter_type, date_time)
 
-    norm = ImageNormalize(interval=PercentileInterval(clip_percent), stretch=LogStretch())
+    norm = visualization.ImageNormalize(interval=visualization.PercentileInterval(clip_percent),
+                                        stretch=visualization.LogStretch())
 
     fig = plt.figure(figsize=figsize, dpi=dpi)
 
@@ -192,7 +206,7 @@ def _make_pretty_from_fits(fname=None,
         ax.set_xlabel('X / pixels')
         ax.set_ylabel('Y / pixels')
 
-    im = ax.imshow(data, norm=norm, cmap=palette, origin='lower')
+    im = ax.imshow(data, norm=norm, cmap=get_palette(), origin='lower')
     fig.colorbar(im)
     plt.title(title)
 
@@ -393,6 +393,8 @@ def update_headers(file_path, info):
         hdu.header.set('OBSERVER', info.get('observer', ''), 'PANOPTES Unit ID')
         hdu.header.set('ORIGIN', info.get('origin', ''))
         hdu.header.set('RA-RATE', info.get('tracking_rate_ra', ''), 'RA Tracking Rate')
+        if 'start_skew' in info:
+            hdu.header.set('STARTSKW', info['start_skew'], 'Seconds after cameras released')
 
 
 def getheader(fn, *args, **kwargs):
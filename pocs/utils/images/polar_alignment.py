@@ -1,19 +1,18 @@
-from matplotlib import pyplot as plt
-
 import numpy as np
 
-from skimage.feature import canny
-from skimage.transform import hough_circle
-from skimage.transform import hough_circle_peaks
-
 from astropy.io import fits
 from astropy.nddata import Cutout2D
 from astropy.visualization import SqrtStretch
 from astropy.visualization.mpl_normalize import ImageNormalize
 from astropy.wcs import WCS
 
+from pocs.utils import lazy_import
 from pocs.utils.images.fits import get_solve_field
 
+plt = lazy_import('matplotlib.pyplot')
+feature = lazy_import('skimage.feature')
+transform = lazy_import('skimage.transform')
+
 
 def analyze_polar_rotation(pole_fn, *args, **kwargs):
     """ Get celestial pole XY coordinates
@@ -54,12 +53,12 @@ def analyze_ra_rotation(rotate_fn):
     d1.data = d1.data / d1.data.max()
 
     # Get edges for rotation
-    rotate_edges = canny(d1.data, sigma=1.0)
+    rotate_edges = feature.canny(d1.data, sigma=1.0)
 
     rotate_hough_radii = np.arange(100, 500, 50)
-    rotate_hough_res = hough_circle(rotate_edges, rotate_hough_radii)
+    rotate_hough_res = transform.hough_circle(rotate_edges, rotate_hough_radii)
     rotate_accums, rotate_cx, rotate_cy, rotate_radii = \
-        hough_circle_peaks(rotate_hough_res, rotate_hough_radii, total_num_peaks=1)
+        transform.hough_circle_peaks(rotate_hough_res, rotate_hough_radii, total_num_peaks=1)
 
     return d1.to_original_position((rotate_cx[-1], rotate_cy[-1]))
 
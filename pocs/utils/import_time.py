@@ -0,0 +1,108 @@
+"""Measure how long importing POCS takes.
+
+Runs ``python -X importtime -c 'import <module>'`` in a new process, so that
+nothing is already imported, and parses the timings it writes to stderr:
+
+    >>> from pocs.utils.import_time import import_time
+    >>> import_time('pocs.core')     # doctest: +SKIP
+    0.85
+
+See also `scripts/benchmark_import_time.py`.
+"""
+import re
+import subprocess
+import sys
+
+#: float: Seconds importing `pocs.core` may take before it counts as a regression.
+IMPORT_TIME_LIMIT = 3.0
+
+#: tuple: Heavy dependencies that `pocs.core` only imports when they are used,
+#: see `pocs.utils.lazy_import`.
+LAZY_MODULES = ('matplotlib', 'scipy', 'skimage', 'pymongo', 'astropy.visualization')
+
+_line_re = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(output):
+    """Parse the output of ``python -X importtime``
+
+    Args:
+        output (str): The stderr of the process.
+
+    Returns:
+        list: The `module`, its `self` and `cumulative` time in seconds and
+            its `depth` in the import tree, in the order they finished.
+    """
+    records = list()
+    for line in output.splitlines():
+        match = _line_re.match(line)
+        if match is None:
+            continue
+
+        self_us, cumulative_us, indent, module = match.groups()
+        records.append({
+            'module': module,
+            'self': int(self_us) / 1e6,
+            'cumulative': int(cumulative_us) / 1e6,
+            'depth': len(indent) // 2,
+        })
+
+    return records
+
+
+def measure_import(module='pocs.core', python=None):
+    """Import `module` in a new process
+
+    Args:
+        module (str, optional): Module to import, default `pocs.core`.
+        python (str, optional): Python to run, defaults to this one.
+
+    Returns:
+        list: The records of each module imported, see `parse_importtime`.
+
+    Raises:
+        subprocess.CalledProcessError: If `module` can't be imported.
+    """
+    proc = subprocess.run([python or sys.executable, '-X', 'importtime', '-c',
+                           'import {}'.format(module)],
+                          stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE,
+                          universal_newlines=True,
+                          check=True)
+
+    return parse_importtime(proc.stderr)
+
+
+def best_import(module='pocs.core', repeat=3, python=None):
+    """Import `module` `repeat` times, keeping the fastest
+
+    Returns:
+        tuple: The seconds it took and the records of each module imported.
+    """
+    best = None
+    for _ in range(repeat):
+        records = measure_import(module, python=python)
+        total = max(record['cumulative'] for record in records if record['module'] == module)
+        if best is None or total < best[0]:
+            best = (total, records)
+
+    return best
+
+
+def import_time(module='pocs.core', repeat=3, python=None):
+    """ Seconds it takes to import `module`, the best of `repeat` tries """
+    return best_import(module, repeat=repeat, python=python)[0]
+
+
+def imported_lazy_modules(records, modules=LAZY_MODULES):
+    """ Which of the lazily imported `modules` were imported anyway """
+    imported = {record['module'] for record in records}
+
+    return [module for module in modules if module in imported]
+
+
+def slowest(records, count=10):
+    """ The `count` top level imports that take the longest """
+    top_level = [record for record in records if record['depth'] == 1]
+
+    return sorted(top_level, key=lambda record: record['cumulative'], reverse=True)[:count]
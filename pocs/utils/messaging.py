@@ -173,6 +173,60 @@ class PanMessaging(object):
 
         return obj
 
+    @classmethod
+    def create_replier(cls, port, bind=True, connect=False):
+        """ Create the server side of a request/reply pair
+
+        Each message received with `receive_message` must be answered with
+        `send_message` before the next one can be received.
+
+        Args:
+            port (int): The port to bind to.
+
+        Returns:
+            A ZMQ REP socket
+        """
+        obj = cls()
+        obj.logger.debug("Creating replier. Port: {}".format(port))
+
+        socket = obj.context.socket(zmq.REP)
+
+        if bind:
+            socket.bind('tcp://*:{}'.format(port))
+        elif connect:
+            socket.connect('tcp://localhost:{}'.format(port))
+
+        obj.socket = socket
+
+        return obj
+
+    @classmethod
+    def create_requester(cls, port, host='localhost'):
+        """ Create the client side of a request/reply pair
+
+        Each message sent with `send_message` must get its reply from
+        `receive_message` before the next one can be sent. If no reply comes
+        the requester has to be closed and a new one created.
+
+        Args:
+            port (int): The port to connect to.
+            host (str, optional): The host of the replier.
+
+        Returns:
+            A ZMQ REQ socket
+        """
+        obj = cls()
+        obj.logger.debug("Creating requester. Connecting to {}:{}".format(host, port))
+
+        socket = obj.context.socket(zmq.REQ)
+        # Don't hang on `close` with a request that never went out
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.connect('tcp://{}:{}'.format(host, port))
+
+        obj.socket = socket
+
+        return obj
+
     def send_message(self, topic, message):
         """ Responsible for actually sending message across a topic
 
@@ -0,0 +1,119 @@
+import queue
+import threading
+
+from collections import deque
+
+from pocs.utils.logger import get_root_logger
+
+
+class PipelineJob(object):
+
+    """ A job run by a `Pipeline`
+
+    Attributes:
+        name (str): Name of the job, e.g. the image id.
+        done (threading.Event): Set once the job has run, even if it failed.
+        result: What the job returned.
+        error (Exception or None): What the job raised, if it failed.
+    """
+
+    def __init__(self, name, func, args=(), kwargs=None):
+        self.name = name
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs or dict()
+
+    def run(self):
+        try:
+            self.result = self._func(*self._args, **self._kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def __str__(self):
+        if not self.done.is_set():
+            state = 'pending'
+        elif self.error is not None:
+            state = 'failed: {}'.format(self.error)
+        else:
+            state = 'done'
+
+        return "{} ({})".format(self.name, state)
+
+
+class Pipeline(object):
+
+    """ Runs jobs one at a time and in order, in a background thread
+
+    At most `size` jobs wait to be run; `submit` blocks until there is room,
+    which holds back whoever makes the jobs when the pipeline falls behind.
+    Finished jobs are kept until collected with `finished`.
+    """
+
+    def __init__(self, name='Pipeline', size=2, logger=None):
+        """
+        Args:
+            name (str, optional): Name of the thread.
+            size (int, optional): Number of jobs that can wait to be run,
+                unlimited if 0.
+            logger (optional): Logger for failed jobs.
+        """
+        self.name = name
+        self.logger = logger or get_root_logger()
+
+        self._queue = queue.Queue(maxsize=size)
+        self._finished = deque()
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        """ Number of jobs that haven't finished """
+        return self._queue.unfinished_tasks
+
+    def submit(self, name, func, *args, **kwargs):
+        """Add a job, waiting for room if the pipeline is full
+
+        Args:
+            name (str): Name of the job.
+            func (callable): Called with `args` and `kwargs` to run the job.
+
+        Returns:
+            `PipelineJob`: The job.
+        """
+        job = PipelineJob(name, func, args=args, kwargs=kwargs)
+        self._queue.put(job)
+
+        return job
+
+    def finished(self):
+        """ The jobs that finished since last asked, oldest first """
+        jobs = list()
+        while self._finished:
+            jobs.append(self._finished.popleft())
+
+        return jobs
+
+    def wait(self):
+        """ Wait until every job has finished """
+        self._queue.join()
+
+    def __str__(self):
+        return "{}: {} pending".format(self.name, self.pending)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.run()
+
+            if job.error is not None:
+                self.logger.warning("{} failed: {}".format(job.name, job.error))
+
+            self._finished.append(job)
+            self._queue.task_done()
@@ -0,0 +1,190 @@
+import threading
+import time
+
+import zmq
+
+from astropy import units as u
+from astropy.time import Time
+
+from pocs.base import PanBase
+from pocs.utils import current_time
+from pocs.utils import get_free_space
+from pocs.utils.messaging import PanMessaging
+
+
+class SafetyMonitor(PanBase):
+
+    """ Keeps the latest readings needed by `~pocs.core.POCS.is_safe`
+
+    Once started, the monitor subscribes to the ``weather`` and
+    ``environment`` messages and keeps the latest weather and power readings
+    as they arrive, so they don't have to be read from the database on every
+    state change. When there is no reading from a message that is recent
+    enough, e.g. because messaging is down, the database is read instead.
+
+    Whether it is dark is kept until the Sun next crosses the horizon, and
+    the free disk space is refreshed every `safety.free_space_interval`
+    seconds.
+    """
+
+    def __init__(self, ephemeris=None, horizon=-18 * u.degree, *args, **kwargs):
+        """
+        Args:
+            ephemeris (`~pocs.utils.ephemeris.SiteEphemeris`, optional): The
+                Sun of the site, needed for `is_dark`.
+            horizon (astropy.units.Quantity, optional): Altitude of the Sun
+                below which it is dark, astronomical twilight by default.
+        """
+        super().__init__(*args, **kwargs)
+
+        safety_config = self.config.get('safety', {})
+
+        self.ephemeris = ephemeris
+        self.horizon = horizon
+        self.free_space_interval = safety_config.get('free_space_interval', 60)
+
+        # Latest record from a message for each `current` collection
+        self._records = dict()
+        self._lock = threading.Lock()
+
+        # Whether it is dark and the JD range over which that holds
+        self._dark = None
+        self._dark_range = (0., 0.)
+
+        self._free_space = None
+        self._free_space_time = None
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def is_running(self):
+        """ If the monitor is listening for messages """
+        return self._thread is not None and self._thread.is_alive()
+
+##################################################################################################
+# Methods
+##################################################################################################
+
+    def get_current(self, collection, stale=None):
+        """The latest record for `collection`, like `PanDB.get_current`
+
+        Args:
+            collection (str): Either 'weather' or 'power'.
+            stale (float, optional): Seconds after which the record from a
+                message is ignored and the database is read instead.
+
+        Returns:
+            dict|None: The record, with the reading in `data` and its `date`.
+        """
+        with self._lock:
+            record = self._records.get(collection)
+
+        if record is not None:
+            if stale is None or self._age(record) <= stale:
+                return record
+
+        return self.db.get_current(collection)
+
+    def handle_message(self, topic, msg_obj):
+        """Keep the readings from a ``weather`` or ``environment`` message
+
+        Args:
+            topic (str): The topic of the message.
+            msg_obj (dict): The message, with the reading in `data`.
+        """
+        try:
+            data = msg_obj['data']
+            date = Time(data['date']).datetime
+        except Exception:
+            return
+
+        if topic == 'weather':
+            self._store('weather', data, date)
+        elif topic == 'environment' and isinstance(data.get('power'), dict):
+            self._store('power', data['power'], date)
+
+    def is_dark(self, time=None):
+        """ If the Sun is below `horizon`, recomputed only when it next crosses it """
+        if time is None:
+            time = current_time()
+
+        start, end = self._dark_range
+        if not start <= time.jd < end:
+            self._dark = self.ephemeris.is_night(time, horizon=self.horizon)
+
+            if self._dark:
+                crossing = self.ephemeris.sun_rise_time(time, horizon=self.horizon)
+            else:
+                crossing = self.ephemeris.sun_set_time(time, horizon=self.horizon)
+
+            self._dark_range = (time.jd, crossing.jd)
+
+        return self._dark
+
+    def free_space(self):
+        """ Free disk space, refreshed every `free_space_interval` seconds """
+        if self._free_space_time is None or \
+                time.monotonic() - self._free_space_time >= self.free_space_interval:
+            self._refresh_free_space()
+
+        return self._free_space
+
+    def start(self):
+        """ Listen for messages in a background thread """
+        if self.is_running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='SafetyMonitor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __str__(self):
+        return "SafetyMonitor: {}".format(', '.join(
+            '{} {}'.format(collection, record['date']) for collection, record in
+            self._records.items()) or 'no readings')
+
+##################################################################################################
+# Private Methods
+##################################################################################################
+
+    def _store(self, collection, data, date):
+        with self._lock:
+            self._records[collection] = {'type': collection, 'data': data, 'date': date}
+
+    def _age(self, record):
+        timestamp = record['date'].replace(tzinfo=None)  # current_time is timezone naive
+        return (current_time().datetime - timestamp).total_seconds()
+
+    def _refresh_free_space(self):
+        self._free_space = get_free_space()
+        self._free_space_time = time.monotonic()
+
+    def _run(self):
+        msg_port = self.config['messaging']['msg_port']
+        subscriber = PanMessaging.create_subscriber(msg_port + 1)
+
+        poller = zmq.Poller()
+        poller.register(subscriber.socket, zmq.POLLIN)
+
+        try:
+            while not self._stop.is_set():
+                if self._free_space_time is None or \
+                        time.monotonic() - self._free_space_time >= self.free_space_interval:
+                    self._refresh_free_space()
+
+                if dict(poller.poll(500)).get(subscriber.socket) == zmq.POLLIN:
+                    topic, msg_obj = subscriber.receive_message(flags=zmq.NOBLOCK)
+                    if topic in ('weather', 'environment'):
+                        self.handle_message(topic, msg_obj)
+        except Exception as e:  # pragma: no cover
+            self.logger.warning("Safety monitor stopped: {}".format(e))
+        finally:
+            subscriber.close()
@@ -0,0 +1,156 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+from astropy import units as u
+
+from pocs.utils.logger import get_root_logger
+
+
+def _seconds(duration):
+    if isinstance(duration, u.Quantity):
+        return duration.to(u.second).value
+
+    return float(duration)
+
+
+class StatusCache(object):
+
+    """ The latest status of each component of a system, each refreshed on its own schedule
+
+    A component is a function returning its status, e.g. a dict, or None if
+    it has nothing to report. Its status is kept for `ttl` and then refreshed,
+    or sooner if its `key` (e.g. the current observation) changes.
+
+    By default stale components are refreshed when `get` is called. After
+    `start`, a thread refreshes them instead and `get` returns the latest
+    status at once, however long the refresh takes.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or get_root_logger()
+
+        self._components = OrderedDict()
+        self._values = dict()
+        self._refreshed = dict()
+        self._keys = dict()
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.RLock()
+
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def is_running(self):
+        """ If the background thread is refreshing the components """
+        return self._thread is not None and self._thread.is_alive()
+
+    def add(self, name, refresh, ttl=0, key=None):
+        """Add a component
+
+        Args:
+            name (str): Name of the component in the status.
+            refresh (callable): Returns the status of the component.
+            ttl (astropy.units.Quantity or float, optional): How long a status
+                is kept, in seconds if a float. The default of 0 refreshes it
+                every time it is asked for.
+            key (callable, optional): The status is refreshed when what this
+                returns changes.
+        """
+        self._components[name] = (refresh, _seconds(ttl), key)
+        self.invalidate(name)
+
+    def get(self, name=None):
+        """The status of every component, or only `name`
+
+        Components that report None are left out.
+        """
+        if not self.is_running:
+            self.refresh(stale_only=True)
+
+        with self._lock:
+            if name is not None:
+                return self._values.get(name)
+
+            return OrderedDict((name, self._values[name]) for name in self._components
+                               if self._values.get(name) is not None)
+
+    def age(self, name):
+        """ Seconds since `name` was refreshed, None if it never was """
+        refreshed = self._refreshed.get(name)
+        return None if refreshed is None else time.monotonic() - refreshed
+
+    def is_stale(self, name):
+        _, ttl, key = self._components[name]
+
+        age = self.age(name)
+        if age is None or age >= ttl:
+            return True
+
+        return key is not None and key() is not self._keys.get(name)
+
+    def refresh(self, names=None, stale_only=False):
+        """Refresh components now
+
+        Args:
+            names (list, optional): Components to refresh, all of them by default.
+            stale_only (bool, optional): Skip those that are still fresh.
+        """
+        with self._refresh_lock:
+            for name in list(names or self._components):
+                if stale_only and not self.is_stale(name):
+                    continue
+
+                refresh, _, key = self._components[name]
+                key_value = key() if key is not None else None
+
+                try:
+                    value = refresh()
+                except Exception as e:
+                    self.logger.warning("Can't get {} status: {}".format(name, e))
+                    continue
+
+                with self._lock:
+                    self._values[name] = value
+                    self._refreshed[name] = time.monotonic()
+                    self._keys[name] = key_value
+
+    def invalidate(self, name=None):
+        """ Refresh `name`, or every component, the next time """
+        with self._lock:
+            for component in ([name] if name else list(self._components)):
+                self._refreshed.pop(component, None)
+
+    def start(self, interval=1 * u.second):
+        """Refresh the components in a background thread
+
+        Args:
+            interval (astropy.units.Quantity or float, optional): How often the
+                thread looks for stale components.
+        """
+        if self.is_running:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(_seconds(interval),),
+                                        name='status_refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stop the background thread """
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __str__(self):
+        return "StatusCache: {}".format(', '.join(
+            '{} ({} s)'.format(name, ttl) for name, (_, ttl, _) in self._components.items()))
+
+    def _run(self, interval):
+        while not self._stop.is_set():
+            self.refresh(stale_only=True)
+            self._stop.wait(timeout=interval)
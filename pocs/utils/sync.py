@@ -0,0 +1,79 @@
+import threading
+import time
+
+
+class SynchronizedStart(object):
+
+    """ Starts the exposures of several cameras together and measures the skew
+
+    Each camera does its own setup and then calls `wait`, which returns once
+    every camera is ready, so that all the exposures are started at once.
+    A camera that fails before getting there calls `withdraw` so that the
+    others aren't held up, and the cameras are released anyway after
+    `timeout` seconds.
+
+    The skew of each camera, the seconds between the release and its exposure
+    being started, is kept in `skews`.
+    """
+
+    def __init__(self, names, timeout=10):
+        """
+        Args:
+            names (list): Names of the cameras.
+            timeout (float, optional): Longest a camera waits for the others.
+        """
+        self.timeout = timeout
+
+        #: float: Time the cameras were released, from `time.time`.
+        self.release_time = None
+        #: dict: Skew of each camera in seconds.
+        self.skews = dict()
+
+        self._waiting = set(names)
+        self._arrived = set()
+        self._condition = threading.Condition()
+
+    def wait(self, name):
+        """ Wait until every camera is ready """
+        with self._condition:
+            self._arrived.add(name)
+            self._release_if_ready()
+
+            if not self._condition.wait_for(lambda: self.release_time is not None,
+                                            timeout=self.timeout):
+                self._release()
+
+    def withdraw(self, name):
+        """ Don't wait for `name`, if it hasn't arrived yet """
+        with self._condition:
+            if name not in self._arrived:
+                self._waiting.discard(name)
+                self._release_if_ready()
+
+    def started(self, name):
+        """Note that the exposure of `name` has been started
+
+        Returns:
+            float: The skew of `name` in seconds.
+        """
+        skew = time.time() - self.release_time
+        self.skews[name] = skew
+
+        return skew
+
+    @property
+    def max_skew(self):
+        """ Largest skew between two cameras in seconds """
+        if not self.skews:
+            return 0.
+
+        return max(self.skews.values()) - min(self.skews.values())
+
+    def _release_if_ready(self):
+        if self._waiting <= self._arrived:
+            self._release()
+
+    def _release(self):
+        if self.release_time is None:
+            self.release_time = time.time()
+            self._condition.notify_all()
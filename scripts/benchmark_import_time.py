@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+import sys
+
+from pocs.utils.import_time import IMPORT_TIME_LIMIT
+from pocs.utils.import_time import best_import
+from pocs.utils.import_time import imported_lazy_modules
+from pocs.utils.import_time import slowest
+
+
+def main(module='pocs.core', repeat=3, limit=IMPORT_TIME_LIMIT, top=10, verbose=False):
+    """Time importing a module from a cold start.
+
+    See argparse help string below for details about parameters.
+
+    Returns:
+        bool: If the import was quick enough and no lazy modules were imported.
+    """
+    best_time, best_records = best_import(module, repeat=repeat)
+
+    print("Importing {} took {:.3f} s (best of {}), limit {:.3f} s".format(
+        module, best_time, repeat, limit))
+
+    if verbose:
+        for record in slowest(best_records, count=top):
+            print("  {cumulative:8.3f} s  {module}".format(**record))
+
+    ok = best_time <= limit
+
+    lazy_modules = imported_lazy_modules(best_records)
+    if lazy_modules:
+        print("Imported modules that should be lazy: {}".format(', '.join(lazy_modules)))
+        ok = False
+
+    return ok
+
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the time to import POCS")
+    parser.add_argument('--module', default='pocs.core',
+                        help='Module to import, default pocs.core.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of imports, the best is used, default 3.')
+    parser.add_argument('--limit', type=float, default=IMPORT_TIME_LIMIT,
+                        help='Seconds the import may take, default {}.'.format(IMPORT_TIME_LIMIT))
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of the slowest imports shown with --verbose, default 10.')
+    parser.add_argument('--verbose', action='store_true', default=False, help='Verbose.')
+
+    args = parser.parse_args()
+
+    if not main(**vars(args)):
+        sys.exit(1)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+import json
+
+from astropy import units as u
+
+from pocs.scheduler.benchmark import DEFAULT_DATE
+from pocs.scheduler.benchmark import run_benchmark
+
+
+def main(sizes=None, date=DEFAULT_DATE, step=5, fixed_step=False, trace_memory=False, seed=0,
+         output=None, verbose=False, **kwargs):
+    """Simulate a night of scheduling for catalogs of each size.
+
+    See argparse help string below for details about parameters.
+    """
+
+    def _print(msg):
+        if verbose:
+            print(msg)
+
+    results = run_benchmark(sizes=sizes or [100, 1000, 10000],
+                            date=date,
+                            step=step * u.minute,
+                            advance_by_set=not fixed_step,
+                            trace_memory=trace_memory,
+                            seed=seed,
+                            log=_print)
+
+    for result in results:
+        print(result.summary())
+
+    if output is not None:
+        with open(output, 'w') as f:
+            json.dump([result.to_dict() for result in results], f, indent=2)
+        _print("Results written to {}".format(output))
+
+    return results
+
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler over a simulated night")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000],
+                        help='Number of fields in each catalog, default 100 1000 10000.')
+    parser.add_argument('--date', default=DEFAULT_DATE,
+                        help='Local date the night starts on, default {}.'.format(DEFAULT_DATE))
+    parser.add_argument('--step', type=float, default=5,
+                        help='Minutes between scheduling passes, default 5.')
+    parser.add_argument('--fixed_step', action='store_true', default=False,
+                        help='Always advance by --step rather than by the set duration '
+                        'of the selected field, default False.')
+    parser.add_argument('--trace_memory', action='store_true', default=False,
+                        help='Track peak Python memory with tracemalloc (slow), default False.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for the synthetic catalogs, default 0.')
+    parser.add_argument('--output', default=None,
+                        help='Write the results, including the sequences, to this JSON file.')
+    parser.add_argument('--verbose', action='store_true', default=False, help='Verbose.')
+
+    args = parser.parse_args()
+
+    main(**vars(args))
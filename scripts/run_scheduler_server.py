@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+import os
+import sys
+
+from astropy import units as u
+
+from pocs.scheduler.benchmark import get_constraints
+from pocs.scheduler.benchmark import get_observer
+from pocs.scheduler.server import SchedulerServer
+from pocs.utils import load_module
+from pocs.utils.config import load_config
+
+
+def main(fields_file=None, port=None, claim_timeout=None, scheduler_type='dispatch'):
+    """Serve observations to the units of a site.
+
+    See argparse help string below for details about parameters.
+    """
+    config = load_config(config_files=['pocs'])
+    scheduler_config = config['scheduler']
+
+    fields_file = fields_file or scheduler_config.get('fields_file', 'simple.yaml')
+    if not os.path.exists(fields_file):
+        fields_file = os.path.join(config['directories']['targets'], fields_file)
+
+    if not os.path.exists(fields_file):
+        print("Fields file does not exist: {}".format(fields_file), file=sys.stderr)
+        sys.exit(1)
+
+    module = load_module('pocs.scheduler.{}'.format(scheduler_type))
+    scheduler = module.Scheduler(get_observer(config),
+                                 fields_file=fields_file,
+                                 constraints=get_constraints(config))
+
+    if scheduler_config.get('load_history', True):
+        scheduler.load_history()
+
+    server = SchedulerServer(scheduler,
+                             port=port,
+                             claim_timeout=claim_timeout * u.minute if claim_timeout else None)
+
+    print("Serving {} fields from {} on port {}".format(
+        len(scheduler.catalog), fields_file, server.port))
+    print('Hit Ctrl-c to stop')
+
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Serve observations to the units of a site from one shared scheduler")
+    parser.add_argument('--fields_file', default=None,
+                        help='Fields file, default scheduler.fields_file from the config.')
+    parser.add_argument('--port', type=int, default=None,
+                        help='Port to listen on, default scheduler.server.port from the config.')
+    parser.add_argument('--claim_timeout', type=float, default=None,
+                        help='Minutes a unit keeps a field without asking again, '
+                        'default scheduler.server.claim_timeout from the config.')
+    parser.add_argument('--type', dest='scheduler_type', default='dispatch',
+                        help='Type of scheduler to score the fields with, default dispatch.')
+
+    args = parser.parse_args()
+
+    main(**vars(args))